@@ -0,0 +1,45 @@
+from starlette.exceptions import HTTPException
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+
+class BodySizeLimitMiddleware:
+    """
+    Reject request bodies above max_body_size for paths under path_prefix.
+
+    A Content-Length above the limit is answered with 413 before any of the body
+    is read. Bodies without one (chunked) are counted while Starlette parses them,
+    and parsing stops with 413 as soon as the limit is crossed.
+    """
+
+    def __init__(self, app: ASGIApp, max_body_size: int, path_prefix: str = "/"):
+        self.app = app
+        self.max_body_size = max_body_size
+        self.path_prefix = path_prefix
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or not scope["path"].startswith(self.path_prefix):
+            await self.app(scope, receive, send)
+            return
+
+        detail = f"Request too large. Max size: {self.max_body_size / 1024 / 1024:.1f}MB"
+        content_length = dict(scope["headers"]).get(b"content-length")
+        if content_length and content_length.isdigit() and int(content_length) > self.max_body_size:
+            print(f"⛔ Rejected {scope['path']}: Content-Length {int(content_length)} > {self.max_body_size}")
+            response = JSONResponse({"detail": detail}, status_code=413, headers={"Connection": "close"})
+            await response(scope, receive, send)
+            return
+
+        received = 0
+
+        async def limited_receive() -> Message:
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_body_size:
+                    # Raised inside body parsing - FastAPI re-raises HTTPExceptions as is
+                    raise HTTPException(status_code=413, detail=detail)
+            return message
+
+        await self.app(scope, limited_receive, send)
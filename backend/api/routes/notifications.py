@@ -1,11 +1,16 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
 from pydantic import BaseModel, Field, ConfigDict
-from typing import List
+from typing import List, Optional, Union
 from uuid import uuid4
 from datetime import datetime
+import asyncpg
 import json
-import os
-import requests
+
+from config.settings import settings
+from database.connection import get_db, db_manager
+from services.database_service import DatabaseService
+from services.notification_store import notification_store
+from services.reply_outbox import reply_outbox
 
 
 router = APIRouter(prefix="/api/v1/notifications", tags=["notifications"])
@@ -31,55 +36,57 @@ class Notification(NotificationRequest):
     whatsapp_from: str | None = Field(None, alias="whatsapp_from", serialization_alias="whatsapp_from")
 
 
-_NOTIFICATIONS: List[Notification] = []
-REPLY_ENDPOINT = os.getenv("REPLY_ENDPOINT", "http://localhost:4001/api/send-reply")
-DEDUP_KEYS = set()
+class NotificationFeed(BaseModel):
+    notifications: List[Notification]  # created or changed since the cursor, resolved ones included
+    cursor: int  # pass as ?since= on the next request
 
 
 @router.post("", response_model=Notification)
-async def create_notification(payload: NotificationRequest):
-    """Store an incoming notification (in-memory)."""
-    dedup_key = f"{payload.driver_name}|{payload.date}"
-    if dedup_key in DEDUP_KEYS:
-        existing = next((n for n in _NOTIFICATIONS if f"{n.driver_name}|{n.date}" == dedup_key), None)
-        if existing:
-            print("[notifications] duplicate ignored for", dedup_key)
-            return existing
+async def create_notification(payload: NotificationRequest, conn: asyncpg.Connection = Depends(get_db)):
+    """Store an incoming notification; a repeat for an open driver/date returns the existing one."""
     print("[notifications] incoming payload:", json.dumps(payload.model_dump(by_alias=True), default=str))
-    notification = Notification(
-        id=str(uuid4()),
-        driver_name=payload.driver_name,
-        date=payload.date,
-        reason=payload.reason,
-        actual_message=payload.actual_message,
-        whatsapp_from=payload.whatsapp_from,
-        status="pending",
-        created_at=datetime.utcnow(),
-    )
-    _NOTIFICATIONS.append(notification)
-    DEDUP_KEYS.add(dedup_key)
-    print("[notifications] stored notification:", json.dumps(notification.model_dump(by_alias=True), default=str))
+    notification, created = await notification_store.create(conn, {
+        "id": str(uuid4()),
+        "driver_name": payload.driver_name,
+        "date": payload.date,
+        "reason": payload.reason,
+        "actual_message": payload.actual_message,
+        "whatsapp_from": payload.whatsapp_from,
+    })
+    if not created:
+        print("[notifications] duplicate ignored for", f"{payload.driver_name}|{payload.date}")
+        return notification
+    print("[notifications] stored notification:", json.dumps(notification, default=str))
     return notification
 
 
-@router.get("", response_model=List[Notification])
-async def list_notifications():
-    """Return all stored notifications."""
-    print(f"[notifications] list requested, count={len(_NOTIFICATIONS)}")
-    return list(_NOTIFICATIONS)
+@router.get("", response_model=Union[List[Notification], NotificationFeed])
+async def list_notifications(
+    since: Optional[int] = Query(None, ge=0, description="Feed cursor from the previous response (0 = everything)"),
+    wait: float = Query(0.0, ge=0, description="Seconds to wait for a change when there is none yet (long-poll)")
+):
+    """
+    Return the pending notifications, oldest first.
+
+    With ?since=<cursor>, return only the notifications created or changed after it
+    (resolved ones included, so they can be removed) and the next cursor; ?wait=
+    holds the request open until something changes, up to NOTIFICATION_WAIT_MAX.
+    """
+    if since is None:
+        async with db_manager.pool.acquire() as conn:
+            notifications = await notification_store.list(conn, "pending")
+        print(f"[notifications] list requested, count={len(notifications)}")
+        return notifications
+
+    wait = min(wait, settings.NOTIFICATION_WAIT_MAX)
+    notifications, cursor = await notification_store.changes(db_manager.pool, since, wait)
+    return {"notifications": notifications, "cursor": cursor}
 
 
 @router.delete("/{notification_id}")
-async def delete_notification(notification_id: str):
-    """Delete a notification by id."""
-    global _NOTIFICATIONS
-    before = len(_NOTIFICATIONS)
-    target = next((n for n in _NOTIFICATIONS if n.id == notification_id), None)
-    _NOTIFICATIONS = [n for n in _NOTIFICATIONS if n.id != notification_id]
-    if target:
-        key = f"{target.driver_name}|{target.date}"
-        DEDUP_KEYS.discard(key)
-    if len(_NOTIFICATIONS) == before:
+async def delete_notification(notification_id: str, conn: asyncpg.Connection = Depends(get_db)):
+    """Resolve a notification by id (kept for NOTIFICATION_RETENTION_DAYS, then purged)."""
+    if await notification_store.resolve(conn, notification_id) is None:
         raise HTTPException(status_code=404, detail="Notification not found")
     return {"deleted": notification_id}
 
@@ -91,21 +98,35 @@ class ReplyPayload(BaseModel):
     reply: str
 
 
-@router.post("/reply")
-async def send_reply(payload: ReplyPayload):
-    """Forward a reply to the configured endpoint, logging request/response."""
+class ReplyStatus(BaseModel):
+    reply_id: int
+    to: str
+    status: str  # pending -> sending -> sent / failed (pending again between retries)
+    attempts: int
+    next_attempt_at: Optional[datetime] = None
+    last_error: Optional[str] = None
+    response_status: Optional[int] = None
+    created_at: datetime
+    sent_at: Optional[datetime] = None
+
+
+def _reply_status(row) -> dict:
+    return {**row, "reply_id": row["id"], "to": row["recipient"]}
+
+
+@router.post("/reply", response_model=ReplyStatus, status_code=status.HTTP_202_ACCEPTED)
+async def send_reply(payload: ReplyPayload, response: Response, conn: asyncpg.Connection = Depends(get_db)):
+    """Queue a reply for the configured endpoint; delivery (with retries) happens in the background."""
     print("[notifications] outgoing reply payload:", json.dumps(payload.model_dump(), default=str))
-    try:
-        resp = requests.post(
-            REPLY_ENDPOINT,
-            json=payload.model_dump(),
-            headers={"Content-Type": "application/json"},
-            timeout=10,
-        )
-        print("[notifications] reply response:", resp.status_code, resp.text)
-        if resp.status_code >= 400:
-            raise HTTPException(status_code=502, detail=f"Reply endpoint error {resp.status_code}: {resp.text}")
-    except requests.RequestException as exc:
-        print("[notifications] reply request failed:", exc)
-        raise HTTPException(status_code=502, detail="Failed to reach reply endpoint")
-    return {"status": "ok"}
+    row = await reply_outbox.enqueue(conn, payload.to, payload.reply)
+    response.headers["Location"] = f"{router.prefix}/reply/{row['id']}"
+    return _reply_status(row)
+
+
+@router.get("/reply/{reply_id}", response_model=ReplyStatus)
+async def get_reply_status(reply_id: int, conn: asyncpg.Connection = Depends(get_db)):
+    """Delivery status of a queued reply."""
+    row = await DatabaseService(conn).get_reply(reply_id)
+    if row is None:
+        raise HTTPException(status_code=404, detail="Reply not found")
+    return _reply_status(row)
@@ -1,21 +1,33 @@
-from fastapi import APIRouter, UploadFile, File, Form, Depends, HTTPException
-from fastapi.responses import JSONResponse
+from fastapi import APIRouter, UploadFile, File, Form, Depends, Header, HTTPException, Query
+from fastapi.responses import JSONResponse, StreamingResponse
+from contextlib import asynccontextmanager
 from datetime import date, datetime, timedelta
-from typing import Optional, List
+from typing import Any, Callable, Dict, Optional, List
+import asyncio
 import asyncpg
-import os
 import aiofiles
+import hashlib
+from uuid import uuid4
 from pathlib import Path
 
-from database.connection import get_db
-from services.excel_parser import ExcelParser
+from database.connection import get_db, db_manager
+from services.upload_pipeline import UploadPipeline
 from services.database_service import DatabaseService
 from services.google_sheets_service import google_sheets_service
-from schemas.models import UploadResponse, UnavailableDriver
+from services.sheet_sync import SheetSyncJob, remove_file, sheet_sync
+from services.upload_jobs import UploadJob, upload_jobs
+from services.events import Event, event_bus
+from schemas.models import UploadResponse, UploadJobStatus, SheetSyncStatus, EventStreamToken, UnavailableDriver
 from config.settings import settings
+from api.stream_tokens import issue_stream_token
 import json
 
 router = APIRouter(prefix="/api/v1/upload", tags=["upload"])
+# GET /events: browsers' EventSource cannot send X-API-Key, so main.py also accepts a stream ?token= here
+events_router = APIRouter(prefix="/api/v1/upload", tags=["upload"])
+
+# Event bus topic for upload progress (see GET /events)
+UPLOAD_EVENTS = "uploads"
 
 
 @router.post("/weekly-plan", response_model=UploadResponse)
@@ -26,6 +38,8 @@ async def upload_weekly_plan(
     unavailable_drivers: Optional[str] = Form(default="[]"),  # JSON string
     sync_to_google_sheets: Optional[bool] = Form(default=True),  # Enable/disable sync
     google_sheet_name: Optional[str] = Form(default=None),  # Override sheet name
+    depot: Optional[str] = Form(default=None),  # Depot the plan belongs to (idempotency key)
+    async_mode: Optional[bool] = Form(default=False),  # Process in the background, return a job id
     conn: asyncpg.Connection = Depends(get_db)
 ):
     """
@@ -39,8 +53,15 @@ async def upload_weekly_plan(
     - action: "replace" (clear old data) or "append" (keep old data)
     - unavailable_drivers: JSON array of manually set unavailable drivers
       Format: [{"driver_name": "Name", "dates": ["YYYY-MM-DD", ...], "reason": "optional"}]
-    - sync_to_google_sheets: Whether to sync to Google Sheets (default: True)
+    - sync_to_google_sheets: Whether to sync to Google Sheets (default: True); the sync
+      runs in the background - GET /api/v1/upload/sheets-sync/{upload_id} for its status
     - google_sheet_name: Override the Google Sheet name (optional)
+    - depot: Depot name (optional)
+    - async_mode: Return 202 with a job id right away and process in the background;
+      poll GET /api/v1/upload/jobs/{job_id} for progress and the final result
+    
+    Resending the same file for the same week/action/depot returns the stored
+    result without reprocessing, as long as the data has not changed since.
     
     Returns:
     - Success status, week info, season, records created
@@ -94,260 +115,384 @@ async def upload_weekly_plan(
     upload_dir = Path(settings.UPLOAD_DIR)
     upload_dir.mkdir(exist_ok=True)
     
-    file_path = upload_dir / f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{file.filename}"
+    # Unique per upload - queued jobs of the same file can arrive within one second
+    file_path = upload_dir / f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid4().hex[:8]}_{file.filename}"
+    
+    # Copy in chunks, hashing and checking the size on the way
+    file_hash = await _save_upload(file, file_path)
+    
+    # Identical upload already applied and nothing changed since? Return the stored result
+    db_service = DatabaseService(conn)
+    stored = await db_service.find_reusable_upload(
+        file_hash, week_start_date, action, depot, unavailable_list
+    )
+    if stored:
+        remove_file(file_path)
+        print(f"♻️  Identical upload of {file.filename} for {week_start_date} already applied - returning stored result")
+        response = UploadResponse(**stored['response'])
+        response.message = f"{response.message or 'Upload'} (unchanged - already uploaded)"
+        if async_mode:
+            job = UploadJob(stored['id'], file.filename, week_start_date, work=None)
+            job.finish(result=response)
+            upload_jobs.track(job)
+            return _job_accepted(job)
+        return response
+    
+    upload_id = await db_service.start_upload_history(
+        file.filename, week_start_date, action, depot, file_hash, unavailable_list
+    )
+    
+    upload = {
+        "upload_id": upload_id,
+        "file_path": file_path,
+        "filename": file.filename,
+        "week_start": week_start_date,
+        "action": action,
+        "unavailable_list": unavailable_list,
+        "sync_to_google_sheets": sync_to_google_sheets,
+        "google_sheet_name": google_sheet_name
+    }
+    
+    if async_mode:
+        # Process on a job worker; it borrows a pool connection only for the DB part
+        job = UploadJob(
+            upload_id, file.filename, week_start_date,
+            work=lambda job: _process_upload(upload, on_progress=job.update)
+        )
+        try:
+            upload_jobs.submit(job)
+        except asyncio.QueueFull:
+            remove_file(file_path)
+            await db_service.fail_upload_history(upload_id, "Upload queue full")
+            raise HTTPException(
+                status_code=503,
+                detail="Too many uploads in progress, please retry shortly",
+                headers={"Retry-After": "30"}
+            )
+        print(f"📥 Upload {upload_id} ({file.filename}) queued as a background job")
+        return _job_accepted(job)
     
+    try:
+        return await _process_upload(upload, conn=conn)
+    except Exception as e:
+        # Re-raise as HTTPException
+        raise HTTPException(
+            status_code=500, 
+            detail=f"Processing failed: {str(e)}"
+        )
+
+
+@router.get("/jobs/{job_id}", response_model=UploadJobStatus)
+async def get_upload_job(
+    job_id: int,
+    conn: asyncpg.Connection = Depends(get_db)
+):
+    """
+    Status of a background upload: stage, records written so far and, once
+    finished, the UploadResponse (or the error).
+    
+    Jobs run by another worker process or before a restart are answered from
+    upload_history, without stage/progress details.
+    """
+    job = upload_jobs.get(job_id)
+    if job:
+        return UploadJobStatus(**job.to_dict())
+    
+    history = await DatabaseService(conn).get_upload_history(job_id)
+    if not history:
+        raise HTTPException(status_code=404, detail="Upload job not found")
+    status = {"processing": "running", "success": "succeeded", "failed": "failed"}.get(history['status'], history['status'])
+    return UploadJobStatus(
+        job_id=history['id'],
+        status=status,
+        stage="done" if history['completed_at'] else "unknown",
+        filename=history['filename'],
+        week_start=history['week_start'],
+        progress=history['records_affected'] or {},
+        created_at=history['uploaded_at'],
+        finished_at=history['completed_at'],
+        result=history['response'],
+        error=history['error_message']
+    )
+
+
+@router.get("/sheets-sync/{upload_id}", response_model=SheetSyncStatus)
+async def get_sheet_sync(
+    upload_id: int,
+    conn: asyncpg.Connection = Depends(get_db)
+):
+    """
+    Status of an upload's background Google Sheets sync.
+    
+    Syncs run by another worker process or before a restart are answered from
+    upload_history once they have finished.
+    """
+    job = sheet_sync.get(upload_id)
+    if job:
+        return SheetSyncStatus(**job.to_dict())
+    
+    history = await DatabaseService(conn).get_upload_history(upload_id)
+    if not history or not history['sheets_sync']:
+        raise HTTPException(status_code=404, detail="No Google Sheets sync found for this upload")
+    return SheetSyncStatus(**history['sheets_sync'])
+
+
+@router.post("/events/token", response_model=EventStreamToken)
+async def create_event_stream_token(
+    upload_id: Optional[int] = Query(None, description="Upload whose events the token opens; omit for all uploads")
+):
+    """
+    Token for opening GET /events from a browser: EventSource cannot send the
+    X-API-Key header, and the API key itself must not end up in URLs (access
+    logs, browser history). The token only opens that stream and expires after
+    EVENT_STREAM_TOKEN_SECONDS; reconnects after that are refused.
+    """
+    return EventStreamToken(
+        token=issue_stream_token(upload_id),
+        upload_id=upload_id,
+        expires_in=settings.EVENT_STREAM_TOKEN_SECONDS
+    )
+
+
+@events_router.get("/events")
+async def upload_events(
+    upload_id: Optional[int] = Query(None, description="Only events of this upload (job_id); ends after it finishes"),
+    last_event_id: Optional[str] = Header(None, alias="Last-Event-ID")
+):
+    """
+    Live upload progress as Server-Sent Events.
+    
+    Event types: started, stage (database started or finished; google_sheets_sync
+    with the sync status, which may arrive after completed), progress (records
+    written so far per table), warning, completed (with the UploadResponse) and failed. Every event carries the upload_id. Subscribe before
+    posting to see a synchronous upload from the start; reconnecting clients send
+    Last-Event-ID to get the buffered events they missed. With upload_id, the
+    buffered events of that upload are sent first, so subscribing right after an
+    async_mode 202 misses nothing.
+    
+    An upload that has already finished (also one answered from an identical
+    earlier upload) gets just its completed or failed event; an unknown upload_id
+    is a 404. Browsers open the stream with ?token= from POST /events/token
+    (EventSource cannot set headers).
+    """
+    finished = await _finished_upload_event(upload_id) if upload_id is not None else None
+    
+    async def stream():
+        yield b"retry: 3000\n\n"
+        if finished:
+            yield finished.to_sse()
+            return
+        async for event in event_bus.stream(
+            UPLOAD_EVENTS,
+            last_event_id,
+            replay=upload_id is not None,
+            keepalive=settings.EVENT_KEEPALIVE_SECONDS
+        ):
+            if event is None:
+                yield b": keepalive\n\n"
+                continue
+            if upload_id is not None and event.data.get("upload_id") != upload_id:
+                continue
+            yield event.to_sse()
+            if upload_id is not None and event.type in ("completed", "failed"):
+                return
+    
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+async def _finished_upload_event(upload_id: int) -> Optional[Event]:
+    """The completed/failed event of an upload that has finished, None while it runs; 404 if unknown"""
+    job = upload_jobs.get(upload_id)
+    if job:
+        finished = UploadJobStatus(**job.to_dict()).model_dump(mode="json")
+    else:
+        async with _connection(None) as db:
+            history = await DatabaseService(db).get_upload_history(upload_id)
+        if not history:
+            raise HTTPException(status_code=404, detail="Upload not found")
+        finished = {
+            "status": {"success": "succeeded"}.get(history['status'], history['status']),
+            "result": history['response'],
+            "error": history['error_message'],
+            "finished_at": history['completed_at'] and history['completed_at'].isoformat()
+        }
+    
+    created_at = finished["finished_at"] or datetime.utcnow().isoformat()
+    if finished["status"] == "succeeded":
+        data = {"upload_id": upload_id, "result": finished["result"]}
+        return Event(f"upload-{upload_id}-done", UPLOAD_EVENTS, "completed", data, created_at)
+    if finished["status"] == "failed":
+        data = {"upload_id": upload_id, "error": finished["error"]}
+        return Event(f"upload-{upload_id}-done", UPLOAD_EVENTS, "failed", data, created_at)
+    return None
+
+
+def _job_accepted(job: UploadJob) -> JSONResponse:
+    """202 with the job status and where to poll it"""
+    return JSONResponse(
+        status_code=202,
+        content=UploadJobStatus(**job.to_dict()).model_dump(mode="json"),
+        headers={"Location": f"{router.prefix}/jobs/{job.job_id}"}
+    )
+
+
+async def _save_upload(file: UploadFile, file_path: Path) -> str:
+    """
+    Write the uploaded file to file_path UPLOAD_CHUNK_SIZE bytes at a time, return its sha256.
+    
+    Memory use is one chunk regardless of the file size; the copy stops (and the
+    partial file is removed) as soon as MAX_FILE_SIZE is crossed.
+    """
+    digest = hashlib.sha256()
+    size = 0
     try:
         async with aiofiles.open(file_path, 'wb') as f:
-            content = await file.read()
-            
-            # Check file size
-            if len(content) > settings.MAX_FILE_SIZE:
-                raise HTTPException(
-                    status_code=400,
-                    detail=f"File too large. Max size: {settings.MAX_FILE_SIZE / 1024 / 1024}MB"
-                )
-            
-            await f.write(content)
+            while chunk := await file.read(settings.UPLOAD_CHUNK_SIZE):
+                size += len(chunk)
+                if size > settings.MAX_FILE_SIZE:
+                    raise HTTPException(
+                        status_code=400,
+                        detail=f"File too large. Max size: {settings.MAX_FILE_SIZE / 1024 / 1024}MB"
+                    )
+                digest.update(chunk)
+                await f.write(chunk)
+    except HTTPException:
+        remove_file(file_path)
+        raise
     except Exception as e:
+        remove_file(file_path)
         raise HTTPException(status_code=500, detail=f"Failed to save file: {str(e)}")
+    return digest.hexdigest()
+
+
+@asynccontextmanager
+async def _connection(conn: Optional[asyncpg.Connection]):
+    """The given connection, or one borrowed from the pool for the duration of the block"""
+    if conn is not None:
+        yield conn
+        return
+    async with db_manager.pool.acquire() as pooled:
+        yield pooled
+
+
+async def _process_upload(
+    upload: Dict[str, Any],
+    conn: Optional[asyncpg.Connection] = None,
+    on_progress: Optional[Callable[..., None]] = None
+) -> UploadResponse:
+    """
+    Database pipeline and upload_history bookkeeping for a saved file; the Google
+    Sheets sync is handed to the sheet_sync worker first and runs alongside.
     
-    # Initialize database service
-    db_service = DatabaseService(conn)
+    Without conn (background jobs) a pool connection is borrowed for the database
+    part. on_progress(stage, records_created) reports progress.
+    """
+    upload_id = upload["upload_id"]
+    file_path = upload["file_path"]
+    filename = upload["filename"]
+    week_start_date = upload["week_start"]
+    
+    def publish(event_type: str, **data):
+        event_bus.publish(UPLOAD_EVENTS, event_type, {"upload_id": upload_id, **data})
     
-    # Track Google Sheets sync result
-    google_sheets_result = None
+    def progress(phase: str, records_created: Optional[Dict[str, int]] = None):
+        if on_progress:
+            on_progress(phase, records_created)
+        publish("progress", phase=phase, records_created=records_created)
+    
+    publish("started", filename=filename, week_start=week_start_date, action=upload["action"])
+    
+    def sync_changed(job: SheetSyncJob):
+        publish("stage", stage="google_sheets_sync", status=job.status, attempts=job.attempts, error=job.error)
     
     try:
-        # === GOOGLE SHEETS SYNC (BEFORE DATABASE PROCESSING) ===
-        if sync_to_google_sheets and settings.ENABLE_GOOGLE_SHEETS_SYNC:
-            print("\n" + "="*60)
-            print("📊 GOOGLE SHEETS SYNC")
-            print("="*60)
-            
-            if google_sheets_service.is_available():
-                google_sheets_result = await google_sheets_service.upload_excel_to_sheet(
-                    str(file_path),
-                    sheet_name=google_sheet_name
-                )
-                
-                if google_sheets_result:
-                    print("✅ Google Sheets sync completed successfully")
-                else:
-                    print("⚠️  Google Sheets sync failed, but continuing with database processing")
-            else:
-                print("⚠️  Google Sheets service not available - skipping sync")
-            
-            print("="*60 + "\n")
-        else:
+        # === GOOGLE SHEETS SYNC (background, never delays the database result) ===
+        if not (upload["sync_to_google_sheets"] and settings.ENABLE_GOOGLE_SHEETS_SYNC):
+            google_sheets_sync = "disabled"
             print("ℹ️  Google Sheets sync disabled for this upload")
+        elif not google_sheets_service.is_available():
+            google_sheets_sync = "unavailable"
+            print("⚠️  Google Sheets service not available - skipping sync")
+        else:
+            sheet_sync.submit(upload_id, str(file_path), upload["google_sheet_name"], on_change=sync_changed)
+            google_sheets_sync = "queued"
+            print(f"📊 Google Sheets sync queued (GET {router.prefix}/sheets-sync/{upload_id})")
         
-        # === DATABASE PROCESSING ===
-        # Parse Excel file
-        print(f"📄 Parsing Excel file: {file.filename}")
-        parser = ExcelParser(str(file_path))
-        parsed_data = parser.parse_all(week_start_date)
-        
-        # Determine season and school status
-        season, school_status = _determine_season_and_school(
-            week_start_date,
-            parsed_data['school_days']
-        )
-        
-        print(f"📅 Week: {week_start_date}, Season: {season}, School: {school_status}")
-        
-        # ALWAYS clear ALL existing data and reset sequences
-        print("🗑️  Clearing ALL existing data from database...")
-        await db_service.clear_all_week_data()
-        print("✅ Database cleared and sequences reset")
-        
-        # Track records created
-        records_created = {
-            'drivers': 0,
-            'routes': 0,
-            'driver_availability': 0,
-            'fixed_assignments': 0
-        }
-        
-        # 1. Insert/Update Drivers
-        print("👥 Inserting/updating drivers...")
-        driver_id_map = {}  # Map driver name to driver_id
-        for driver_data in parsed_data['drivers']:
-            driver_id = await db_service.upsert_driver(driver_data)
-            driver_id_map[driver_data['name']] = driver_id
-            records_created['drivers'] += 1
-        
-        print(f"✅ Created/updated {records_created['drivers']} drivers")
-        
-        # 2. Insert Routes
-        print("🚌 Inserting routes...")
-        route_id_map = {}  # Map (route_name, date) to route_id
-        for route_data in parsed_data['routes']:
-            route_id = await db_service.create_route(route_data)
-            key = (route_data['route_name'], route_data['date'])
-            route_id_map[key] = route_id
-            records_created['routes'] += 1
-        
-        print(f"✅ Created {records_created['routes']} routes")
-        
-        # 3. Process Public Holidays - mark all drivers unavailable
-        print("🎉 Processing public holidays...")
-        for holiday in parsed_data['public_holidays']:
-            # Only add if within the week
-            if week_start_date <= holiday['date'] < week_start_date + timedelta(days=7):
-                for driver_name, driver_id in driver_id_map.items():
-                    await db_service.create_availability({
-                        'driver_id': driver_id,
-                        'date': holiday['date'],
-                        'available': False,
-                        'notes': f"Feiertag: {holiday['name']}"
-                    })
-                    records_created['driver_availability'] += 1
-        
-        # 4. Process Fixed Assignments from parsed data
-        print("📌 Processing fixed assignments...")
-        for assignment in parsed_data['fixed_assignments']:
-            driver_name = assignment['driver_name']
-            route_name = assignment['route_name']
-            assignment_date = assignment['date']
-            
-            if driver_name not in driver_id_map:
-                print(f"   ⚠️  Driver '{driver_name}' not found - skipping")
-                continue
-            
-            driver_id = driver_id_map[driver_name]
+        async with _connection(conn) as db:
+            # === DATABASE PROCESSING ===
+            # Parse Excel file and write batches as they are produced (one transaction)
+            print(f"📄 Parsing Excel file: {filename}")
+            publish("stage", stage="database", status="started")
+            pipeline = UploadPipeline(
+                db, week_start_date, upload["unavailable_list"],
+                on_progress=progress,
+                on_warning=lambda message: publish("warning", message=message)
+            )
+            result = await pipeline.run(str(file_path))
+            publish("stage", stage="database", status="finished", stats=result['stats'])
+            records_created = result['records_created']
             
-            # Get route_id
-            route_key = (route_name, assignment_date)
-            route_id = route_id_map.get(route_key)
+            # Determine season and school status
+            season, school_status = _determine_season_and_school(
+                week_start_date,
+                result['school_days']
+            )
             
-            if not route_id:
-                print(f"   ⚠️  Route '{route_name}' on {assignment_date} not found - skipping")
-                continue
-            
-            # Insert fixed assignment (NO details column)
-            await db_service.create_fixed_assignment({
-                'driver_id': driver_id,
-                'route_id': route_id,
-                'date': assignment_date
-            })
-            records_created['fixed_assignments'] += 1
-        
-        print(f"✅ Created {records_created['fixed_assignments']} fixed assignments")
-        
-        # 5. Process driver availability (frei, manual)
-        print("📋 Processing driver availability...")
-        
-        # First, create a set of (driver_id, date) tuples for unavailable drivers
-        unavailable_set = set()
-        
-        # From parsed data (frei assignments)
-        for availability in parsed_data['driver_availability']:
-            driver_name = availability['driver_name']
+            print(f"📅 Week: {week_start_date}, Season: {season}, School: {school_status}")
+            for phase, phase_stats in result['stats'].items():
+                print(
+                    f"   ⏱️  {phase}: {phase_stats['seconds']:.3f}s, "
+                    f"{phase_stats['rows']} rows, {phase_stats['statements']} statements"
+                )
             
-            if driver_name not in driver_id_map:
-                continue
+            print(f"🎉 Upload complete!")
             
-            driver_id = driver_id_map[driver_name]
+            # Build response message
+            response_message = f"Successfully processed {filename}"
+            if google_sheets_sync == "queued":
+                response_message += " (Google Sheet sync running in the background)"
             
-            await db_service.create_availability({
-                'driver_id': driver_id,
-                'date': availability['date'],
-                'available': availability['available'],
-                'notes': availability['notes']
-            })
-            records_created['driver_availability'] += 1
-            unavailable_set.add((driver_id, availability['date']))
-        
-        # Manual unavailability (from user input)
-        if unavailable_list:
-            for unavailable in unavailable_list:
-                driver_name = unavailable.get('driver_name')
-                dates = unavailable.get('dates', [])
-                reason = unavailable.get('reason', 'Manually set unavailable')
-                
-                if driver_name not in driver_id_map:
-                    print(f"   ⚠️  Driver '{driver_name}' not found - skipping")
-                    continue
-                
-                driver_id = driver_id_map[driver_name]
-                
-                for date_str in dates:
-                    try:
-                        unavail_date = date.fromisoformat(date_str)
-                        await db_service.create_availability({
-                            'driver_id': driver_id,
-                            'date': unavail_date,
-                            'available': False,
-                            'notes': reason
-                        })
-                        records_created['driver_availability'] += 1
-                        unavailable_set.add((driver_id, unavail_date))
-                    except ValueError:
-                        print(f"   ⚠️  Invalid date format: {date_str}")
-                        continue
-        
-        # Now create availability records for ALL drivers for ALL days in the week
-        # Mark as available by default, unless already marked unavailable above
-        print("📅 Creating default availability records for all drivers...")
-        for driver_name, driver_id in driver_id_map.items():
-            for day_offset in range(7):
-                current_date = week_start_date + timedelta(days=day_offset)
-                
-                # Skip if already marked unavailable (holiday, frei, or manual)
-                if (driver_id, current_date) in unavailable_set:
-                    continue
-                
-                # Create available record
-                await db_service.create_availability({
-                    'driver_id': driver_id,
-                    'date': current_date,
-                    'available': True,
-                    'notes': 'Available'
-                })
-                records_created['driver_availability'] += 1
-        
-        print(f"✅ Created {records_created['driver_availability']} availability records")
-        
-        # Clean up uploaded file
-        try:
-            os.remove(file_path)
-        except:
-            pass
-        
-        print(f"🎉 Upload complete!")
-        
-        # Build response message
-        response_message = f"Successfully processed {file.filename}"
-        if google_sheets_result:
-            response_message += f" and synced to Google Sheet '{google_sheets_result.get('name')}'"
-        
-        return UploadResponse(
-            success=True,
-            week_start=week_start_date,
-            season=season,
-            school_status=school_status,
-            records_created=records_created,
-            action_taken=action,
-            message=response_message
-        )
+            response = UploadResponse(
+                success=True,
+                week_start=week_start_date,
+                season=season,
+                school_status=school_status,
+                records_created=records_created,
+                action_taken=upload["action"],
+                message=response_message,
+                google_sheets_sync=google_sheets_sync
+            )
+            await DatabaseService(db).complete_upload_history(
+                upload_id,
+                records_created,
+                response.model_dump(mode="json"),
+                result['data_version']
+            )
+            publish("completed", result=response.model_dump(mode="json"))
+            return response
     
     except Exception as e:
-        # Clean up file on error
         try:
-            os.remove(file_path)
-        except:
-            pass
+            async with _connection(conn) as db:
+                await DatabaseService(db).fail_upload_history(upload_id, str(e))
+        except Exception as history_error:
+            print(f"⚠️  Could not record failed upload: {history_error}")
+        
+        publish("failed", error=str(e))
         
         # Print full error for debugging
         import traceback
         print(f"❌ Error during upload: {str(e)}")
         print(traceback.format_exc())
-        
-        # Re-raise as HTTPException
-        raise HTTPException(
-            status_code=500, 
-            detail=f"Processing failed: {str(e)}"
-        )
+        raise
+    
+    finally:
+        # Clean up file (also when a background job is cancelled at shutdown)
+        remove_file(file_path)
 
 
 def _determine_season_and_school(week_start: date, school_days: dict) -> tuple:
@@ -1,28 +1,75 @@
-from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
 from datetime import date, timedelta
 import asyncpg
-from typing import List
+import hashlib
+import json
+from typing import AsyncIterator, List, Literal, Optional, Tuple
 import asyncio
 import time
 
-from database.connection import get_db
-from services.database_service import DatabaseService
+from database.connection import get_db, db_manager
+from services.database_service import DatabaseService, AVAILABILITY_CACHE, AVAILABILITY_JSON_CACHE
+from services.cache import cache_invalidator
+from config.settings import settings
 from schemas.models import (
     WeeklyRoutesResponse, WeeklyDriversResponse, WeeklyAvailabilityResponse,
     Route, Driver, DriverAvailability, FixedAssignment,
     DriverCreateRequest, DriverUpdateRequest,
     RouteCreateRequest, RouteUpdateRequest,
     AvailabilityCreateRequest, AvailabilityUpdateRequest,
+    AvailabilityBatchRequest, AvailabilityBatchResponse, AvailabilityBatchResult,
+    HolidayAvailabilityRequest, HolidayAvailabilityResponse,
+    WeeklySnapshotResponse,
     FixedAssignmentCreateRequest
 )
 
 router = APIRouter(prefix="/api/v1/weekly", tags=["weekly_data"])
 
 
+def _json_response(body: bytes, etag: str) -> Response:
+    """Return JSON already serialized by Postgres (skips response_model validation)"""
+    return Response(content=body, media_type="application/json", headers=_etag_headers(etag))
+
+
+def _etag_headers(etag: str) -> dict:
+    # no-cache: browsers keep the body but revalidate with If-None-Match every time
+    return {"ETag": etag, "Cache-Control": "no-cache"}
+
+
+async def week_etag(
+    request: Request,
+    response: Response,
+    conn: asyncpg.Connection = Depends(get_db)
+) -> str:
+    """
+    ETag for weekly GETs: the data version plus path and query string.
+    
+    The version advances on every planning-table write and once more after it has
+    committed (DatabaseService.bump_data_version). It is read before the endpoint's
+    queries, so an ETag is never newer than the rows sent with it.
+    
+    Answers If-None-Match with 304 before the endpoint runs its queries.
+    """
+    version = await DatabaseService(conn).get_data_version()
+    resource = f"{request.url.path}?{sorted(request.query_params.multi_items())}"
+    etag = f'"{version}-{hashlib.sha1(resource.encode()).hexdigest()[:16]}"'
+    
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        if etag in candidates or "*" in candidates:
+            raise HTTPException(status_code=status.HTTP_304_NOT_MODIFIED, headers=_etag_headers(etag))
+    
+    response.headers.update(_etag_headers(etag))
+    return etag
+
+
 @router.get("/routes", response_model=WeeklyRoutesResponse)
 async def get_weekly_routes(
     week_start: date = Query(..., description="Week start date (Monday, ISO format)"),
-    conn: asyncpg.Connection = Depends(get_db)
+    conn: asyncpg.Connection = Depends(get_db),
+    etag: str = Depends(week_etag)
 ):
     """
     Get all routes for a specific week.
@@ -33,46 +80,9 @@ async def get_weekly_routes(
     - Season and school status
     """
     
+    # Fast path: Postgres builds the response JSON, returned without re-validation
     db_service = DatabaseService(conn)
-    
-    # Get routes
-    routes_data = await db_service.get_routes_for_week(week_start)
-    
-    if not routes_data:
-        return WeeklyRoutesResponse(
-            week_start=week_start,
-            season="unknown",
-            school_status="unknown",
-            routes=[]
-        )
-    
-    # Extract season and school status from first route
-    season = "unknown"
-    school_status = "unknown"
-    
-    if routes_data and 'details' in routes_data[0]:
-        details = routes_data[0]['details']
-        season = details.get('season', 'unknown')
-        school_status = details.get('school_status', 'unknown')
-    
-    # Convert to Route models
-    routes = []
-    for route_data in routes_data:
-        routes.append(Route(
-            route_id=route_data['route_id'],
-            date=route_data['date'],
-            route_name=route_data['route_name'],
-            day_of_week=route_data['day_of_week'],
-            details=route_data['details'],
-            created_at=route_data['created_at']
-        ))
-    
-    return WeeklyRoutesResponse(
-        week_start=week_start,
-        season=season,
-        school_status=school_status,
-        routes=routes
-    )
+    return _json_response(await db_service.get_routes_json_for_week(week_start), etag)
 
 
 @router.patch("/routes/{route_id}", response_model=Route)
@@ -150,7 +160,8 @@ async def delete_route(
 @router.get("/drivers", response_model=WeeklyDriversResponse)
 async def get_weekly_drivers(
     week_start: date = Query(..., description="Week start date"),
-    conn: asyncpg.Connection = Depends(get_db)
+    conn: asyncpg.Connection = Depends(get_db),
+    etag: str = Depends(week_etag)
 ):
     """
     Get all drivers with their details for a specific week.
@@ -161,26 +172,9 @@ async def get_weekly_drivers(
     - Employment percentage
     """
     
+    # Fast path: Postgres builds the response JSON, returned without re-validation
     db_service = DatabaseService(conn)
-    
-    # Get all drivers
-    drivers_data = await db_service.get_all_drivers()
-    
-    # Convert to Driver models
-    drivers = []
-    for driver_data in drivers_data:
-        drivers.append(Driver(
-            driver_id=driver_data['driver_id'],
-            name=driver_data['name'],
-            details=driver_data['details'],
-            created_at=driver_data['created_at'],
-            updated_at=driver_data.get('updated_at', driver_data['created_at'])  # ✅ Use created_at as fallback
-        ))
-    
-    return WeeklyDriversResponse(
-        week_start=week_start,
-        drivers=drivers
-    )
+    return _json_response(await db_service.get_drivers_json(week_start), etag)
 
 
 @router.post("/drivers", response_model=Driver, status_code=status.HTTP_201_CREATED)
@@ -238,7 +232,8 @@ async def delete_driver(
 @router.get("/availability", response_model=WeeklyAvailabilityResponse)
 async def get_weekly_availability(
     week_start: date = Query(..., description="Week start date"),
-    conn: asyncpg.Connection = Depends(get_db)
+    conn: asyncpg.Connection = Depends(get_db),
+    etag: str = Depends(week_etag)
 ):
     """
     Get driver availability for a specific week.
@@ -253,32 +248,17 @@ async def get_weekly_availability(
     db_service = DatabaseService(conn)
     
     try:
+        # Fast path: Postgres builds the response JSON, returned without re-validation
         # Add timeout wrapper - 90 seconds
-        availability_data = await asyncio.wait_for(
-            db_service.get_availability_for_week(week_start),
+        availability_json = await asyncio.wait_for(
+            db_service.get_availability_json_for_week(week_start),
             timeout=90.0
         )
         
         elapsed = time.time() - start_time
-        print(f"✅ [AVAILABILITY] Query completed in {elapsed:.2f}s, found {len(availability_data)} records")
+        print(f"✅ [AVAILABILITY] Query completed in {elapsed:.2f}s, {len(availability_json)} bytes")
         
-        # Convert to models
-        availability = []
-        for avail_data in availability_data:
-            availability.append(DriverAvailability(
-                id=avail_data['id'],
-                driver_id=avail_data['driver_id'],
-                date=avail_data['date'],
-                available=avail_data['available'],
-                notes=avail_data['notes'],
-                created_at=avail_data['created_at'],
-                updated_at=avail_data['updated_at']
-            ))
-        
-        return WeeklyAvailabilityResponse(
-            week_start=week_start,
-            availability=availability
-        )
+        return _json_response(availability_json, etag)
         
     except asyncio.TimeoutError:
         elapsed = time.time() - start_time
@@ -352,7 +332,105 @@ async def update_availability_record(
     return DriverAvailability(**updated)
 
 
-@router.get("/fixed-assignments")
+@router.post("/availability/batch", response_model=AvailabilityBatchResponse)
+async def apply_availability_batch(
+    payload: AvailabilityBatchRequest,
+    conn: asyncpg.Connection = Depends(get_db)
+):
+    """
+    Create, update and delete many availability rows at once (e.g. a driver off for a week).
+
+    All operations run in one transaction - deletes, then updates, then creates - and
+    the response has one result per operation in request order. A create behaves like
+    POST /availability, an update like PATCH /availability/{id}. Updates and deletes of
+    rows that do not exist come back as "not_found" without failing the batch. An id
+    or a create's driver/date appearing twice rejects the batch with 422.
+    """
+    creates, updates, deletes = [], [], []
+    seen_ids, seen_keys = set(), set()
+    for index, operation in enumerate(payload.operations):
+        fields = operation.dict(exclude_unset=True, exclude={"op", "id"})
+        if operation.op == "create":
+            if operation.driver_id is None or operation.date is None:
+                raise HTTPException(status_code=422, detail=f"Operation {index}: create needs driver_id and date")
+            key = (operation.driver_id, operation.date)
+            if key in seen_keys:
+                raise HTTPException(
+                    status_code=422,
+                    detail=f"Operation {index}: driver {operation.driver_id} on {operation.date} is created twice"
+                )
+            seen_keys.add(key)
+            creates.append(fields)
+            continue
+        if operation.id is None:
+            raise HTTPException(status_code=422, detail=f"Operation {index}: {operation.op} needs an id")
+        if operation.id in seen_ids:
+            raise HTTPException(status_code=422, detail=f"Operation {index}: availability {operation.id} appears twice")
+        seen_ids.add(operation.id)
+        if operation.op == "delete":
+            deletes.append(operation.id)
+        elif not fields:
+            raise HTTPException(status_code=422, detail=f"Operation {index}: no update fields supplied")
+        else:
+            updates.append({"id": operation.id, **fields})
+
+    try:
+        applied = await DatabaseService(conn).apply_availability_batch(creates, updates, deletes)
+    except asyncpg.exceptions.UniqueViolationError:
+        raise HTTPException(
+            status_code=409,
+            detail="Availability already exists for that driver and date"
+        )
+    except asyncpg.exceptions.ForeignKeyViolationError:
+        raise HTTPException(status_code=422, detail="Unknown driver_id in batch")
+
+    results = []
+    for index, operation in enumerate(payload.operations):
+        if operation.op == "create":
+            record = applied["created"][(operation.driver_id, operation.date)]
+            status_text = "created" if record["inserted"] else "updated"
+        elif operation.op == "update":
+            record = applied["updated"].get(operation.id)
+            status_text = "updated" if record else "not_found"
+        else:
+            record = None
+            status_text = "deleted" if operation.id in applied["deleted"] else "not_found"
+        results.append(AvailabilityBatchResult(
+            index=index,
+            op=operation.op,
+            status=status_text,
+            id=record["id"] if record else operation.id,
+            record=DriverAvailability(**record) if record else None
+        ))
+    return AvailabilityBatchResponse(results=results)
+
+
+@router.post("/holidays", response_model=HolidayAvailabilityResponse)
+async def mark_holidays(
+    payload: HolidayAvailabilityRequest,
+    conn: asyncpg.Connection = Depends(get_db)
+):
+    """
+    Mark drivers unavailable on public holidays.
+
+    Use this when a holiday is added after the weekly plan was uploaded.
+    All drivers are affected unless driver_ids is given.
+    """
+    if not payload.holidays:
+        raise HTTPException(status_code=400, detail="No holidays supplied")
+    db_service = DatabaseService(conn)
+    holidays = [holiday.dict() for holiday in payload.holidays]
+    records_affected = await db_service.mark_drivers_unavailable_for_holidays(
+        holidays,
+        driver_ids=payload.driver_ids
+    )
+    return HolidayAvailabilityResponse(
+        holidays=sorted({holiday['date'] for holiday in holidays}),
+        records_affected=records_affected
+    )
+
+
+@router.get("/fixed-assignments", dependencies=[Depends(week_etag)])
 async def get_weekly_fixed_assignments(
     week_start: date = Query(..., description="Week start date"),
     conn: asyncpg.Connection = Depends(get_db)
@@ -406,60 +484,163 @@ async def delete_fixed_assignment(
         raise HTTPException(status_code=404, detail="Fixed assignment not found")
 
 
-@router.get("/summary")
-async def get_weekly_summary(
-    week_start: date = Query(..., description="Week start date"),
-    conn: asyncpg.Connection = Depends(get_db)
+# URL segment -> DatabaseService.get_range_page kind
+RANGE_KINDS = {
+    "routes": "routes",
+    "availability": "availability",
+    "fixed-assignments": "fixed_assignments"
+}
+
+
+def _parse_cursor(cursor: Optional[str]) -> Optional[Tuple[date, int]]:
+    """'2025-07-07:123' -> (date, id)"""
+    if cursor is None:
+        return None
+    try:
+        cursor_date, cursor_id = cursor.split(":")
+        return date.fromisoformat(cursor_date), int(cursor_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid cursor '{cursor}' - expected YYYY-MM-DD:id")
+
+
+def _format_cursor(cursor: Optional[Tuple[date, int]]) -> Optional[str]:
+    return None if cursor is None else f"{cursor[0].isoformat()}:{cursor[1]}"
+
+
+async def _stream_range(
+    kind: str,
+    date_from: date,
+    date_to: date,
+    after: Optional[Tuple[date, int]],
+    page_size: int
+) -> AsyncIterator[bytes]:
+    """
+    NDJSON, one keyset page at a time.
+    
+    The request's get_db connection is released before the body is sent, so each
+    page borrows a pool connection just for its query - a slow client never pins one.
+    """
+    while True:
+        async with db_manager.pool.acquire() as conn:
+            items, after = await DatabaseService(conn).get_range_page(kind, date_from, date_to, after, page_size)
+        if items:
+            yield b"\n".join(items) + b"\n"
+        if after is None:
+            return
+
+
+@router.get("/range/{resource}")
+async def get_range(
+    resource: Literal["routes", "availability", "fixed-assignments"],
+    date_from: date = Query(..., alias="from", description="First date (inclusive, ISO format)"),
+    date_to: date = Query(..., alias="to", description="Last date (inclusive, ISO format)"),
+    after: Optional[str] = Query(None, description="next_cursor of the previous page"),
+    limit: int = Query(settings.RANGE_PAGE_SIZE, ge=1, le=settings.RANGE_PAGE_MAX, description="Rows per page"),
+    stream: bool = Query(False, description="Stream the whole range as NDJSON instead of one page"),
+    conn: asyncpg.Connection = Depends(get_db),
+    etag: str = Depends(week_etag)
 ):
     """
-    Get a summary of all data for a specific week.
+    Routes, availability or fixed assignments for any date range, e.g. a month view or an export.
     
-    Useful for dashboard/overview display.
+    Rows come in (date, id) order with keyset pagination: pass next_cursor back as
+    `after` until it is null. With stream=true the whole range (from `after` on) is
+    sent as NDJSON, one row per line, fetched `limit` rows at a time.
+    Items have the same shape as in the weekly endpoints.
     """
+    if date_to < date_from:
+        raise HTTPException(status_code=400, detail="'to' must not be before 'from'")
+    kind = RANGE_KINDS[resource]
+    cursor = _parse_cursor(after)
     
-    db_service = DatabaseService(conn)
+    if stream:
+        return StreamingResponse(
+            _stream_range(kind, date_from, date_to, cursor, limit),
+            media_type="application/x-ndjson",
+            headers=_etag_headers(etag)
+        )
     
-    # Get all data (but skip availability if it times out)
-    routes = await db_service.get_routes_for_week(week_start)
-    drivers = await db_service.get_all_drivers()
-    fixed_assignments = await db_service.get_fixed_assignments_for_week(week_start)
+    items, next_cursor = await DatabaseService(conn).get_range_page(kind, date_from, date_to, cursor, limit)
+    body = b"".join([
+        b'{"from":"', date_from.isoformat().encode(),
+        b'","to":"', date_to.isoformat().encode(),
+        b'","items":[', b",".join(items),
+        b'],"next_cursor":', json.dumps(_format_cursor(next_cursor)).encode(),
+        b"}"
+    ])
+    return _json_response(body, etag)
+
+
+@router.get("/snapshot", response_model=WeeklySnapshotResponse, dependencies=[Depends(week_etag)])
+async def get_weekly_snapshot(
+    week_start: date = Query(..., description="Week start date (Monday, ISO format)"),
+    conn: asyncpg.Connection = Depends(get_db)
+):
+    """
+    Get routes, drivers, availability and fixed assignments for a week at once.
     
-    # Try to get availability, but don't fail if it times out
-    try:
-        availability = await asyncio.wait_for(
-            db_service.get_availability_for_week(week_start),
-            timeout=30.0
-        )
-        unavailable_count = sum(1 for a in availability if not a['available'])
-    except:
-        availability = []
-        unavailable_count = 0
+    Postgres assembles the whole view with json_agg, so this is a single
+    DB round-trip instead of one query per section.
+    """
     
-    # Calculate stats
-    total_routes = len(routes)
-    total_drivers = len(drivers)
-    fixed_assignment_count = len(fixed_assignments)
+    start_time = time.time()
+    db_service = DatabaseService(conn)
+    snapshot = await db_service.get_week_snapshot(week_start)
     
-    # Extract season/school status
+    # Extract season and school status from first route
     season = "unknown"
     school_status = "unknown"
-    if routes and 'details' in routes[0]:
-        details = routes[0]['details']
+    if snapshot['routes']:
+        details = snapshot['routes'][0].get('details') or {}
         season = details.get('season', 'unknown')
         school_status = details.get('school_status', 'unknown')
     
+    print(
+        f"✅ [SNAPSHOT] {week_start}: {len(snapshot['routes'])} routes, {len(snapshot['drivers'])} drivers, "
+        f"{len(snapshot['availability'])} availability, {len(snapshot['fixed_assignments'])} fixed "
+        f"in {time.time() - start_time:.2f}s"
+    )
+    
+    return WeeklySnapshotResponse(
+        week_start=week_start,
+        season=season,
+        school_status=school_status,
+        **snapshot
+    )
+
+
+@router.get("/summary", dependencies=[Depends(week_etag)])
+async def get_weekly_summary(
+    week_start: date = Query(..., description="Week start date"),
+    conn: asyncpg.Connection = Depends(get_db)
+):
+    """
+    Get a summary of all data for a specific week.
+    
+    Useful for dashboard/overview display.
+    """
+    
+    db_service = DatabaseService(conn, pool=db_manager.pool)
+    
+    # Counts come precomputed from weekly_stats; only the previews are queried
+    stats, routes_preview, drivers = await db_service.fan_out(
+        lambda service: service.get_week_stats(week_start),
+        lambda service: service.get_routes_preview(week_start, limit=10),
+        lambda service: service.get_driver_names()
+    )
+    
     return {
         "week_start": week_start,
-        "season": season,
-        "school_status": school_status,
+        "season": stats['season'],
+        "school_status": stats['school_status'],
         "statistics": {
-            "total_routes": total_routes,
-            "total_drivers": total_drivers,
-            "unavailable_instances": unavailable_count,
-            "fixed_assignments": fixed_assignment_count
+            "total_routes": stats['total_routes'],
+            "total_drivers": stats['total_drivers'],
+            "unavailable_instances": stats['unavailable_instances'],
+            "fixed_assignments": stats['fixed_assignments']
         },
-        "routes": routes[:10],  # First 10 routes as preview
-        "drivers": [{"driver_id": d['driver_id'], "name": d['name']} for d in drivers]
+        "routes": routes_preview,  # First 10 routes as preview
+        "drivers": drivers
     }
 
 
@@ -484,59 +665,86 @@ async def get_diagnostics(
             "issues": []
         }
         
-        # 1. Count total records
-        start = time.time()
-        results["counts"]["total_drivers"] = await conn.fetchval("SELECT COUNT(*) FROM drivers")
-        results["counts"]["total_routes"] = await conn.fetchval("SELECT COUNT(*) FROM routes")
-        results["counts"]["total_availability"] = await conn.fetchval("SELECT COUNT(*) FROM driver_availability")
-        results["counts"]["total_fixed_assignments"] = await conn.fetchval("SELECT COUNT(*) FROM fixed_assignments")
-        results["query_times"]["total_counts"] = f"{time.time() - start:.3f}s"
+        db_service = DatabaseService(conn, pool=db_manager.pool)
+        
+        def timed_count(label: str, query: str, *args):
+            """Read for fan_out() that records its own query time"""
+            async def read(service: DatabaseService):
+                start = time.time()
+                value = await service.conn.fetchval(query, *args)
+                results["query_times"][label] = f"{time.time() - start:.3f}s"
+                return value
+            return read
+        
+        reads = [
+            # 1. Count total records
+            timed_count("total_drivers", "SELECT COUNT(*) FROM drivers"),
+            timed_count("total_routes", "SELECT COUNT(*) FROM routes"),
+            timed_count("total_availability", "SELECT COUNT(*) FROM driver_availability"),
+            timed_count("total_fixed_assignments", "SELECT COUNT(*) FROM fixed_assignments"),
+        ]
         
         # 2. If week provided, check that week
         if week_start:
             week_end = week_start + timedelta(days=7)
             results["week_start"] = str(week_start)
             
-            start = time.time()
-            week_avail = await conn.fetchval(
-                "SELECT COUNT(*) FROM driver_availability WHERE date >= $1 AND date < $2",
-                week_start, week_end
-            )
+            async def join_query_test(service: DatabaseService):
+                # Try the actual problematic query
+                start = time.time()
+                try:
+                    await asyncio.wait_for(
+                        service.conn.fetch("""
+                            SELECT COUNT(*) as cnt
+                            FROM driver_availability da
+                            INNER JOIN drivers d ON da.driver_id = d.driver_id
+                            WHERE da.date >= $1 AND da.date < $2
+                        """, week_start, week_end),
+                        timeout=15.0
+                    )
+                    results["query_times"]["join_query_test"] = f"{time.time() - start:.3f}s"
+                    return True
+                except asyncio.TimeoutError:
+                    results["query_times"]["join_query_test"] = "TIMEOUT (>15s)"
+                    return False
+            
+            reads += [
+                timed_count(
+                    "week_count",
+                    "SELECT COUNT(*) FROM driver_availability WHERE date >= $1 AND date < $2",
+                    week_start, week_end
+                ),
+                # Check duplicates
+                timed_count("duplicate_check", """
+                    SELECT COUNT(*) FROM (
+                        SELECT driver_id, date
+                        FROM driver_availability
+                        WHERE date >= $1 AND date < $2
+                        GROUP BY driver_id, date
+                        HAVING COUNT(*) > 1
+                    ) as dups
+                """, week_start, week_end),
+                join_query_test,
+            ]
+        
+        # Independent queries - run concurrently on separate connections
+        start = time.time()
+        values = await db_service.fan_out(*reads)
+        results["query_times"]["total"] = f"{time.time() - start:.3f}s"
+        
+        (
+            results["counts"]["total_drivers"],
+            results["counts"]["total_routes"],
+            results["counts"]["total_availability"],
+            results["counts"]["total_fixed_assignments"],
+        ) = values[:4]
+        
+        if week_start:
+            week_avail, dup_count, results["join_query_works"] = values[4:]
             results["counts"]["availability_this_week"] = week_avail
             results["counts"]["expected_this_week"] = results["counts"]["total_drivers"] * 7
-            results["query_times"]["week_count"] = f"{time.time() - start:.3f}s"
-            
-            # Check duplicates
-            start = time.time()
-            dup_count = await conn.fetchval("""
-                SELECT COUNT(*) FROM (
-                    SELECT driver_id, date
-                    FROM driver_availability
-                    WHERE date >= $1 AND date < $2
-                    GROUP BY driver_id, date
-                    HAVING COUNT(*) > 1
-                ) as dups
-            """, week_start, week_end)
             results["counts"]["duplicates_this_week"] = dup_count
-            results["query_times"]["duplicate_check"] = f"{time.time() - start:.3f}s"
-            
-            # Try the actual problematic query
-            start = time.time()
-            try:
-                test_query = await asyncio.wait_for(
-                    conn.fetch("""
-                        SELECT COUNT(*) as cnt
-                        FROM driver_availability da
-                        INNER JOIN drivers d ON da.driver_id = d.driver_id
-                        WHERE da.date >= $1 AND da.date < $2
-                    """, week_start, week_end),
-                    timeout=15.0
-                )
-                results["query_times"]["join_query_test"] = f"{time.time() - start:.3f}s"
-                results["join_query_works"] = True
-            except asyncio.TimeoutError:
-                results["query_times"]["join_query_test"] = "TIMEOUT (>15s)"
-                results["join_query_works"] = False
+            if not results["join_query_works"]:
                 results["issues"].append("JOIN query is timing out - this is the root cause")
         
         # Analysis
@@ -549,6 +757,16 @@ async def get_diagnostics(
         if week_start and dup_count > 0:
             results["issues"].append(f"Found {dup_count} duplicate records for this week")
         
+        results["caches"] = {
+            "availability": AVAILABILITY_CACHE.stats(),
+            "availability_json": AVAILABILITY_JSON_CACHE.stats(),
+            "invalidation_listener": {
+                "enabled": settings.ENABLE_CACHE_INVALIDATION_LISTENER,
+                "connected": db_manager.listener is not None and not db_manager.listener.is_closed(),
+                "remote_events": cache_invalidator.remote_events
+            }
+        }
+        
         return results
         
     except Exception as e:
@@ -0,0 +1,30 @@
+import hashlib
+import hmac
+import time
+from typing import Optional
+
+from config.settings import settings
+
+
+def _signature(upload_id: Optional[int], expires: int) -> str:
+    scope = f"upload-events:{'*' if upload_id is None else upload_id}:{expires}"
+    return hmac.new((settings.API_KEY or "").encode(), scope.encode(), hashlib.sha256).hexdigest()
+
+
+def issue_stream_token(upload_id: Optional[int]) -> str:
+    """
+    Token for GET /events?upload_id=... (or the whole stream without upload_id).
+
+    Signed with API_KEY, so every worker can check it without shared state. It
+    only opens that one stream and expires after EVENT_STREAM_TOKEN_SECONDS.
+    """
+    expires = int(time.time()) + settings.EVENT_STREAM_TOKEN_SECONDS
+    return f"{expires}.{_signature(upload_id, expires)}"
+
+
+def check_stream_token(token: str, upload_id: Optional[int]) -> bool:
+    """True if token was issued for this stream and has not expired"""
+    expires, _, signature = token.partition(".")
+    if not expires.isdigit() or int(expires) < time.time():
+        return False
+    return hmac.compare_digest(signature, _signature(upload_id, int(expires)))
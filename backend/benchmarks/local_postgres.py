@@ -0,0 +1,108 @@
+import os
+import shutil
+import socket
+import subprocess
+import tempfile
+from pathlib import Path
+from typing import Optional
+
+import asyncpg
+
+MIGRATIONS_FILE = Path(__file__).resolve().parents[1] / "database" / "migrations.sql"
+
+
+class LocalPostgres:
+    """
+    Throwaway PostgreSQL cluster for benchmarks (initdb on a temp dir, removed on stop).
+
+    Binaries are taken from PG_BIN, else `pg_config --bindir`, else PATH.
+    initdb refuses to run as root - run the harness as a normal user.
+    """
+
+    def __init__(self, bin_dir: Optional[str] = None, port: Optional[int] = None):
+        self.bin_dir = bin_dir or os.getenv("PG_BIN") or self._find_bin_dir()
+        self.port = port or self._free_port()
+        self.base_dir: Optional[str] = None
+
+    @staticmethod
+    def _find_bin_dir() -> str:
+        pg_config = shutil.which("pg_config")
+        if pg_config:
+            result = subprocess.run([pg_config, "--bindir"], capture_output=True, text=True)
+            if result.returncode == 0 and result.stdout.strip():
+                return result.stdout.strip()
+        initdb = shutil.which("initdb")
+        if initdb:
+            return os.path.dirname(initdb)
+        raise RuntimeError("❌ PostgreSQL binaries not found - set PG_BIN to the directory containing initdb")
+
+    @staticmethod
+    def _free_port() -> int:
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            return sock.getsockname()[1]
+
+    def _bin(self, name: str) -> str:
+        return os.path.join(self.bin_dir, name)
+
+    @property
+    def data_dir(self) -> str:
+        return os.path.join(self.base_dir, "data")
+
+    @property
+    def connect_kwargs(self) -> dict:
+        """asyncpg.connect()/create_pool() keyword arguments (unix socket, no SSL)"""
+        return {
+            "host": self.base_dir,
+            "port": self.port,
+            "user": "postgres",
+            "database": "postgres",
+        }
+
+    def start(self) -> "LocalPostgres":
+        """initdb + pg_ctl start"""
+        if hasattr(os, "geteuid") and os.geteuid() == 0:
+            raise RuntimeError("❌ initdb cannot run as root - run the benchmark as a normal user")
+
+        self.base_dir = tempfile.mkdtemp(prefix="driver-db-bench-")
+        print(f"🐘 initdb in {self.base_dir} (port {self.port})")
+        subprocess.run(
+            [self._bin("initdb"), "-D", self.data_dir, "-U", "postgres", "-A", "trust", "--no-sync"],
+            check=True,
+            capture_output=True
+        )
+        subprocess.run(
+            [
+                self._bin("pg_ctl"), "-D", self.data_dir, "-w",
+                "-l", os.path.join(self.base_dir, "postgres.log"),
+                "-o", f"-p {self.port} -k {self.base_dir} -c listen_addresses='' -c fsync=off",
+                "start"
+            ],
+            check=True,
+            capture_output=True
+        )
+        print("✅ Local PostgreSQL started")
+        return self
+
+    def stop(self):
+        """pg_ctl stop and remove the cluster"""
+        if not self.base_dir:
+            return
+        subprocess.run(
+            [self._bin("pg_ctl"), "-D", self.data_dir, "-m", "fast", "-w", "stop"],
+            capture_output=True
+        )
+        shutil.rmtree(self.base_dir, ignore_errors=True)
+        self.base_dir = None
+        print("🛑 Local PostgreSQL stopped and removed")
+
+    async def apply_migrations(self, conn: asyncpg.Connection):
+        """Run database/migrations.sql"""
+        await conn.execute(MIGRATIONS_FILE.read_text(encoding="utf-8"))
+        print(f"✅ Applied {MIGRATIONS_FILE.name}")
+
+    def __enter__(self) -> "LocalPostgres":
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
@@ -0,0 +1,357 @@
+"""
+Query-plan regression check for the SQL issued by DatabaseService.
+
+Starts a throwaway local PostgreSQL (see local_postgres.py), applies
+database/migrations.sql, loads a large synthetic history and then calls every
+DatabaseService method once. Each statement is run through
+EXPLAIN (ANALYZE, BUFFERS) right before it executes (inside a savepoint that is
+rolled back) and fails the check if it
+
+  * uses a Seq Scan on one of the large tables, or
+  * takes longer than its time budget (trigger/cascade time included).
+
+Usage (from backend/, as a non-root user):
+    python -m benchmarks.query_plans
+    python -m benchmarks.query_plans --weeks 260 --drivers 400 --budget-ms 25 --verbose
+
+Exit status is 1 if any statement fails.
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import sys
+import time
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(BACKEND_DIR))
+# Settings require DATABASE_URL at import time; the check connects on its own
+os.environ.setdefault("DATABASE_URL", "postgresql://benchmark@localhost/benchmark")
+
+import asyncpg  # noqa: E402
+
+from benchmarks.local_postgres import LocalPostgres  # noqa: E402
+from database.connection import init_json_codecs  # noqa: E402
+from services.database_service import DatabaseService, invalidate_availability_cache  # noqa: E402
+
+# Tables that grow by hundreds of rows per week - a Seq Scan on these is a regression.
+# weekly_stats and upload_history get one row per week/upload, so the planner rightly
+# scans them whole even after years of history.
+LARGE_TABLES = {'routes', 'driver_availability', 'fixed_assignments'}
+
+# Statements that legitimately read a whole large table, keyed by a substring of their SQL
+SEQ_SCAN_ALLOWED = {
+    "SELECT week_start FROM weekly_stats": "refresh of every stored week",
+    "SELECT COALESCE(MAX(": "reset_sequences on an empty/truncated table",
+}
+
+# Per-method time budgets (ms) for statements that touch many rows by design
+BUDGET_OVERRIDES_MS = {
+    'refresh_week_stats(all)': 500,
+    'mark_drivers_unavailable_for_holidays': 100,
+    'delete_driver': 200,
+}
+
+SYNTHETIC_HISTORY_SQL = """
+    INSERT INTO drivers (name, details)
+    SELECT 'Driver ' || lpad(n::text, 4, '0'),
+           jsonb_build_object('type', 'full_time', 'monthly_hours_target', '174:00')
+    FROM generate_series(1, $1::int) AS n;
+
+    INSERT INTO routes (date, route_name, details, day_of_week)
+    SELECT d::date, (400 + n)::text,
+           jsonb_build_object('type', 'regular', 'duration_hours', 8.5, 'season', 'summer',
+                              'school_status', 'mit_schule'),
+           to_char(d, 'FMDay')
+    FROM generate_series($2::date, $3::date, interval '1 day') AS d,
+         generate_series(1, $4::int) AS n;
+
+    INSERT INTO driver_availability (driver_id, date, available, notes)
+    SELECT driver_id, d::date, (driver_id + extract(doy FROM d)::int) % 11 <> 0, 'Available'
+    FROM drivers, generate_series($2::date, $3::date, interval '1 day') AS d;
+
+    INSERT INTO fixed_assignments (driver_id, route_id, date)
+    SELECT 1 + (r.route_id % $1::int), r.route_id, r.date
+    FROM routes r
+    WHERE r.route_id % 3 = 0;
+
+    INSERT INTO upload_history (filename, week_start, action, status, file_hash, depot, unavailable_drivers)
+    SELECT 'plan_' || w::date || '.xlsm', w::date, 'replace', 'success', md5(w::text), NULL, '[]'::jsonb
+    FROM generate_series($2::date, $3::date, interval '7 days') AS w;
+
+    INSERT INTO weekly_stats (week_start)
+    SELECT w::date FROM generate_series($2::date, $3::date, interval '7 days') AS w;
+"""
+
+
+class ExplainingConnection:
+    """
+    Connection wrapper that EXPLAIN ANALYZEs every statement before running it.
+
+    The EXPLAIN runs in a savepoint that is rolled back, so writes are measured
+    against the same state and then executed for real.
+    """
+
+    EXPLAINED = ('execute', 'fetch', 'fetchval', 'fetchrow')
+
+    def __init__(self, conn: asyncpg.Connection):
+        self._conn = conn
+        self.label = ''
+        self.results: List[Dict[str, Any]] = []
+
+    def __getattr__(self, name):
+        attr = getattr(self._conn, name)
+        if name not in self.EXPLAINED:
+            return attr
+
+        async def explained(query, *args, **kwargs):
+            await self._explain(query, args)
+            return await attr(query, *args, **kwargs)
+        return explained
+
+    async def _explain(self, query: str, args: tuple):
+        statement = query.strip().rstrip(';')
+        if statement.upper().startswith('TRUNCATE'):
+            return  # Not explainable
+        try:
+            async with self._conn.transaction():
+                rows = await self._conn.fetch(
+                    f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {statement}", *args
+                )
+                raise _Rollback(rows[0][0])
+        except _Rollback as rollback:
+            plan = rollback.plan
+        except asyncpg.PostgresError:
+            return  # The real statement fails the same way (and the service handles it)
+        # Decoded by the json codec, or raw text without it
+        plan = (plan if isinstance(plan, list) else json.loads(plan))[0]
+        self.results.append({
+            'label': self.label,
+            'query': statement,
+            'plan': plan,
+        })
+
+
+class _Rollback(Exception):
+    def __init__(self, plan):
+        self.plan = plan
+
+
+def _walk(node: Dict[str, Any]):
+    yield node
+    for child in node.get('Plans', []):
+        yield from _walk(child)
+
+
+def evaluate(result: Dict[str, Any], budget_ms: float) -> Dict[str, Any]:
+    """Seq scans on large tables and total time (execution + triggers) against the budget"""
+    plan = result['plan']
+    seq_scans = sorted({
+        node['Relation Name']
+        for node in _walk(plan['Plan'])
+        if node['Node Type'] == 'Seq Scan' and node.get('Relation Name') in LARGE_TABLES
+    })
+    allowed = next((reason for marker, reason in SEQ_SCAN_ALLOWED.items() if marker in result['query']), None)
+    trigger_ms = sum(trigger.get('Time', 0.0) for trigger in plan.get('Triggers', []))
+    total_ms = plan['Execution Time'] + trigger_ms
+    budget = BUDGET_OVERRIDES_MS.get(result['label'], budget_ms)
+
+    problems = []
+    if seq_scans and not allowed:
+        problems.append(f"Seq Scan on {', '.join(seq_scans)}")
+    if total_ms > budget:
+        problems.append(f"{total_ms:.1f}ms > budget {budget:.0f}ms")
+    return {
+        **result,
+        'total_ms': total_ms,
+        'budget_ms': budget,
+        'seq_scans': seq_scans,
+        'problems': problems,
+    }
+
+
+async def load_history(conn: asyncpg.Connection, first_week: date, weeks: int, drivers: int, routes_per_day: int):
+    last_day = first_week + timedelta(days=7 * weeks - 1)
+    start = time.perf_counter()
+    # Multi-statement strings cannot take parameters - inline the (trusted) values
+    sql = (SYNTHETIC_HISTORY_SQL
+           .replace('$1::int', str(drivers))
+           .replace('$2::date', f"'{first_week}'::date")
+           .replace('$3::date', f"'{last_day}'::date")
+           .replace('$4::int', str(routes_per_day)))
+    await conn.execute(sql)
+    await conn.execute("ANALYZE")
+    counts = {
+        table: await conn.fetchval(f"SELECT COUNT(*) FROM {table}")
+        for table in ('drivers', 'routes', 'driver_availability', 'fixed_assignments', 'upload_history')
+    }
+    print(f"📦 Synthetic history: {weeks} weeks from {first_week} in {time.perf_counter() - start:.1f}s")
+    print("   " + ", ".join(f"{table}={count:,}" for table, count in counts.items()))
+
+
+async def run_scenario(conn: ExplainingConnection, week: date):
+    """Call every DatabaseService method once, labelling the statements it issues"""
+    service = DatabaseService(conn)
+
+    async def call(label: str, method, *args):
+        conn.label = label
+        invalidate_availability_cache()  # Cache hits would skip the SQL
+        return await method(*args)
+
+    day = week + timedelta(days=2)
+    driver = await call('get_driver_by_name', service.get_driver_by_name, 'Driver 0001')
+    driver_id = driver['driver_id']
+    route = (await call('get_routes_for_week', service.get_routes_for_week, week))[0]
+
+    # Reads
+    await call('get_driver_by_id', service.get_driver_by_id, driver_id)
+    await call('get_all_drivers', service.get_all_drivers)
+    await call('get_driver_names', service.get_driver_names)
+    await call('get_routes_preview', service.get_routes_preview, week, 10)
+    await call('get_routes_json_for_week', service.get_routes_json_for_week, week)
+    await call('get_drivers_json', service.get_drivers_json, week)
+    await call('get_availability_json_for_week', service.get_availability_json_for_week, week)
+    await call('get_week_snapshot', service.get_week_snapshot, week)
+    await call('get_availability_for_week', service.get_availability_for_week, week)
+    await call('get_fixed_assignments_for_week', service.get_fixed_assignments_for_week, week)
+    month_end = week + timedelta(days=30)
+    for kind in ('routes', 'availability', 'fixed_assignments'):
+        _, cursor = await call(f'get_range_page({kind})', service.get_range_page, kind, week, month_end, None, 500)
+        await call(f'get_range_page({kind}, after)', service.get_range_page, kind, week, month_end, cursor, 500)
+    await call('get_route_by_name_and_date', service.get_route_by_name_and_date, route['route_name'], route['date'])
+    await call('get_route_by_id', service.get_route_by_id, route['route_id'])
+    availability = await conn.fetchval(
+        "SELECT id FROM driver_availability WHERE driver_id = $1 AND date = $2", driver_id, day
+    )
+    await call('get_availability_by_id', service.get_availability_by_id, availability)
+    assignment = await conn.fetchval("SELECT id FROM fixed_assignments WHERE date = $1 LIMIT 1", week)
+    await call('get_fixed_assignment_by_id', service.get_fixed_assignment_by_id, assignment)
+    await call('get_data_version', service.get_data_version)
+    await call('bump_data_version', service.bump_data_version)
+    await call('get_week_stats', service.get_week_stats, week)
+    await call('get_week_stats(lazy)', service.get_week_stats, week + timedelta(days=3))
+    await call('refresh_week_stats(all)', service.refresh_week_stats)
+    await call('find_reusable_upload', service.find_reusable_upload, 'no-such-hash', week, 'replace', None, [])
+    await call('lock_plan_load', service.lock_plan_load)  # Autocommit: taken and released at once
+
+    # Single-row writes
+    await call('upsert_driver', service.upsert_driver, {'name': 'Driver 0001', 'details': {'type': 'part_time'}})
+    await call('update_driver', service.update_driver, driver_id, {'details': {'employment_percentage': 80}})
+    new_route = await call('create_route', service.create_route,
+                           {'date': day, 'route_name': 'PLAN', 'details': {}, 'day_of_week': 'Wednesday'})
+    await call('update_route', service.update_route, new_route, {'details': {'location': 'Depot'}})
+    await call('create_fixed_assignment', service.create_fixed_assignment,
+               {'driver_id': driver_id, 'route_id': new_route, 'date': day})
+    await call('create_availability', service.create_availability,
+               {'driver_id': driver_id, 'date': day, 'available': False, 'notes': 'Urlaub'})
+    await call('update_availability_record', service.update_availability_record, availability, {'notes': 'Krank'})
+    await call('mark_drivers_unavailable_for_holidays', service.mark_drivers_unavailable_for_holidays,
+               [{'date': day, 'name': 'Feiertag'}])
+    await call('delete_route', service.delete_route, new_route)
+    await call('delete_fixed_assignment', service.delete_fixed_assignment, assignment)
+
+    # Batch writes (upload pipeline)
+    await call('upsert_drivers_batch', service.upsert_drivers_batch,
+               [{'name': f'Driver {n:04d}', 'details': {}} for n in range(1, 51)])
+    routes = await call('create_routes_batch', service.create_routes_batch,
+                        [{'date': day, 'route_name': f'B{n}', 'details': {}} for n in range(50)])
+    await call('create_fixed_assignments_batch', service.create_fixed_assignments_batch,
+               [{'driver_id': driver_id, 'route_id': route_id, 'date': day} for route_id in list(routes.values())[:20]])
+    await call('create_availability_batch', service.create_availability_batch,
+               [{'driver_id': driver_id, 'date': week + timedelta(days=n), 'available': True, 'notes': 'Available'}
+                for n in range(7)])
+    await call('apply_availability_batch', service.apply_availability_batch,
+               [{'driver_id': driver_id, 'date': week + timedelta(days=n), 'available': False, 'notes': 'Urlaub'}
+                for n in range(3)],
+               [{'id': availability, 'notes': None}],
+               [availability + 1000000])
+
+    # Upload history
+    upload_id = await call('start_upload_history', service.start_upload_history,
+                           'plan.xlsm', week, 'replace', None, 'hash', [])
+    await call('complete_upload_history', service.complete_upload_history,
+               upload_id, {'drivers': 1}, {'success': True}, 1)
+    await call('fail_upload_history', service.fail_upload_history, upload_id, 'boom')
+
+    # Notifications
+    notification = {'id': 'plan-check', 'driver_name': 'Driver 0001', 'date': str(day), 'reason': 'Urlaub'}
+    await call('create_notification', service.create_notification, notification)
+    await call('create_notification(duplicate)', service.create_notification, {**notification, 'id': 'plan-check-2'})
+    await call('get_notifications', service.get_notifications, datetime.utcnow() - timedelta(days=30))
+    await call('resolve_notification', service.resolve_notification, 'plan-check')
+    await call('purge_resolved_notifications', service.purge_resolved_notifications, datetime.utcnow())
+
+    # Week deletes and cascades
+    await call('delete_fixed_assignments_for_week', service.delete_fixed_assignments_for_week, week)
+    await call('delete_availability_for_week', service.delete_availability_for_week, week)
+    await call('delete_routes_for_week', service.delete_routes_for_week, week)
+    await call('delete_driver', service.delete_driver, driver_id)
+    await call('reset_sequences', service.reset_sequences)
+
+
+def print_report(results: List[Dict[str, Any]], verbose: bool):
+    print(f"\n   {'method':<40}{'ms':>9}{'budget':>8}  result")
+    for result in results:
+        status = '❌ ' + '; '.join(result['problems']) if result['problems'] else '✅'
+        print(f"   {result['label']:<40}{result['total_ms']:>9.2f}{result['budget_ms']:>8.0f}  {status}")
+        if verbose or result['problems']:
+            first_line = ' '.join(result['query'].split())[:110]
+            print(f"      {first_line}")
+            for node in _walk(result['plan']['Plan']):
+                if node.get('Relation Name') or node.get('Index Name'):
+                    print(f"         {node['Node Type']:<22} {node.get('Relation Name', '')} {node.get('Index Name', '')}")
+
+
+async def check(args) -> List[Dict[str, Any]]:
+    with LocalPostgres(bin_dir=args.pg_bin) as postgres:
+        conn = await asyncpg.connect(**postgres.connect_kwargs)
+        try:
+            await init_json_codecs(conn)
+            await postgres.apply_migrations(conn)
+            await load_history(conn, args.first_week, args.weeks, args.drivers, args.routes_per_day)
+
+            explaining = ExplainingConnection(conn)
+            week = args.first_week + timedelta(days=7 * (args.weeks // 2))
+            tx = conn.transaction()
+            await tx.start()
+            try:
+                # The service logs every step - keep the report readable
+                with contextlib.redirect_stdout(io.StringIO()):
+                    await run_scenario(explaining, week)
+            finally:
+                await tx.rollback()
+        finally:
+            await conn.close()
+
+    results = [evaluate(result, args.budget_ms) for result in explaining.results]
+    print_report(results, args.verbose)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="EXPLAIN ANALYZE every DatabaseService statement on synthetic history")
+    parser.add_argument("--weeks", type=int, default=156, help="Weeks of synthetic history (default: 156)")
+    parser.add_argument("--drivers", type=int, default=300, help="Synthetic drivers (default: 300)")
+    parser.add_argument("--routes-per-day", type=int, default=60, help="Synthetic routes per day (default: 60)")
+    parser.add_argument("--first-week", type=date.fromisoformat, default=date(2023, 1, 2),
+                        help="Monday the history starts on (default: 2023-01-02)")
+    parser.add_argument("--budget-ms", type=float, default=50.0, help="Default time budget per statement")
+    parser.add_argument("--pg-bin", default=None, help="Directory with initdb/pg_ctl (default: PG_BIN or PATH)")
+    parser.add_argument("--verbose", action="store_true", help="Print the scanned relations of every plan")
+    args = parser.parse_args()
+
+    results = asyncio.run(check(args))
+    failed = [result for result in results if result['problems']]
+    if failed:
+        print(f"\n❌ {len(failed)} of {len(results)} statements failed the plan check")
+        sys.exit(1)
+    print(f"\n✅ All {len(results)} statements passed the plan check")
+
+
+if __name__ == "__main__":
+    main()
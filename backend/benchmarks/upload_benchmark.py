@@ -0,0 +1,176 @@
+"""
+End-to-end upload benchmark against a throwaway local PostgreSQL.
+
+Starts a temp cluster (initdb), applies database/migrations.sql and runs the
+upload pipeline for each workbook in backend/uploads, plus synthetic variants
+with every driver and route duplicated --scale times. Reports wall time,
+rows/s and statements per phase.
+
+Usage (from backend/, as a non-root user):
+    python -m benchmarks.upload_benchmark --scale 1 10 50
+    PG_BIN=/usr/lib/postgresql/16/bin python -m benchmarks.upload_benchmark --workbooks "uploads/*Bachertest*"
+"""
+import argparse
+import asyncio
+import contextlib
+import glob
+import io
+import json
+import os
+import sys
+import time
+from datetime import date
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Tuple
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(BACKEND_DIR))
+# Settings require DATABASE_URL at import time; the benchmark connects on its own
+os.environ.setdefault("DATABASE_URL", "postgresql://benchmark@localhost/benchmark")
+
+import asyncpg  # noqa: E402
+
+from benchmarks.local_postgres import LocalPostgres  # noqa: E402
+from database.connection import init_json_codecs  # noqa: E402
+from services.excel_parser import ExcelParser  # noqa: E402
+from services.upload_pipeline import UploadPipeline  # noqa: E402
+
+
+class ScaledExcelParser(ExcelParser):
+    """ExcelParser that emits `scale` renamed copies of every driver, route, assignment and 'frei' record"""
+
+    scale = 1
+
+    def iter_batches(self, week_start: date, batch_size: int = 500,
+                     keep_data: bool = False) -> Iterator[Tuple[str, Any]]:
+        for kind, records in super().iter_batches(week_start, batch_size, keep_data):
+            yield kind, records
+            if kind in ('public_holidays', 'school_days'):
+                continue
+            for copy in range(1, self.scale):
+                yield kind, [self._copy_record(kind, record, copy) for record in records]
+
+    @staticmethod
+    def _copy_record(kind: str, record: Dict[str, Any], copy: int) -> Dict[str, Any]:
+        scaled = dict(record)
+        if kind == 'drivers':
+            scaled['name'] = f"{record['name']} #{copy}"
+        elif kind == 'routes':
+            scaled['route_name'] = f"{record['route_name']}#{copy}"
+        elif kind == 'fixed_assignments':
+            scaled['driver_name'] = f"{record['driver_name']} #{copy}"
+            scaled['route_name'] = f"{record['route_name']}#{copy}"
+        elif kind == 'driver_availability':
+            scaled['driver_name'] = f"{record['driver_name']} #{copy}"
+        return scaled
+
+
+class CountingConnection:
+    """Connection wrapper counting statements sent to the server"""
+
+    COUNTED = ('execute', 'executemany', 'fetch', 'fetchval', 'fetchrow')
+
+    def __init__(self, conn: asyncpg.Connection):
+        self._conn = conn
+        self.statements = 0
+
+    def __getattr__(self, name):
+        attr = getattr(self._conn, name)
+        if name not in self.COUNTED:
+            return attr
+
+        async def counted(*args, **kwargs):
+            self.statements += 1
+            return await attr(*args, **kwargs)
+        return counted
+
+
+async def run_once(conn: asyncpg.Connection, workbook: str, week_start: date, scale: int) -> Dict[str, Any]:
+    """Run one upload, return timings and counters"""
+    parser_class = type('ScaledParser', (ScaledExcelParser,), {'scale': scale})
+    pipeline_class = type('BenchmarkPipeline', (UploadPipeline,), {'parser_class': parser_class})
+
+    counting = CountingConnection(conn)
+    pipeline = pipeline_class(counting, week_start)
+
+    start = time.perf_counter()
+    # The pipeline and parser log every step - keep the report readable
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = await pipeline.run(workbook)
+    wall = time.perf_counter() - start
+
+    return {
+        'workbook': os.path.basename(workbook),
+        'scale': scale,
+        'wall_seconds': wall,
+        'rows': sum(result['records_created'].values()),
+        'statements': counting.statements,
+        'records_created': result['records_created'],
+        'phases': result['stats'],
+    }
+
+
+def print_report(run: Dict[str, Any]):
+    """Print one run as a table"""
+    rows_per_second = run['rows'] / run['wall_seconds'] if run['wall_seconds'] else 0
+    print(f"\n📄 {run['workbook']}  ×{run['scale']}")
+    print(
+        f"   wall {run['wall_seconds']:.3f}s | {run['rows']} rows | "
+        f"{rows_per_second:,.0f} rows/s | {run['statements']} statements"
+    )
+    print(f"   {'phase':<22}{'seconds':>10}{'rows':>10}{'rows/s':>12}{'statements':>12}")
+    for phase, stats in run['phases'].items():
+        phase_rate = stats['rows'] / stats['seconds'] if stats['seconds'] and stats['rows'] else 0
+        print(
+            f"   {phase:<22}{stats['seconds']:>10.3f}{stats['rows']:>10}"
+            f"{phase_rate:>12,.0f}{stats['statements']:>12}"
+        )
+
+
+async def benchmark(args) -> List[Dict[str, Any]]:
+    workbooks = sorted(glob.glob(args.workbooks))
+    if args.limit:
+        workbooks = workbooks[:args.limit]
+    if not workbooks:
+        raise SystemExit(f"❌ No workbooks match {args.workbooks}")
+
+    runs = []
+    with LocalPostgres(bin_dir=args.pg_bin) as postgres:
+        conn = await asyncpg.connect(**postgres.connect_kwargs)
+        try:
+            await init_json_codecs(conn)  # Same codecs as the app's pool
+            await postgres.apply_migrations(conn)
+            for workbook in workbooks:
+                for scale in args.scale:
+                    for _ in range(args.repeat):
+                        run = await run_once(conn, workbook, args.week_start, scale)
+                        print_report(run)
+                        runs.append(run)
+        finally:
+            await conn.close()
+    return runs
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Upload pipeline benchmark against a local PostgreSQL")
+    parser.add_argument("--workbooks", default=str(BACKEND_DIR / "uploads" / "*.xls*"),
+                        help="Glob of workbooks to upload (default: backend/uploads/*.xls*)")
+    parser.add_argument("--limit", type=int, default=0, help="Only use the first N workbooks")
+    parser.add_argument("--week-start", type=date.fromisoformat, default=date(2025, 7, 7),
+                        help="Monday to upload (default: 2025-07-07)")
+    parser.add_argument("--scale", type=int, nargs="+", default=[1, 10],
+                        help="Synthetic scale factors: drivers/routes are duplicated N times")
+    parser.add_argument("--repeat", type=int, default=1, help="Runs per workbook and scale")
+    parser.add_argument("--pg-bin", default=None, help="Directory with initdb/pg_ctl (default: PG_BIN or PATH)")
+    parser.add_argument("--json", default=None, help="Also write the results to this JSON file")
+    args = parser.parse_args()
+
+    runs = asyncio.run(benchmark(args))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(runs, f, indent=2)
+        print(f"\n💾 Results written to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
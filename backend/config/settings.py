@@ -11,19 +11,70 @@ class Settings(BaseSettings):
     DATABASE_URL: str
     SUPABASE_URL: Optional[str] = None
     SUPABASE_KEY: Optional[str] = None
+    # "transaction_pooler" (Supabase port 6543, no prepared statements) or
+    # "session" (direct / session-pooled Postgres, prepared statements enabled)
+    DB_CONNECTION_MODE: str = "transaction_pooler"
+    DB_STATEMENT_CACHE_SIZE: int = 100  # Only used in "session" mode
+    # Cross-worker cache invalidation via LISTEN/NOTIFY. LISTEN needs a session,
+    # so behind the transaction pooler set LISTEN_DATABASE_URL to a direct/session URL.
+    ENABLE_CACHE_INVALIDATION_LISTENER: bool = False
+    CACHE_INVALIDATION_CHANNEL: str = "cache_invalidation"
+    LISTEN_DATABASE_URL: Optional[str] = None
+    DB_READ_CONCURRENCY: int = 4  # Connections per request for independent reads (1 = sequential)
+    DB_FAN_OUT_ACQUIRE_TIMEOUT: float = 0.2  # seconds to wait for an extra pool connection
+    # Live events (upload progress): "memory" (this worker only) or "postgres" (NOTIFY to all
+    # workers; uses the LISTEN connection, see LISTEN_DATABASE_URL)
+    EVENT_BUS_BACKEND: str = "memory"
+    EVENT_BUS_CHANNEL: str = "app_events"
+    EVENT_REPLAY_SIZE: int = 500  # Events kept per topic for reconnecting clients (Last-Event-ID)
+    EVENT_SUBSCRIBER_QUEUE_SIZE: int = 256  # Events buffered per slow subscriber before dropping the oldest
+    EVENT_KEEPALIVE_SECONDS: float = 15.0  # SSE comment sent when nothing happened for this long
+    EVENT_STREAM_TOKEN_SECONDS: int = 300  # Lifetime of the ?token= an EventSource opens the stream with
     
     # Application
     DEBUG: bool = False
     UPLOAD_DIR: str = "./uploads"
     MAX_FILE_SIZE: int = 10485760  # 10MB
+    MAX_UPLOAD_FORM_OVERHEAD: int = 262144  # Multipart framing + form fields allowed on top of MAX_FILE_SIZE
+    UPLOAD_CHUNK_SIZE: int = 262144  # Bytes per read when saving an upload
+    UPLOAD_BATCH_SIZE: int = 500  # Records per batched INSERT
+    UPLOAD_QUEUE_SIZE: int = 4  # Parsed batches buffered between parser and DB writer
+    UPLOAD_JOB_WORKERS: int = 2  # Background uploads processed at once
+    UPLOAD_JOB_QUEUE_SIZE: int = 10  # Background uploads waiting; more are rejected with 503
+    UPLOAD_JOB_HISTORY: int = 100  # Finished jobs kept in memory for status polling
+    AVAILABILITY_CACHE_SIZE: int = 64  # Weeks kept in the availability cache
+    AVAILABILITY_CACHE_TTL: float = 5.0  # seconds; safe to raise with the invalidation listener on
+    NOTIFICATION_INDEX_TTL: float = 5.0  # seconds before the in-process notification index reloads
+    NOTIFICATION_RETENTION_DAYS: int = 30  # Resolved notifications are deleted after this long
+    NOTIFICATION_PURGE_INTERVAL: float = 3600.0  # seconds between retention purges
+    NOTIFICATION_WAIT_MAX: float = 25.0  # Longest long-poll wait (?wait=) on the notification feed
+    RANGE_PAGE_SIZE: int = 500  # Default rows per page of the /weekly/range endpoints
+    RANGE_PAGE_MAX: int = 5000  # Largest page a client may ask for
     
     # CORS
     FRONTEND_URL: str = "http://localhost:3000"
     
+    # WhatsApp replies (POST /notifications/reply) go through the reply_outbox table
+    REPLY_ENDPOINT: str = "http://localhost:4001/api/send-reply"
+    REPLY_TIMEOUT: float = 10.0  # seconds per attempt
+    REPLY_CONCURRENCY: int = 4  # Replies in flight at once (also the keep-alive pool size)
+    REPLY_MAX_ATTEMPTS: int = 6  # Then the reply is marked failed
+    REPLY_RETRY_BASE: float = 2.0  # seconds before the first retry, doubled per attempt
+    REPLY_RETRY_MAX: float = 300.0  # Longest wait between attempts
+    REPLY_POLL_INTERVAL: float = 5.0  # seconds between outbox checks when nothing wakes the worker
+    
     # Google Sheets Integration
     GOOGLE_CREDENTIALS_FILE: str = "service-account-credentials.json"
     GOOGLE_SHEET_NAME: str = "Bachertest"
     ENABLE_GOOGLE_SHEETS_SYNC: bool = True
+    GOOGLE_SHEETS_WARMUP: bool = True  # Load credentials in the background after startup (else on the first sync)
+    GOOGLE_HTTP_TIMEOUT: float = 60.0  # seconds per Drive API request
+    GOOGLE_SHEET_ID_CACHE_FILE: str = "google_sheet_ids.json"  # Sheet name -> file id, kept across restarts
+    GOOGLE_SHEET_ID_TTL: float = 86400.0  # seconds before a cached file id is looked up again
+    SHEETS_SYNC_MAX_ATTEMPTS: int = 4  # Background sync attempts before giving up
+    SHEETS_SYNC_RETRY_BASE: float = 5.0  # seconds before the first retry, doubled per attempt
+    SHEETS_SYNC_RETRY_MAX: float = 120.0  # Longest wait between attempts
+    SHEETS_SYNC_HISTORY: int = 100  # Finished syncs kept in memory for status polling
     API_KEY: Optional[str] = None
     
     class Config:
@@ -1,13 +1,44 @@
+import asyncio
 import asyncpg
-from typing import Optional
+import orjson
+from typing import Any, Callable, Dict, List, Optional
 from config.settings import settings
 
 
+def _encode_json(value: Any) -> str:
+    return orjson.dumps(value, default=str).decode()
+
+
+async def init_json_codecs(connection: asyncpg.Connection):
+    """Encode/decode json and jsonb columns as Python objects (pass dicts, get dicts)"""
+    for type_name in ('json', 'jsonb'):
+        await connection.set_type_codec(
+            type_name,
+            encoder=_encode_json,
+            decoder=orjson.loads,
+            schema='pg_catalog',
+            format='text'
+        )
+
+
+class PreparedStatementConnection(asyncpg.Connection):
+    """Connection that keeps the hot statements prepared at init (session mode only)"""
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.prepared_statements = {}
+
+
 class DatabaseManager:
     """Manages database connection pool"""
     
     def __init__(self):
         self.pool: Optional[asyncpg.Pool] = None
+        # Dedicated LISTEN connection (outside the pool, survives transaction pooling)
+        self.listener: Optional[asyncpg.Connection] = None
+        self._listeners: Dict[str, List[Callable]] = {}
+        self._listener_task: Optional[asyncio.Task] = None
+        self._on_listener_reconnect: Optional[Callable[[], None]] = None
     
     async def connect(self):
         """Initialize database connection pool"""
@@ -22,6 +53,20 @@ class DatabaseManager:
         print(f"🔌 Connecting to database...")
         print(f"   Host: {settings.DATABASE_URL.split('@')[1].split('/')[0] if '@' in settings.DATABASE_URL else 'unknown'}")
         
+        session_mode = settings.DB_CONNECTION_MODE == "session"
+        if session_mode:
+            # Direct or session-pooled Postgres: a connection keeps its prepared statements
+            mode_options = {
+                'statement_cache_size': settings.DB_STATEMENT_CACHE_SIZE,
+                'connection_class': PreparedStatementConnection
+            }
+        else:
+            if settings.DB_CONNECTION_MODE != "transaction_pooler":
+                print(f"⚠️  Unknown DB_CONNECTION_MODE '{settings.DB_CONNECTION_MODE}' - using transaction_pooler")
+            mode_options = {
+                'statement_cache_size': 0  # Disable prepared statements for Supabase pooler
+            }
+        
         try:
             self.pool = await asyncpg.create_pool(
                 settings.DATABASE_URL,
@@ -32,10 +77,12 @@ class DatabaseManager:
                     'jit': 'off'  # Disable JIT compilation for faster query planning
                 },
                 ssl='require',
-                statement_cache_size=0  # Disable prepared statements for Supabase pooler
+                init=self._init_connection,
+                **mode_options
             )
             print("✅ Database connection pool created")
             print(f"   Command timeout: 120 seconds")
+            print(f"   Connection mode: {'session (prepared statements)' if session_mode else 'transaction_pooler'}")
             
             # Test the connection
             async with self.pool.acquire() as conn:
@@ -59,6 +106,69 @@ class DatabaseManager:
             
             raise
     
+    async def _init_connection(self, connection: asyncpg.Connection):
+        """Pool init hook: JSON codecs, then prepare the hot statements once per connection (session mode)"""
+        await init_json_codecs(connection)
+        from services.database_service import DatabaseService
+        await DatabaseService.prepare_hot_statements(connection)
+    
+    # ============= LISTEN/NOTIFY =============
+    
+    async def start_listener(self, on_reconnect: Optional[Callable[[], None]] = None):
+        """
+        Open the dedicated LISTEN connection.
+        
+        on_reconnect runs after the connection was lost and re-established, since
+        notifications sent in between are gone.
+        """
+        self._on_listener_reconnect = on_reconnect
+        await self._open_listener()
+    
+    async def add_listener(self, channel: str, callback: Callable):
+        """LISTEN on channel; callback(connection, pid, channel, payload). Kept across reconnects"""
+        self._listeners.setdefault(channel, []).append(callback)
+        if self.listener and not self.listener.is_closed():
+            await self.listener.add_listener(channel, callback)
+    
+    async def _open_listener(self):
+        dsn = settings.LISTEN_DATABASE_URL or settings.DATABASE_URL
+        self.listener = await asyncpg.connect(dsn, ssl='require', statement_cache_size=0)
+        self.listener.add_termination_listener(self._listener_terminated)
+        for channel, callbacks in self._listeners.items():
+            for callback in callbacks:
+                await self.listener.add_listener(channel, callback)
+        print(f"👂 Listening for notifications on {', '.join(self._listeners) or 'no channels yet'}")
+    
+    def _listener_terminated(self, connection: asyncpg.Connection):
+        if self.listener is not connection:
+            return  # Closed on purpose by stop_listener()
+        print("⚠️  LISTEN connection lost - reconnecting")
+        self.listener = None
+        self._listener_task = asyncio.get_running_loop().create_task(self._reconnect_listener())
+    
+    async def _reconnect_listener(self):
+        delay = 1.0
+        while True:
+            try:
+                await self._open_listener()
+                break
+            except Exception as e:
+                print(f"⚠️  LISTEN reconnect failed ({e}) - retrying in {delay:.0f}s")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 30.0)
+        if self._on_listener_reconnect:
+            self._on_listener_reconnect()
+    
+    async def stop_listener(self):
+        """Close the LISTEN connection and stop reconnecting"""
+        if self._listener_task and not self._listener_task.done():
+            self._listener_task.cancel()
+        self._listener_task = None
+        listener, self.listener = self.listener, None
+        if listener and not listener.is_closed():
+            await listener.close()
+            print("✅ LISTEN connection closed")
+    
     async def disconnect(self):
         """Close database connection pool"""
         if self.pool:
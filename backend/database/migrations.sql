@@ -89,6 +89,84 @@ CREATE TABLE IF NOT EXISTS public.upload_history (
     error_message TEXT
 );
 
+-- 9. Data Version (NEW) - sequence advanced by every write to the planning tables.
+-- nextval is non-transactional and takes no row lock, so concurrent writers never wait on it.
+CREATE SEQUENCE IF NOT EXISTS public.data_version_seq;
+
+-- Current version: 0 until the first write (last_value only counts once nextval was called)
+CREATE OR REPLACE FUNCTION current_data_version()
+RETURNS BIGINT AS $$
+    SELECT CASE WHEN is_called THEN last_value ELSE 0 END FROM public.data_version_seq;
+$$ LANGUAGE sql VOLATILE;
+
+-- Earlier schema kept the version in a single-row table: continue from its value
+-- (so ETags handed out before keep changing) and drop it
+DO $$
+BEGIN
+    IF to_regclass('public.data_version') IS NOT NULL THEN
+        PERFORM setval(
+            'public.data_version_seq',
+            COALESCE((SELECT version FROM public.data_version WHERE id = 1), 0) + 1
+        );
+        DROP TABLE public.data_version;
+    END IF;
+END $$;
+
+-- 10. Weekly Stats (NEW) - /weekly/summary counts per week window, kept current by triggers (track_week_stats)
+CREATE TABLE IF NOT EXISTS public.weekly_stats (
+    week_start DATE PRIMARY KEY,
+    total_routes INTEGER NOT NULL DEFAULT 0,
+    total_drivers INTEGER NOT NULL DEFAULT 0,
+    unavailable_instances INTEGER NOT NULL DEFAULT 0,
+    fixed_assignments INTEGER NOT NULL DEFAULT 0,
+    season TEXT NOT NULL DEFAULT 'unknown',
+    school_status TEXT NOT NULL DEFAULT 'unknown',
+    refreshed_at TIMESTAMP WITHOUT TIME ZONE DEFAULT NOW()
+);
+
+-- 11. Notifications (NEW) - driver requests from the WhatsApp bridge
+CREATE TABLE IF NOT EXISTS public.notifications (
+    id TEXT PRIMARY KEY,
+    driver_name TEXT NOT NULL,
+    date TEXT NOT NULL,  -- as sent by the bridge (YYYY-MM-DD)
+    reason TEXT NOT NULL DEFAULT '',
+    actual_message TEXT,
+    whatsapp_from TEXT,
+    status TEXT NOT NULL DEFAULT 'pending',  -- 'resolved' once deleted in the UI
+    created_at TIMESTAMP WITHOUT TIME ZONE NOT NULL DEFAULT NOW(),
+    updated_at TIMESTAMP WITHOUT TIME ZONE NOT NULL DEFAULT NOW(),
+    resolved_at TIMESTAMP WITHOUT TIME ZONE
+);
+
+-- 12. Reply Outbox (NEW) - WhatsApp replies waiting to be forwarded to the bridge
+CREATE TABLE IF NOT EXISTS public.reply_outbox (
+    id SERIAL PRIMARY KEY,
+    recipient TEXT NOT NULL,
+    reply TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending' CHECK (status IN ('pending', 'sending', 'sent', 'failed')),
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at TIMESTAMP WITHOUT TIME ZONE NOT NULL DEFAULT NOW(),
+    last_error TEXT,
+    response_status INTEGER,
+    created_at TIMESTAMP WITHOUT TIME ZONE NOT NULL DEFAULT NOW(),
+    updated_at TIMESTAMP WITHOUT TIME ZONE NOT NULL DEFAULT NOW(),
+    sent_at TIMESTAMP WITHOUT TIME ZONE
+);
+
+-- Upload idempotency: identical completed uploads are answered from upload_history
+ALTER TABLE public.upload_history ADD COLUMN IF NOT EXISTS file_hash TEXT;
+ALTER TABLE public.upload_history ADD COLUMN IF NOT EXISTS depot TEXT;
+ALTER TABLE public.upload_history ADD COLUMN IF NOT EXISTS unavailable_drivers JSONB DEFAULT '[]'::jsonb;
+ALTER TABLE public.upload_history ADD COLUMN IF NOT EXISTS response JSONB;
+ALTER TABLE public.upload_history ADD COLUMN IF NOT EXISTS data_version BIGINT;
+ALTER TABLE public.upload_history ADD COLUMN IF NOT EXISTS completed_at TIMESTAMP WITHOUT TIME ZONE;
+-- Outcome of the background Google Sheets sync (see services/sheet_sync.py)
+ALTER TABLE public.upload_history ADD COLUMN IF NOT EXISTS sheets_sync JSONB;
+
+-- Notification feed cursor: a new value on every insert and update (see set_notification_seq)
+CREATE SEQUENCE IF NOT EXISTS public.notifications_seq;
+ALTER TABLE public.notifications ADD COLUMN IF NOT EXISTS seq BIGINT NOT NULL DEFAULT nextval('public.notifications_seq');
+
 -- Insert default season configuration (Austrian school calendar)
 INSERT INTO public.season_config (season_name, start_month, start_day, end_month, end_day)
 VALUES 
@@ -102,7 +180,20 @@ CREATE INDEX IF NOT EXISTS idx_driver_availability_date ON public.driver_availab
 CREATE INDEX IF NOT EXISTS idx_driver_availability_driver ON public.driver_availability(driver_id);
 CREATE INDEX IF NOT EXISTS idx_fixed_assignments_date ON public.fixed_assignments(date);
 CREATE INDEX IF NOT EXISTS idx_fixed_assignments_driver ON public.fixed_assignments(driver_id);
+-- ON DELETE CASCADE from routes looks assignments up by route_id
+CREATE INDEX IF NOT EXISTS idx_fixed_assignments_route ON public.fixed_assignments(route_id);
+-- Keyset pagination of the date-range endpoints walks (date, id)
+CREATE INDEX IF NOT EXISTS idx_routes_date_id ON public.routes(date, route_id);
+CREATE INDEX IF NOT EXISTS idx_driver_availability_date_id ON public.driver_availability(date, id);
+CREATE INDEX IF NOT EXISTS idx_fixed_assignments_date_id ON public.fixed_assignments(date, id);
 CREATE INDEX IF NOT EXISTS idx_upload_history_week ON public.upload_history(week_start);
+-- One open notification per driver and date (dedup); resolved ones are purged by age
+CREATE UNIQUE INDEX IF NOT EXISTS idx_notifications_open_key
+    ON public.notifications(driver_name, date) WHERE status <> 'resolved';
+CREATE INDEX IF NOT EXISTS idx_notifications_status_created ON public.notifications(status, created_at);
+-- Outbox workers claim due replies by status and time
+CREATE INDEX IF NOT EXISTS idx_reply_outbox_due ON public.reply_outbox(status, next_attempt_at);
+CREATE INDEX IF NOT EXISTS idx_upload_history_file_hash ON public.upload_history(file_hash, week_start);
 
 -- Create updated_at trigger function
 CREATE OR REPLACE FUNCTION update_updated_at_column()
@@ -142,4 +233,189 @@ DROP TRIGGER IF EXISTS update_school_vacation_updated_at ON public.school_vacati
 CREATE TRIGGER update_school_vacation_updated_at
     BEFORE UPDATE ON public.school_vacation_periods
     FOR EACH ROW
-    EXECUTE FUNCTION update_updated_at_column();
\ No newline at end of file
+    EXECUTE FUNCTION update_updated_at_column();
+
+-- Advance data_version_seq once per statement on any planning-table write (including TRUNCATE).
+-- DatabaseService advances it once more after every commit (DatabaseService.bump_data_version):
+-- a version taken before the commit may be paired with the old rows.
+CREATE OR REPLACE FUNCTION bump_data_version()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM nextval('public.data_version_seq');
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS bump_data_version_drivers ON public.drivers;
+CREATE TRIGGER bump_data_version_drivers
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON public.drivers
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION bump_data_version();
+
+DROP TRIGGER IF EXISTS bump_data_version_routes ON public.routes;
+CREATE TRIGGER bump_data_version_routes
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON public.routes
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION bump_data_version();
+
+DROP TRIGGER IF EXISTS bump_data_version_driver_availability ON public.driver_availability;
+CREATE TRIGGER bump_data_version_driver_availability
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON public.driver_availability
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION bump_data_version();
+
+DROP TRIGGER IF EXISTS bump_data_version_fixed_assignments ON public.fixed_assignments;
+CREATE TRIGGER bump_data_version_fixed_assignments
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON public.fixed_assignments
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION bump_data_version();
+
+-- Keep stored weekly_stats windows in step with planning-table writes by applying per-date deltas.
+-- Only windows that already have a row are touched (rows are created by uploads). Bulk loads
+-- SET LOCAL app.defer_week_stats = 'on' and refresh once before commit instead.
+CREATE OR REPLACE FUNCTION shift_week_stats(counter TEXT, added DATE[], removed DATE[])
+RETURNS VOID AS $$
+BEGIN
+    EXECUTE format(
+        'UPDATE public.weekly_stats ws
+         SET %1$I = ws.%1$I + changed.delta, refreshed_at = NOW()
+         FROM (
+             SELECT w.week_start, SUM(c.delta) AS delta
+             FROM (
+                 SELECT d, 1 FROM unnest($1::date[]) AS d
+                 UNION ALL
+                 SELECT d, -1 FROM unnest($2::date[]) AS d
+             ) AS c(date, delta)
+             JOIN public.weekly_stats w ON w.week_start > c.date - 7 AND w.week_start <= c.date
+             GROUP BY w.week_start
+         ) AS changed
+         WHERE ws.week_start = changed.week_start AND changed.delta <> 0',
+        counter
+    ) USING added, removed;
+END;
+$$ LANGUAGE plpgsql;
+
+-- TG_ARGV: [0] weekly_stats column, [1] condition for a row to count (dated tables only)
+CREATE OR REPLACE FUNCTION track_week_stats()
+RETURNS TRIGGER AS $$
+DECLARE
+    added DATE[];
+    removed DATE[];
+    touched DATE[];
+    delta BIGINT := 0;
+BEGIN
+    IF current_setting('app.defer_week_stats', true) = 'on' THEN
+        RETURN NULL;
+    END IF;
+
+    IF TG_OP = 'TRUNCATE' THEN
+        EXECUTE format('UPDATE public.weekly_stats SET %1$I = 0, refreshed_at = NOW() WHERE %1$I <> 0', TG_ARGV[0]);
+        IF TG_TABLE_NAME = 'routes' THEN
+            UPDATE public.weekly_stats SET season = 'unknown', school_status = 'unknown';
+        END IF;
+        RETURN NULL;
+    END IF;
+
+    -- drivers: every window counts all of them
+    IF TG_TABLE_NAME = 'drivers' THEN
+        IF TG_OP = 'INSERT' THEN
+            SELECT COUNT(*) INTO delta FROM new_rows;
+        ELSIF TG_OP = 'DELETE' THEN
+            SELECT -COUNT(*) INTO delta FROM old_rows;
+        END IF;
+        IF delta <> 0 THEN
+            UPDATE public.weekly_stats SET total_drivers = total_drivers + delta, refreshed_at = NOW();
+        END IF;
+        RETURN NULL;
+    END IF;
+
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        EXECUTE format('SELECT array_agg(date) FROM new_rows WHERE %s', TG_ARGV[1]) INTO added;
+    END IF;
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        EXECUTE format('SELECT array_agg(date) FROM old_rows WHERE %s', TG_ARGV[1]) INTO removed;
+    END IF;
+    PERFORM shift_week_stats(TG_ARGV[0], added, removed);
+
+    -- Season and school status come from the window's first route
+    IF TG_TABLE_NAME = 'routes' THEN
+        touched := COALESCE(added, '{}') || COALESCE(removed, '{}');
+        UPDATE public.weekly_stats ws
+        SET season = COALESCE(first_route.details->>'season', 'unknown'),
+            school_status = COALESCE(first_route.details->>'school_status', 'unknown')
+        FROM (
+            SELECT DISTINCT w.week_start
+            FROM unnest(touched) AS c(date)
+            JOIN public.weekly_stats w ON w.week_start > c.date - 7 AND w.week_start <= c.date
+        ) AS windows
+        LEFT JOIN LATERAL (
+            SELECT r.details
+            FROM public.routes r
+            WHERE r.date >= windows.week_start AND r.date < windows.week_start + 7
+            ORDER BY r.date, r.route_name
+            LIMIT 1
+        ) first_route ON TRUE
+        WHERE ws.week_start = windows.week_start;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DO $$
+DECLARE
+    tracked RECORD;
+    op TEXT;
+BEGIN
+    FOR tracked IN
+        SELECT * FROM (VALUES
+            ('drivers', 'total_drivers', 'TRUE'),
+            ('routes', 'total_routes', 'TRUE'),
+            ('driver_availability', 'unavailable_instances', 'NOT available'),
+            ('fixed_assignments', 'fixed_assignments', 'TRUE')
+        ) AS t(tbl, counter, counted)
+    LOOP
+        -- Transition tables need one trigger per event
+        FOREACH op IN ARRAY ARRAY['insert', 'update', 'delete', 'truncate'] LOOP
+            EXECUTE format('DROP TRIGGER IF EXISTS week_stats_%s_%s ON public.%I', tracked.tbl, op, tracked.tbl);
+            EXECUTE format(
+                'CREATE TRIGGER week_stats_%1$s_%2$s AFTER %3$s ON public.%1$I %4$s FOR EACH STATEMENT
+                 EXECUTE FUNCTION track_week_stats(%5$L, %6$L)',
+                tracked.tbl,
+                op,
+                upper(op),
+                CASE op
+                    WHEN 'insert' THEN 'REFERENCING NEW TABLE AS new_rows'
+                    WHEN 'update' THEN 'REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows'
+                    WHEN 'delete' THEN 'REFERENCING OLD TABLE AS old_rows'
+                    ELSE ''
+                END,
+                tracked.counter,
+                tracked.counted
+            );
+        END LOOP;
+    END LOOP;
+END $$;
+
+-- Put a notification at the end of the change feed whenever it is inserted or updated.
+-- nextval alone hands out seqs in statement order, not commit order: a poller could
+-- move its cursor past a seq whose transaction commits later and never see that row.
+-- The transaction lock (released after the commit is visible) makes the next writer
+-- wait for it, so seqs become visible in increasing order. Notification writes are
+-- single statements, so the wait is one commit at most.
+CREATE OR REPLACE FUNCTION set_notification_seq()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM pg_advisory_xact_lock(hashtext('notifications_seq'));
+    NEW.seq = nextval('public.notifications_seq');
+    IF TG_OP = 'UPDATE' THEN
+        NEW.updated_at = NOW();
+    END IF;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS set_notifications_seq ON public.notifications;
+CREATE TRIGGER set_notifications_seq
+    BEFORE INSERT OR UPDATE ON public.notifications
+    FOR EACH ROW
+    EXECUTE FUNCTION set_notification_seq();
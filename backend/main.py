@@ -1,11 +1,20 @@
-from fastapi import FastAPI, Depends, Header, HTTPException, status
+from fastapi import FastAPI, Depends, Header, HTTPException, Query, status
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
+from typing import Optional
 from database.connection import db_manager
 from api.routes import upload, weekly_data
 from api.routes import notifications
 from config.settings import settings
 from services.google_sheets_service import google_sheets_service  # ← NEW IMPORT
+from services.cache import cache_invalidator
+from services.upload_jobs import upload_jobs
+from services.sheet_sync import sheet_sync
+from services.events import event_bus
+from services.notification_store import notification_store
+from services.reply_outbox import reply_outbox
+from api.middleware import BodySizeLimitMiddleware
+from api.stream_tokens import check_stream_token
 
 
 @asynccontextmanager
@@ -16,16 +25,40 @@ async def lifespan(app: FastAPI):
     await db_manager.connect()
     print("✅ Database connected")
     
-    # Check Google Sheets service status
-    if google_sheets_service.is_available():
-        print("✅ Google Sheets service is available")
-    else:
+    if settings.ENABLE_CACHE_INVALIDATION_LISTENER:
+        # Other workers NOTIFY their writes; evict our cached copies
+        await db_manager.add_listener(settings.CACHE_INVALIDATION_CHANNEL, cache_invalidator.handle_notification)
+    # Live events (registers its LISTEN channel with the postgres backend)
+    await event_bus.start()
+    if settings.ENABLE_CACHE_INVALIDATION_LISTENER or settings.EVENT_BUS_BACKEND == "postgres":
+        await db_manager.start_listener(on_reconnect=cache_invalidator.invalidate_all)
+    
+    # Workers for uploads sent with async_mode
+    upload_jobs.start()
+    # Google Sheets syncs run on their own thread, off the upload's critical path
+    sheet_sync.start(db_manager.pool)
+    
+    # Delete notifications resolved more than NOTIFICATION_RETENTION_DAYS ago
+    notification_store.start_retention(db_manager.pool, settings.NOTIFICATION_PURGE_INTERVAL)
+    # Forward queued WhatsApp replies to the bridge
+    await reply_outbox.start(db_manager.pool)
+    
+    # Google credentials load lazily; warm them up off the startup path
+    if settings.GOOGLE_SHEETS_WARMUP:
+        sheet_sync.warm_up()
+    if not google_sheets_service.is_available():
         print("⚠️  Google Sheets service is NOT available (check credentials)")
     
     yield
     
     # Shutdown
     print("🛑 Shutting down...")
+    await upload_jobs.stop()
+    await sheet_sync.stop()
+    await notification_store.stop_retention()
+    await reply_outbox.stop()
+    await event_bus.stop()
+    await db_manager.stop_listener()
     await db_manager.disconnect()
     print("✅ Cleanup complete")
 
@@ -40,6 +73,22 @@ def verify_api_key(x_api_key: str = Header(None)):
             detail="Invalid or missing API key"
         )
 
+
+# Event streams: browsers' EventSource cannot send headers, so it opens the stream with a
+# short-lived ?token= from POST /api/v1/upload/events/token instead of the API key
+def verify_stream_access(
+    x_api_key: str = Header(None),
+    token: Optional[str] = Query(None),
+    upload_id: Optional[int] = Query(None)
+):
+    if not settings.API_KEY or x_api_key == settings.API_KEY:
+        return
+    if not token or not check_stream_token(token, upload_id):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid or expired stream token"
+        )
+
 # Create FastAPI app
 # Disable docs in all environments (set to True to temporarily expose)
 show_docs = False
@@ -53,6 +102,13 @@ app = FastAPI(
     openapi_url="/openapi.json" if show_docs else None,
 )
 
+# Refuse oversized uploads before their body is parsed (added first so CORS wraps the 413)
+app.add_middleware(
+    BodySizeLimitMiddleware,
+    max_body_size=settings.MAX_FILE_SIZE + settings.MAX_UPLOAD_FORM_OVERHEAD,
+    path_prefix="/api/v1/upload"
+)
+
 # Configure CORS
 app.add_middleware(
     CORSMiddleware,
@@ -67,6 +123,7 @@ app.add_middleware(
 # Include routers with API key guard
 dependencies = [Depends(verify_api_key)]
 app.include_router(upload.router, dependencies=dependencies)
+app.include_router(upload.events_router, dependencies=[Depends(verify_stream_access)])
 app.include_router(weekly_data.router, dependencies=dependencies)
 app.include_router(notifications.router, dependencies=dependencies)
 
@@ -84,6 +141,8 @@ async def root():
         },
         "endpoints": {
             "upload": "/api/v1/upload/weekly-plan",
+            "upload_job_status": "/api/v1/upload/jobs/{job_id}",
+            "sheet_sync_status": "/api/v1/upload/sheets-sync/{upload_id}",
             "weekly_routes": "/api/v1/weekly/routes",
             "weekly_drivers": "/api/v1/weekly/drivers",
             "weekly_availability": "/api/v1/weekly/availability",
@@ -98,7 +157,13 @@ async def health_check():
     return {
         "status": "healthy",
         "database": "connected" if db_manager.pool else "disconnected",
-        "google_sheets": "available" if google_sheets_service.is_available() else "unavailable"
+        "google_sheets": "available" if google_sheets_service.is_available() else "unavailable",
+        "google_sheets_state": google_sheets_service.state,
+        "upload_jobs": upload_jobs.stats(),
+        "sheet_sync": sheet_sync.stats(),
+        "events": event_bus.stats(),
+        "notifications": notification_store.stats(),
+        "reply_outbox": reply_outbox.stats()
     }
 
 
@@ -1,7 +1,10 @@
 from pydantic import BaseModel, Field, validator
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Literal
 from datetime import date, datetime
 
+# For optional fields named "date", which would otherwise shadow the type in the class body
+_Date = date
+
 
 # ============= UPLOAD MODELS =============
 
@@ -29,6 +32,43 @@ class UploadResponse(BaseModel):
     action_taken: str
     message: Optional[str] = None
     errors: Optional[List[str]] = []
+    google_sheets_sync: Optional[str] = None  # "queued", "unavailable" or "disabled" (see GET /sheets-sync/{upload_id})
+
+
+class UploadJobStatus(BaseModel):
+    """State of a background upload (async_mode); job_id is the upload_history id"""
+    job_id: int
+    status: str  # "queued", "running", "succeeded" or "failed"
+    stage: str  # "queued", pipeline phase ("drivers", "routes", ...) or "done"
+    filename: str
+    week_start: date
+    progress: Dict[str, int] = {}  # Records written so far per table
+    created_at: Optional[datetime] = None
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    result: Optional[UploadResponse] = None
+    error: Optional[str] = None
+
+
+class SheetSyncStatus(BaseModel):
+    """Background Google Sheets sync of an upload; sync_id is the upload_history id"""
+    sync_id: int
+    sheet_name: str
+    status: str  # "queued", "running", "retrying", "succeeded", "failed" or "superseded"
+    attempts: int = 0
+    created_at: Optional[datetime] = None
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    next_attempt_at: Optional[datetime] = None  # While retrying
+    sheet: Optional[Dict[str, Any]] = None  # Drive file info (id, name, webViewLink, modifiedTime)
+    error: Optional[str] = None
+
+
+class EventStreamToken(BaseModel):
+    """Short-lived ?token= for GET /api/v1/upload/events (EventSource cannot send X-API-Key)"""
+    token: str
+    upload_id: Optional[int] = None  # The one upload whose events it opens; None: all uploads
+    expires_in: int  # seconds
 
 
 # ============= DRIVER MODELS =============
@@ -97,7 +137,7 @@ class RouteCreateRequest(BaseModel):
 class RouteUpdateRequest(BaseModel):
     """Payload for updating route metadata"""
     route_name: Optional[str] = None
-    date: Optional[date] = None
+    date: Optional[_Date] = None
     day_of_week: Optional[str] = None
     details: Optional[RouteDetails] = None
 
@@ -131,12 +171,60 @@ class AvailabilityCreateRequest(BaseModel):
 class AvailabilityUpdateRequest(BaseModel):
     """Payload for updating availability rows"""
     driver_id: Optional[int] = None
-    date: Optional[date] = None
+    date: Optional[_Date] = None
     available: Optional[bool] = None
     shift_preference: Optional[str] = None
     notes: Optional[str] = None
 
 
+class AvailabilityBatchOperation(BaseModel):
+    """One create / update / delete in an availability batch"""
+    op: Literal["create", "update", "delete"]
+    id: Optional[int] = None  # Required for update and delete
+    driver_id: Optional[int] = None  # Required for create
+    date: Optional[_Date] = None  # Required for create
+    available: Optional[bool] = None
+    shift_preference: Optional[str] = None
+    notes: Optional[str] = None
+
+
+class AvailabilityBatchRequest(BaseModel):
+    """Payload for applying many availability changes at once"""
+    operations: List[AvailabilityBatchOperation] = Field(..., min_length=1)
+
+
+class AvailabilityBatchResult(BaseModel):
+    """Outcome of one batch operation, in request order"""
+    index: int
+    op: str
+    status: str  # created, updated, deleted, not_found
+    id: Optional[int] = None
+    record: Optional[DriverAvailability] = None
+
+
+class AvailabilityBatchResponse(BaseModel):
+    """Result of an availability batch"""
+    results: List[AvailabilityBatchResult]
+
+
+class PublicHoliday(BaseModel):
+    """Public holiday (Feiertag)"""
+    date: date
+    name: str
+
+
+class HolidayAvailabilityRequest(BaseModel):
+    """Payload for marking drivers unavailable on public holidays"""
+    holidays: List[PublicHoliday]
+    driver_ids: Optional[List[int]] = None  # None = all drivers
+
+
+class HolidayAvailabilityResponse(BaseModel):
+    """Result of a holiday availability update"""
+    holidays: List[date]
+    records_affected: int
+
+
 # ============= FIXED ASSIGNMENT MODELS =============
 
 class FixedAssignmentDetails(BaseModel):
@@ -221,6 +309,17 @@ class WeeklyAvailabilityResponse(BaseModel):
     availability: List[DriverAvailability]
 
 
+class WeeklySnapshotResponse(BaseModel):
+    """Response model for the weekly snapshot (all week data in one response)"""
+    week_start: date
+    season: str
+    school_status: str
+    routes: List[Route]
+    drivers: List[Driver]
+    availability: List[DriverAvailability]
+    fixed_assignments: List[Dict[str, Any]]
+
+
 # ============= UPLOAD HISTORY MODEL =============
 
 class UploadHistory(BaseModel):
@@ -0,0 +1,155 @@
+import json
+import os
+import socket
+import time
+from collections import OrderedDict
+from datetime import date, timedelta
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Optional
+from uuid import uuid4
+
+# Identifies this worker in NOTIFY payloads so it can skip its own messages
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid4().hex[:8]}"
+
+
+class LRUCache:
+    """Size-bounded LRU cache with a TTL, explicit invalidation and hit/miss counters"""
+
+    def __init__(self, name: str, max_size: int, ttl: float):
+        self.name = name
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()  # key -> (stored_at, value)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Return the cached value, or None if missing or expired"""
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        stored_at, value = entry
+        if time.monotonic() - stored_at >= self.ttl:
+            del self._entries[key]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any):
+        """Store a value, evicting the least recently used entries beyond max_size"""
+        self._entries[key] = (time.monotonic(), value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, key: Hashable) -> bool:
+        """Drop one key, return True if it was cached"""
+        if self._entries.pop(key, None) is None:
+            return False
+        self.invalidations += 1
+        return True
+
+    def invalidate_where(self, predicate: Callable[[Hashable], bool]) -> int:
+        """Drop every key matching predicate, return how many were dropped"""
+        keys = [key for key in self._entries if predicate(key)]
+        for key in keys:
+            del self._entries[key]
+        self.invalidations += len(keys)
+        return len(keys)
+
+    def clear(self) -> int:
+        """Drop everything, return how many entries were dropped"""
+        dropped = len(self._entries)
+        self.invalidations += dropped
+        self._entries.clear()
+        return dropped
+
+    def stats(self) -> Dict[str, Any]:
+        """Counters for diagnostics"""
+        lookups = self.hits + self.misses
+        return {
+            "name": self.name,
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else None,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
+
+
+class CacheInvalidator:
+    """
+    Routes (table, dates) change events to the caches that depend on that table.
+    
+    Local writes call invalidate() directly; changes from other workers arrive as
+    Postgres NOTIFY payloads (see build_payloads / handle_notification).
+    """
+
+    def __init__(self):
+        self._handlers: Dict[str, List[Callable[[Optional[List[date]]], int]]] = {}
+        self.remote_events = 0
+
+    def register(self, table: str, handler: Callable[[Optional[List[date]]], int]):
+        """Call handler(dates) whenever table changes; dates=None means 'anything may have changed'"""
+        self._handlers.setdefault(table, []).append(handler)
+
+    def invalidate(self, table: str, dates: Optional[Iterable[date]] = None) -> int:
+        """Run the handlers registered for table, return how many cache entries were dropped"""
+        dates = None if dates is None else list(dates)
+        return sum(handler(dates) for handler in self._handlers.get(table, []))
+
+    @staticmethod
+    def build_payloads(table: str, dates: Optional[Iterable[Any]] = None) -> List[str]:
+        """One NOTIFY payload per (table, week); a single table-wide payload if dates is None"""
+        weeks: Optional[Dict[date, set]] = None
+        if dates is not None:
+            weeks = {}
+            for changed in dates:
+                if not isinstance(changed, date):
+                    weeks = None  # Unparseable date - invalidate the whole table
+                    break
+                week = changed - timedelta(days=changed.weekday())
+                weeks.setdefault(week, set()).add(changed)
+
+        if weeks is None:
+            return [json.dumps({"table": table, "week": None, "dates": None, "origin": WORKER_ID})]
+        return [
+            json.dumps({
+                "table": table,
+                "week": week.isoformat(),
+                "dates": sorted(d.isoformat() for d in week_dates),
+                "origin": WORKER_ID
+            })
+            for week, week_dates in weeks.items()
+        ]
+
+    def handle_notification(self, connection, pid: int, channel: str, payload: str):
+        """asyncpg listener callback: evict entries changed by another worker"""
+        try:
+            message = json.loads(payload)
+        except json.JSONDecodeError:
+            print(f"⚠️  [CACHE] Ignoring malformed invalidation payload: {payload[:100]}")
+            return
+        if message.get("origin") == WORKER_ID:
+            return
+        dates = message.get("dates")
+        if dates is not None:
+            dates = [date.fromisoformat(d) for d in dates]
+        self.remote_events += 1
+        self.invalidate(message.get("table", ""), dates)
+
+    def invalidate_all(self) -> int:
+        """Drop everything (e.g. after the listener missed messages)"""
+        return sum(self.invalidate(table) for table in list(self._handlers))
+
+
+# Global invalidator shared by all caches
+cache_invalidator = CacheInvalidator()
@@ -1,22 +1,534 @@
+import asyncio
 import asyncpg
-from typing import List, Dict, Any, Optional, Tuple
-from datetime import date, datetime
+from contextlib import asynccontextmanager
+from typing import List, Dict, Any, Optional, Tuple, Iterable, Callable, Awaitable, AsyncIterator
+from datetime import date, datetime, timedelta
 from schemas.models import (
     Driver, Route, DriverAvailability, FixedAssignment,
-    SeasonConfig, SchoolVacationPeriod, UploadHistory
+    SeasonConfig, SchoolVacationPeriod, UploadHistory,
+    DriverDetails, RouteDetails
 )
+from services.cache import LRUCache, cache_invalidator
+from config.settings import settings
 import json
 import time
 
-AVAILABILITY_CACHE: Dict[str, Tuple[float, List[Dict[str, Any]]]] = {}
-AVAILABILITY_CACHE_TTL = 5.0  # seconds
+# Week availability rows, keyed by the week_start date that was queried
+AVAILABILITY_CACHE = LRUCache(
+    "availability",
+    max_size=settings.AVAILABILITY_CACHE_SIZE,
+    ttl=settings.AVAILABILITY_CACHE_TTL
+)
+# Serialized /weekly/availability responses, same keys and invalidation
+AVAILABILITY_JSON_CACHE = LRUCache(
+    "availability_json",
+    max_size=settings.AVAILABILITY_CACHE_SIZE,
+    ttl=settings.AVAILABILITY_CACHE_TTL
+)
+AVAILABILITY_CACHES = (AVAILABILITY_CACHE, AVAILABILITY_JSON_CACHE)
+
+
+def invalidate_availability_cache(dates: Optional[Iterable[date]] = None) -> int:
+    """
+    Drop cached availability weeks that contain any of the given dates (all weeks if None).
+    
+    Cached windows start on the queried week_start, so a date can sit in any window
+    starting up to 6 days before it.
+    """
+    if dates is None:
+        return sum(cache.clear() for cache in AVAILABILITY_CACHES)
+    window_starts = set()
+    for changed in dates:
+        if isinstance(changed, datetime):
+            changed = changed.date()
+        if not isinstance(changed, date):
+            # Unparseable date - be safe and drop everything
+            return invalidate_availability_cache(None)
+        window_starts.update(changed - timedelta(days=offset) for offset in range(7))
+    return sum(cache.invalidate_where(lambda key: key in window_starts) for cache in AVAILABILITY_CACHES)
+
+
+cache_invalidator.register('driver_availability', invalidate_availability_cache)
+# Availability rows carry the driver name
+cache_invalidator.register('drivers', lambda dates: invalidate_availability_cache())
+
+PLANNING_TABLES = ('drivers', 'routes', 'driver_availability', 'fixed_assignments')
+
+
+def _week_dates(week_start: date) -> List[date]:
+    """The 7 dates of the window starting at week_start"""
+    return [week_start + timedelta(days=offset) for offset in range(7)]
+
+
+def _details_json_sql(model, column: str = 'details') -> str:
+    """
+    SQL expression rendering a JSONB details column the way the Pydantic model serializes it:
+    exactly the model's fields, in field order, with the model defaults for missing keys.
+    """
+    fields = []
+    for name, field in model.model_fields.items():
+        default = json.dumps(field.get_default(call_default_factory=True)).replace("'", "''")
+        fields.append(f"'{name}', COALESCE({column}->'{name}', '{default}'::jsonb)")
+    return f"json_build_object({', '.join(fields)})"
+
+
+def _timestamp_json_sql(column: str) -> str:
+    """
+    SQL expression rendering a TIMESTAMP column the way Pydantic serializes a datetime.
+    
+    Postgres' own JSON output drops trailing zeros of the fraction (".98829");
+    Pydantic always writes six digits, or none for whole seconds.
+    """
+    return (
+        f"CASE WHEN EXTRACT(MICROSECONDS FROM {column})::int % 1000000 = 0 "
+        f"""THEN to_char({column}, 'YYYY-MM-DD"T"HH24:MI:SS') """
+        f"""ELSE to_char({column}, 'YYYY-MM-DD"T"HH24:MI:SS.US') END"""
+    )
+
+
+# Count weekly_stats columns from the planning tables; {weeks} is a query yielding the week_start column
+WEEK_STATS_SELECT = """
+    SELECT
+        w.week_start,
+        (SELECT COUNT(*) FROM routes r WHERE r.date >= w.week_start AND r.date < w.week_start + 7) AS total_routes,
+        (SELECT COUNT(*) FROM drivers) AS total_drivers,
+        (SELECT COUNT(*) FROM driver_availability da
+         WHERE da.date >= w.week_start AND da.date < w.week_start + 7 AND NOT da.available) AS unavailable_instances,
+        (SELECT COUNT(*) FROM fixed_assignments fa
+         WHERE fa.date >= w.week_start AND fa.date < w.week_start + 7) AS fixed_assignments,
+        COALESCE(first_route.details->>'season', 'unknown') AS season,
+        COALESCE(first_route.details->>'school_status', 'unknown') AS school_status,
+        NOW() AS refreshed_at
+    FROM ({weeks}) AS w(week_start)
+    LEFT JOIN LATERAL (
+        SELECT r.details
+        FROM routes r
+        WHERE r.date >= w.week_start AND r.date < w.week_start + 7
+        ORDER BY r.date, r.route_name
+        LIMIT 1
+    ) first_route ON TRUE
+"""
+
+# Recount and store weekly_stats rows
+WEEK_STATS_UPSERT = """
+    INSERT INTO weekly_stats (
+        week_start, total_routes, total_drivers, unavailable_instances,
+        fixed_assignments, season, school_status, refreshed_at
+    )
+""" + WEEK_STATS_SELECT + """
+    ON CONFLICT (week_start) DO UPDATE
+    SET total_routes = EXCLUDED.total_routes,
+        total_drivers = EXCLUDED.total_drivers,
+        unavailable_instances = EXCLUDED.unavailable_instances,
+        fixed_assignments = EXCLUDED.fixed_assignments,
+        season = EXCLUDED.season,
+        school_status = EXCLUDED.school_status,
+        refreshed_at = EXCLUDED.refreshed_at
+    RETURNING week_start, total_routes, total_drivers, unavailable_instances,
+              fixed_assignments, season, school_status, refreshed_at
+"""
+
+
+# Hot read statements - prepared once per connection in "session" connection mode
+HOT_STATEMENTS: Dict[str, str] = {
+    'all_drivers': """
+        SELECT driver_id, name, details, created_at
+        FROM drivers
+        ORDER BY name
+    """,
+    'routes_for_week': """
+        SELECT route_id, date, route_name, details, day_of_week, created_at
+        FROM routes
+        WHERE date >= $1 AND date < $2
+        ORDER BY date, route_name
+    """,
+    'data_version': """
+        SELECT current_data_version()
+    """,
+    'week_stats': """
+        SELECT week_start, total_routes, total_drivers, unavailable_instances,
+               fixed_assignments, season, school_status, refreshed_at
+        FROM weekly_stats
+        WHERE week_start = $1
+    """,
+    'routes_preview_for_week': """
+        SELECT route_id, date, route_name, details, day_of_week, created_at
+        FROM routes
+        WHERE date >= $1 AND date < $2
+        ORDER BY date, route_name
+        LIMIT $3
+    """,
+    'driver_names': """
+        SELECT driver_id, name FROM drivers ORDER BY name
+    """,
+    'availability_count_for_week': """
+        SELECT COUNT(*) FROM driver_availability WHERE date >= $1 AND date < $2
+    """,
+    'availability_for_week': """
+        SELECT 
+            da.id, 
+            da.driver_id, 
+            da.date, 
+            da.available, 
+            da.notes,
+            da.created_at, 
+            da.updated_at,
+            d.name as driver_name
+        FROM driver_availability da
+        INNER JOIN drivers d ON da.driver_id = d.driver_id
+        WHERE da.date >= $1 AND da.date < $2
+        ORDER BY d.name, da.date
+    """,
+    'fixed_assignments_for_week': """
+        SELECT fa.id, fa.driver_id, fa.route_id, fa.date,
+               fa.created_at, fa.updated_at,
+               d.name as driver_name,
+               r.route_name
+        FROM fixed_assignments fa
+        JOIN drivers d ON fa.driver_id = d.driver_id
+        LEFT JOIN routes r ON fa.route_id = r.route_id
+        WHERE fa.date >= $1 AND fa.date < $1 + INTERVAL '7 days'
+        ORDER BY d.name, fa.date
+    """,
+    # JSON fast path: the weekly list responses built by Postgres, same shape as the response models.
+    # Selected as ::text so the JSON codec does not decode them - the bytes go straight out.
+    'routes_json_for_week': f"""
+        WITH week_routes AS (
+            SELECT route_id, date, route_name, {_details_json_sql(RouteDetails)} AS details,
+                   day_of_week, {_timestamp_json_sql('created_at')} AS created_at
+            FROM routes
+            WHERE date >= $1 AND date < $2
+        ), first_route AS (
+            SELECT details FROM week_routes ORDER BY date, route_name LIMIT 1
+        )
+        SELECT json_build_object(
+            'week_start', $1::date,
+            'season', COALESCE((SELECT details->>'season' FROM first_route), 'unknown'),
+            'school_status', COALESCE((SELECT details->>'school_status' FROM first_route), 'unknown'),
+            'routes', COALESCE((SELECT json_agg(r ORDER BY r.date, r.route_name) FROM week_routes r), '[]'::json)
+        )::text
+    """,
+    'drivers_json': f"""
+        SELECT json_build_object(
+            'week_start', $1::date,
+            'drivers', COALESCE((
+                SELECT json_agg(d ORDER BY d.name)
+                FROM (
+                    SELECT driver_id, name, {_details_json_sql(DriverDetails)} AS details,
+                           {_timestamp_json_sql('created_at')} AS created_at,
+                           {_timestamp_json_sql('created_at')} AS updated_at
+                    FROM drivers
+                ) d
+            ), '[]'::json)
+        )::text
+    """,
+    'availability_json_for_week': f"""
+        SELECT json_build_object(
+            'week_start', $1::date,
+            'availability', COALESCE((
+                SELECT json_agg(
+                    json_build_object(
+                        'id', da.id, 'driver_id', da.driver_id, 'date', da.date,
+                        'available', da.available, 'shift_preference', da.shift_preference,
+                        'notes', da.notes,
+                        'created_at', {_timestamp_json_sql('da.created_at')},
+                        'updated_at', {_timestamp_json_sql('da.updated_at')}
+                    )
+                    ORDER BY d.name, da.date
+                )
+                FROM driver_availability da
+                INNER JOIN drivers d ON da.driver_id = d.driver_id
+                WHERE da.date >= $1 AND da.date < $2
+            ), '[]'::json)
+        )::text
+    """,
+    # Whole week view as one JSON document - one round trip instead of five queries
+    'week_snapshot': f"""
+        SELECT json_build_object(
+            'routes', COALESCE((
+                SELECT json_agg(r ORDER BY r.date, r.route_name)
+                FROM (
+                    SELECT route_id, date, route_name, details, day_of_week, created_at
+                    FROM routes
+                    WHERE date >= $1 AND date < $2
+                ) r
+            ), '[]'::json),
+            'drivers', COALESCE((
+                SELECT json_agg(d ORDER BY d.name)
+                FROM (
+                    SELECT driver_id, name, details, created_at, created_at AS updated_at
+                    FROM drivers
+                ) d
+            ), '[]'::json),
+            'availability', COALESCE((
+                SELECT json_agg(a ORDER BY a.driver_name, a.date)
+                FROM (
+                    SELECT da.id, da.driver_id, da.date, da.available, da.shift_preference, da.notes,
+                           da.created_at, da.updated_at, d.name AS driver_name
+                    FROM driver_availability da
+                    INNER JOIN drivers d ON da.driver_id = d.driver_id
+                    WHERE da.date >= $1 AND da.date < $2
+                ) a
+            ), '[]'::json),
+            'fixed_assignments', COALESCE((
+                SELECT json_agg(f ORDER BY f.driver_name, f.date)
+                FROM (
+                    -- Passed through as is (no model): timestamps formatted like /fixed-assignments
+                    SELECT fa.id, fa.driver_id, fa.route_id, fa.date,
+                           {_timestamp_json_sql('fa.created_at')} AS created_at,
+                           {_timestamp_json_sql('fa.updated_at')} AS updated_at,
+                           d.name AS driver_name,
+                           r.route_name
+                    FROM fixed_assignments fa
+                    JOIN drivers d ON fa.driver_id = d.driver_id
+                    LEFT JOIN routes r ON fa.route_id = r.route_id
+                    WHERE fa.date >= $1 AND fa.date < $2
+                ) f
+            ), '[]'::json)
+        )
+    """,
+}
+
+
+# Keyset pages over a date range, ordered by (date, id): $1/$2 = cursor (date, id) of the
+# last row already sent, $3 = last date (inclusive), $4 = page size. Each row carries its
+# item as JSON text in the same shape as the weekly endpoints.
+RANGE_PAGE_QUERIES: Dict[str, str] = {
+    'routes': f"""
+        SELECT date, route_id AS id,
+               json_build_object(
+                   'route_id', route_id, 'date', date, 'route_name', route_name,
+                   'details', {_details_json_sql(RouteDetails)},
+                   'day_of_week', day_of_week, 'created_at', {_timestamp_json_sql('created_at')}
+               )::text AS item
+        FROM routes
+        WHERE (date, route_id) > ($1, $2) AND date <= $3
+        ORDER BY date, route_id
+        LIMIT $4
+    """,
+    'availability': f"""
+        SELECT date, id,
+               json_build_object(
+                   'id', id, 'driver_id', driver_id, 'date', date,
+                   'available', available, 'shift_preference', shift_preference,
+                   'notes', notes, 'created_at', {_timestamp_json_sql('created_at')},
+                   'updated_at', {_timestamp_json_sql('updated_at')}
+               )::text AS item
+        FROM driver_availability
+        WHERE (date, id) > ($1, $2) AND date <= $3
+        ORDER BY date, id
+        LIMIT $4
+    """,
+    # Names are looked up per row by primary key - a join would hash all of routes for one page
+    'fixed_assignments': f"""
+        SELECT date, id,
+               json_build_object(
+                   'id', id, 'driver_id', driver_id, 'route_id', route_id,
+                   'date', date, 'created_at', {_timestamp_json_sql('created_at')},
+                   'updated_at', {_timestamp_json_sql('updated_at')},
+                   'driver_name', (SELECT d.name FROM drivers d WHERE d.driver_id = fa.driver_id),
+                   'route_name', (SELECT r.route_name FROM routes r WHERE r.route_id = fa.route_id)
+               )::text AS item
+        FROM fixed_assignments fa
+        WHERE (date, id) > ($1, $2) AND date <= $3
+        ORDER BY date, id
+        LIMIT $4
+    """,
+}
 
 
 class DatabaseService:
     """Database operations for weekly planning system"""
     
-    def __init__(self, connection: asyncpg.Connection):
+    def __init__(self, connection: asyncpg.Connection, pool: Optional[asyncpg.Pool] = None):
         self.conn = connection
+        self.pool = pool  # Extra connections for fan_out(); None = everything on self.conn
+        # (table, dates) published inside transaction(), evicted locally once it commits
+        self._pending_changes: Optional[List[Tuple[str, Optional[List[Any]]]]] = None
+        self.data_version: Optional[int] = None  # Set by the last bump_data_version()
+    
+    # ============= CONCURRENT READS =============
+    
+    async def fan_out(self, *reads: Callable[['DatabaseService'], Awaitable[Any]]) -> List[Any]:
+        """
+        Run independent read-only queries concurrently, return their results in order.
+        
+        Each read gets a DatabaseService to query with. The request's own connection
+        always works through the list; up to DB_READ_CONCURRENCY - 1 pool connections
+        join in if one frees up within DB_FAN_OUT_ACQUIRE_TIMEOUT, so a busy pool
+        degrades to sequential reads instead of blocking. Pooled reads don't see
+        uncommitted writes of self.conn.
+        """
+        results: List[Any] = [None] * len(reads)
+        pending = list(enumerate(reads))
+        
+        async def work(service: 'DatabaseService'):
+            while pending:
+                index, read = pending.pop(0)
+                try:
+                    results[index] = await read(service)
+                except BaseException:
+                    pending.clear()  # Stop the other workers too
+                    raise
+        
+        async def work_on_pool_connection():
+            try:
+                connection = await self.pool.acquire(timeout=settings.DB_FAN_OUT_ACQUIRE_TIMEOUT)
+            except asyncio.TimeoutError:
+                return
+            try:
+                if pending:
+                    await work(DatabaseService(connection))
+            finally:
+                await self.pool.release(connection)
+        
+        extra_workers = 0
+        if self.pool is not None:
+            extra_workers = min(settings.DB_READ_CONCURRENCY, len(reads)) - 1
+        # Let every worker finish before raising - self.conn must be idle when we return
+        outcomes = await asyncio.gather(
+            work(self),
+            *(work_on_pool_connection() for _ in range(extra_workers)),
+            return_exceptions=True
+        )
+        for outcome in outcomes:
+            if isinstance(outcome, BaseException):
+                raise outcome
+        return results
+    
+    # ============= PREPARED STATEMENTS =============
+    
+    @staticmethod
+    async def prepare_hot_statements(connection: asyncpg.Connection):
+        """
+        Prepare HOT_STATEMENTS on a connection (pool init hook in "session" mode).
+        
+        The statements are kept on connection.prepared_statements; connections without
+        that attribute (transaction pooler mode) just run the plain SQL.
+        """
+        prepared = getattr(connection, 'prepared_statements', None)
+        if prepared is None:
+            return
+        for name, query in HOT_STATEMENTS.items():
+            prepared[name] = await connection.prepare(query)
+    
+    async def _fetch_hot(self, name: str, *args) -> List[asyncpg.Record]:
+        """Run a hot statement, using the connection's prepared statement if there is one"""
+        prepared = getattr(self.conn, 'prepared_statements', None)
+        if prepared is None:
+            return await self.conn.fetch(HOT_STATEMENTS[name], *args)
+        statement = prepared.get(name)
+        if statement is None:
+            statement = prepared[name] = await self.conn.prepare(HOT_STATEMENTS[name])
+        try:
+            return await statement.fetch(*args)
+        except asyncpg.exceptions.InvalidCachedStatementError:
+            # Schema changed under the prepared plan - prepare it again on this connection.
+            # Inside a transaction the error aborted it, so that waits for the next call.
+            del prepared[name]
+            if self.conn.is_in_transaction():
+                raise
+            statement = prepared[name] = await self.conn.prepare(HOT_STATEMENTS[name])
+            return await statement.fetch(*args)
+    
+    async def _fetchval_hot(self, name: str, *args) -> Any:
+        """Like _fetch_hot, returning the first column of the first row"""
+        rows = await self._fetch_hot(name, *args)
+        return rows[0][0] if rows else None
+    
+    async def _fetchrow_hot(self, name: str, *args) -> Optional[asyncpg.Record]:
+        """Like _fetch_hot, returning the first row"""
+        rows = await self._fetch_hot(name, *args)
+        return rows[0] if rows else None
+    
+    # ============= CHANGE PUBLISHING =============
+    
+    @asynccontextmanager
+    async def transaction(self) -> AsyncIterator[None]:
+        """
+        self.conn.transaction() that holds back the local side of _publish_change until commit.
+        
+        Evicting while the transaction is open would let a reader on another
+        connection cache the rows from before the commit again, and a data version
+        taken before commit could be paired with those rows. Writers that group
+        statements use this instead of self.conn.transaction(); nested calls are
+        savepoints and finish with the outermost one. Nothing happens on rollback.
+        """
+        if self._pending_changes is not None:
+            async with self.conn.transaction():
+                yield
+            return
+        self._pending_changes = []
+        try:
+            async with self.conn.transaction():
+                yield
+            changes = self._pending_changes
+        finally:
+            self._pending_changes = None
+        await self._after_commit(changes)
+    
+    async def _publish_change(self, *tables: str, dates: Optional[Iterable[Any]] = None):
+        """
+        Evict local caches for a committed write, advance the data version for planning
+        tables and, if enabled, NOTIFY the other workers.
+        
+        One message per (table, week); dates=None means the whole table. Inside
+        transaction() eviction and version wait for the commit, and Postgres delivers
+        the messages at commit as well. Outside it the write has already committed.
+        """
+        dates = None if dates is None else list(dates)
+        changes = [(table, dates) for table in tables]
+        if self._pending_changes is not None:
+            self._pending_changes.extend(changes)
+        else:
+            await self._after_commit(changes)
+        payloads = []
+        for table in tables:
+            payloads.extend(cache_invalidator.build_payloads(table, dates))
+        if settings.ENABLE_CACHE_INVALIDATION_LISTENER and payloads:
+            await self.conn.execute(
+                "SELECT pg_notify($1, payload) FROM unnest($2::text[]) AS payload",
+                settings.CACHE_INVALIDATION_CHANNEL,
+                payloads
+            )
+    
+    async def _after_commit(self, changes: List[Tuple[str, Optional[List[Any]]]]):
+        """Local side of committed changes: evict caches, then bump the data version once"""
+        for table, dates in changes:
+            cache_invalidator.invalidate(table, dates)
+        if any(table in PLANNING_TABLES for table, _ in changes):
+            await self.bump_data_version()
+    
+    # ============= WEEKLY STATS =============
+    
+    async def get_week_stats(self, week_start: date) -> Dict[str, Any]:
+        """
+        weekly_stats row for the window starting at week_start.
+        
+        Windows without a stored row are counted on the fly and not stored, so reads
+        never write. Rows are created by uploads and kept current by the track_week_stats
+        triggers.
+        """
+        row = await self._fetchrow_hot('week_stats', week_start)
+        if row is None:
+            row = await self.conn.fetchrow(WEEK_STATS_SELECT.format(weeks="SELECT $1::date"), week_start)
+        return dict(row)
+    
+    async def defer_week_stats(self):
+        """
+        Skip the per-statement weekly_stats triggers for the rest of the current transaction.
+        
+        For bulk loads: call refresh_week_stats once before commit instead.
+        """
+        await self.conn.execute("SET LOCAL app.defer_week_stats = 'on'")
+    
+    async def refresh_week_stats(self, week_starts: Iterable[date] = ()) -> List[Dict[str, Any]]:
+        """Recount every stored weekly_stats window, storing the given windows as well"""
+        rows = await self.conn.fetch(
+            WEEK_STATS_UPSERT.format(weeks="SELECT week_start FROM weekly_stats UNION SELECT unnest($1::date[])"),
+            list(week_starts)
+        )
+        return [dict(row) for row in rows]
     
     # ============= SEQUENCE RESET =============
     
@@ -55,10 +567,12 @@ class DatabaseService:
         
         # Try fast truncate with identity reset; fall back to explicit deletes if needed
         try:
-            await self.conn.execute("""
-                TRUNCATE TABLE fixed_assignments, driver_availability, routes, drivers
-                RESTART IDENTITY CASCADE;
-            """)
+            # Savepoint keeps the fallback usable when called inside a transaction
+            async with self.conn.transaction():
+                await self.conn.execute("""
+                    TRUNCATE TABLE fixed_assignments, driver_availability, routes, drivers, weekly_stats
+                    RESTART IDENTITY CASCADE;
+                """)
             print("✅ Tables truncated and identities reset")
         except Exception as e:
             print(f"⚠️ TRUNCATE failed, falling back to DELETE workflow: {e}")
@@ -66,10 +580,21 @@ class DatabaseService:
             await self.conn.execute("DELETE FROM driver_availability")
             await self.conn.execute("DELETE FROM routes")
             await self.conn.execute("DELETE FROM drivers")
+            await self.conn.execute("DELETE FROM weekly_stats")
             print("✅ All data cleared via DELETE statements")
 
         # Ensure sequences are in sync with the current data state (empty or otherwise)
         await self.reset_sequences()
+        await self._publish_change(*PLANNING_TABLES)
+    
+    async def lock_plan_load(self):
+        """
+        Wait for any other plan load to finish; held until this transaction ends.
+        
+        Transaction-scoped so it also works behind the transaction pooler, where a
+        session lock could be released on (or leak into) another client's session.
+        """
+        await self.conn.execute("SELECT pg_advisory_xact_lock(hashtext('weekly_plan_load'))")
     
     async def clear_week_data(self, week_start: date):
         """Clear all data for a specific week (for replace action)"""
@@ -96,7 +621,7 @@ class DatabaseService:
             """
             driver_id = await self.conn.fetchval(
                 query,
-                json.dumps(driver_data['details']),
+                driver_data['details'],
                 driver_data['name']
             )
         else:
@@ -109,11 +634,34 @@ class DatabaseService:
             driver_id = await self.conn.fetchval(
                 query,
                 driver_data['name'],
-                json.dumps(driver_data['details'])
+                driver_data['details']
             )
         
+        await self._publish_change('drivers')
         return driver_id
     
+    async def upsert_drivers_batch(self, drivers: List[Dict[str, Any]]) -> Dict[str, int]:
+        """Insert or update many drivers in one statement, return name -> driver_id"""
+        # Last occurrence wins, same as calling upsert_driver in order
+        by_name = {driver['name']: driver for driver in drivers}
+        if not by_name:
+            return {}
+
+        query = """
+            INSERT INTO drivers (name, details)
+            SELECT * FROM unnest($1::text[], $2::jsonb[])
+            ON CONFLICT (name) DO UPDATE
+            SET details = EXCLUDED.details
+            RETURNING driver_id, name
+        """
+        rows = await self.conn.fetch(
+            query,
+            list(by_name.keys()),
+            [driver['details'] for driver in by_name.values()]
+        )
+        await self._publish_change('drivers')
+        return {row['name']: row['driver_id'] for row in rows}
+
     async def get_driver_by_name(self, name: str) -> Optional[Dict]:
         """Get driver by name"""
         query = """
@@ -136,43 +684,27 @@ class DatabaseService:
         if not row:
             return None
         row_dict = dict(row)
-        details = row_dict.get('details') or {}
-        if isinstance(details, str):
-            try:
-                details = json.loads(details)
-            except json.JSONDecodeError:
-                details = {}
-        row_dict['details'] = details
+        row_dict['details'] = row_dict.get('details') or {}
         return row_dict
     
     async def get_all_drivers(self) -> List[Dict]:
         """Get all drivers"""
-        query = """
-            SELECT driver_id, name, details, created_at
-            FROM drivers
-            ORDER BY name
-        """
-        
-        rows = await self.conn.fetch(query)
+        rows = await self._fetch_hot('all_drivers')
         result = []
         for row in rows:
             row_dict = dict(row)
             # Add updated_at as created_at since column doesn't exist
             row_dict['updated_at'] = row_dict['created_at']
-            
-            # Parse details if it's a JSON string
-            if isinstance(row_dict['details'], str):
-                try:
-                    row_dict['details'] = json.loads(row_dict['details'])
-                except:
-                    row_dict['details'] = {}
-            elif row_dict['details'] is None:
-                row_dict['details'] = {}
-            
+            row_dict['details'] = row_dict['details'] or {}
             result.append(row_dict)
         
         return result
 
+    async def get_driver_names(self) -> List[Dict]:
+        """driver_id and name of all drivers, ordered by name"""
+        rows = await self._fetch_hot('driver_names')
+        return [dict(row) for row in rows]
+
     async def update_driver(self, driver_id: int, update_data: Dict[str, Any]) -> Optional[Dict]:
         """Update driver properties"""
         existing = await self.get_driver_by_id(driver_id)
@@ -192,19 +724,14 @@ class DatabaseService:
             RETURNING driver_id, name, details, created_at, updated_at
             """,
             new_name,
-            json.dumps(new_details),
+            new_details,
             driver_id
         )
         if not row:
             return None
+        await self._publish_change('drivers')
         updated = dict(row)
-        details = updated.get('details') or {}
-        if isinstance(details, str):
-            try:
-                details = json.loads(details)
-            except json.JSONDecodeError:
-                details = {}
-        updated['details'] = details
+        updated['details'] = updated.get('details') or {}
         return updated
     
     # ============= ROUTE OPERATIONS =============
@@ -228,7 +755,7 @@ class DatabaseService:
             """
             route_id = await self.conn.fetchval(
                 query,
-                json.dumps(route_data['details']),
+                route_data['details'],
                 route_data.get('day_of_week'),
                 existing['route_id']
             )
@@ -244,7 +771,7 @@ class DatabaseService:
                     query,
                     route_data['date'],
                     route_data['route_name'],
-                    json.dumps(route_data['details']),
+                    route_data['details'],
                     route_data.get('day_of_week')
                 )
             except asyncpg.exceptions.UniqueViolationError as e:
@@ -256,46 +783,60 @@ class DatabaseService:
                         query,
                         route_data['date'],
                         route_data['route_name'],
-                        json.dumps(route_data['details']),
+                        route_data['details'],
                         route_data.get('day_of_week')
                     )
                 else:
                     raise
         
+        await self._publish_change('routes', dates=[route_data['date']])
         return route_id
     
+    async def create_routes_batch(self, routes: List[Dict[str, Any]]) -> Dict[Tuple[str, date], int]:
+        """Create or update many routes in one statement, return (route_name, date) -> route_id"""
+        # Last occurrence wins, same as calling create_route in order
+        by_key = {(route['route_name'], route['date']): route for route in routes}
+        if not by_key:
+            return {}
+
+        query = """
+            INSERT INTO routes (date, route_name, details, day_of_week)
+            SELECT * FROM unnest($1::date[], $2::text[], $3::jsonb[], $4::text[])
+            ON CONFLICT (date, route_name) DO UPDATE
+            SET details = EXCLUDED.details,
+                day_of_week = EXCLUDED.day_of_week
+            RETURNING route_id, route_name, date
+        """
+        values = list(by_key.values())
+        rows = await self.conn.fetch(
+            query,
+            [route['date'] for route in values],
+            [route['route_name'] for route in values],
+            [route['details'] for route in values],
+            [route.get('day_of_week') for route in values]
+        )
+        await self._publish_change('routes', dates={key[1] for key in by_key})
+        return {(row['route_name'], row['date']): row['route_id'] for row in rows}
+
     async def get_routes_for_week(self, week_start: date) -> List[Dict]:
         """Get all routes for a specific week"""
-        from datetime import timedelta
-        import json
-        
         week_end = week_start + timedelta(days=7)
         
-        query = """
-            SELECT route_id, date, route_name, details, day_of_week, created_at
-            FROM routes
-            WHERE date >= $1 AND date < $2
-            ORDER BY date, route_name
-        """
-        
-        rows = await self.conn.fetch(query, week_start, week_end)
+        rows = await self._fetch_hot('routes_for_week', week_start, week_end)
         result = []
         for row in rows:
             row_dict = dict(row)
-            
-            # Parse details if it's a string
-            if isinstance(row_dict['details'], str):
-                try:
-                    row_dict['details'] = json.loads(row_dict['details'])
-                except:
-                    row_dict['details'] = {}
-            elif row_dict['details'] is None:
-                row_dict['details'] = {}
-            
+            row_dict['details'] = row_dict['details'] or {}
             result.append(row_dict)
         
         return result
     
+    async def get_routes_preview(self, week_start: date, limit: int = 10) -> List[Dict]:
+        """First routes of a week (same order as get_routes_for_week)"""
+        week_end = week_start + timedelta(days=7)
+        rows = await self._fetch_hot('routes_preview_for_week', week_start, week_end, limit)
+        return [{**dict(row), 'details': row['details'] or {}} for row in rows]
+    
     async def delete_routes_for_week(self, week_start: date):
         """Delete all routes for a specific week"""
         query = """
@@ -304,11 +845,66 @@ class DatabaseService:
         """
         
         await self.conn.execute(query, week_start)
+        # Fixed assignments cascade with their routes
+        await self._publish_change('routes', 'fixed_assignments', dates=_week_dates(week_start))
+    
+    # ============= JSON FAST PATH =============
+    
+    async def get_routes_json_for_week(self, week_start: date) -> bytes:
+        """WeeklyRoutesResponse as JSON bytes, serialized by Postgres"""
+        week_end = week_start + timedelta(days=7)
+        return (await self._fetchval_hot('routes_json_for_week', week_start, week_end)).encode()
+    
+    async def get_drivers_json(self, week_start: date) -> bytes:
+        """WeeklyDriversResponse as JSON bytes, serialized by Postgres"""
+        return (await self._fetchval_hot('drivers_json', week_start)).encode()
+    
+    async def get_availability_json_for_week(self, week_start: date) -> bytes:
+        """WeeklyAvailabilityResponse as JSON bytes, serialized by Postgres"""
+        cached = AVAILABILITY_JSON_CACHE.get(week_start)
+        if cached is not None:
+            return cached
+        week_end = week_start + timedelta(days=7)
+        body = (await self._fetchval_hot('availability_json_for_week', week_start, week_end)).encode()
+        AVAILABILITY_JSON_CACHE.set(week_start, body)
+        return body
+    
+    # ============= DATE RANGES =============
+    
+    async def get_range_page(
+        self,
+        kind: str,
+        date_from: date,
+        date_to: date,
+        after: Optional[Tuple[date, int]] = None,
+        limit: int = 500
+    ) -> Tuple[List[bytes], Optional[Tuple[date, int]]]:
+        """
+        One page of routes / availability / fixed_assignments between date_from and
+        date_to (inclusive), as JSON bytes per row in (date, id) order.
+        
+        Returns the items and the (date, id) cursor to pass as `after` for the next
+        page, or None once the range is exhausted.
+        """
+        if after is None or after[0] < date_from:
+            after = (date_from, 0)  # Ids start at 1, so this precedes every row of date_from
+        rows = await self.conn.fetch(RANGE_PAGE_QUERIES[kind], after[0], after[1], date_to, limit)
+        items = [row['item'].encode() for row in rows]
+        next_cursor = (rows[-1]['date'], rows[-1]['id']) if len(rows) == limit else None
+        return items, next_cursor
+    
+    # ============= WEEK SNAPSHOT =============
+    
+    async def get_week_snapshot(self, week_start: date) -> Dict[str, List[Dict[str, Any]]]:
+        """Routes, drivers, availability and fixed assignments of a week in a single query"""
+        week_end = week_start + timedelta(days=7)
+        return await self._fetchval_hot('week_snapshot', week_start, week_end)
     
     # ============= AVAILABILITY OPERATIONS =============
     
-    async def create_availability(self, availability_data: Dict[str, Any]) -> int:
-        """Create or update driver availability"""
+    @staticmethod
+    def _normalize_availability(availability_data: Dict[str, Any]) -> Tuple[Any, Any, bool, Optional[str], Optional[str]]:
+        """Normalize availability input to (driver_id, date, available, shift_preference, notes)"""
         # Normalize inputs to avoid ambiguous parameter types
         available_raw = availability_data.get('available', True)
         if isinstance(available_raw, str):
@@ -338,6 +934,18 @@ class DatabaseService:
         if notes_value is not None:
             notes_value = str(notes_value)
 
+        return driver_id_value, date_value, available_normalized, shift_pref_value, notes_value
+
+    async def create_availability(self, availability_data: Dict[str, Any]) -> int:
+        """Create or update driver availability"""
+        (
+            driver_id_value,
+            date_value,
+            available_normalized,
+            shift_pref_value,
+            notes_value
+        ) = self._normalize_availability(availability_data)
+
         # Check if exists
         existing_query = """
             SELECT id FROM driver_availability
@@ -387,18 +995,131 @@ class DatabaseService:
                 notes_value
             )
         
+        await self._publish_change('driver_availability', dates=[date_value])
         return avail_id
     
+    async def create_availability_batch(self, records: List[Dict[str, Any]]) -> List[int]:
+        """
+        Create or update many availability rows in one statement.
+
+        Same merge rules as create_availability: notes are appended, shift_preference kept if not given.
+        """
+        rows = await self._upsert_availability(records)
+        if rows:
+            await self._publish_change('driver_availability', dates={row['date'] for row in rows})
+        return [row['id'] for row in rows]
+
+    async def _upsert_availability(self, records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """create_availability for many records in one INSERT ... ON CONFLICT; rows carry `inserted`"""
+        # One row per (driver_id, date) - ON CONFLICT DO UPDATE cannot touch the same row twice.
+        # Repeats are merged the way create_availability would apply them one after another.
+        by_key = {}
+        for record in records:
+            driver_id_value, date_value, available, shift_preference, notes = self._normalize_availability(record)
+            previous = by_key.get((driver_id_value, date_value))
+            if previous:
+                if shift_preference is None:
+                    shift_preference = previous[3]
+                if notes is None:
+                    notes = previous[4]
+                elif previous[4] is not None:
+                    notes = f"{previous[4]}; {notes}"
+            by_key[(driver_id_value, date_value)] = (driver_id_value, date_value, available, shift_preference, notes)
+        if not by_key:
+            return []
+
+        columns = list(zip(*by_key.values()))
+        query = """
+            INSERT INTO driver_availability (driver_id, date, available, shift_preference, notes)
+            SELECT * FROM unnest($1::int[], $2::date[], $3::bool[], $4::text[], $5::text[])
+            ON CONFLICT (driver_id, date) DO UPDATE
+            SET available = EXCLUDED.available,
+                shift_preference = COALESCE(EXCLUDED.shift_preference, driver_availability.shift_preference),
+                notes = CASE
+                    WHEN EXCLUDED.notes IS NULL THEN driver_availability.notes
+                    WHEN driver_availability.notes IS NULL THEN EXCLUDED.notes
+                    ELSE driver_availability.notes || '; ' || EXCLUDED.notes
+                END,
+                updated_at = CURRENT_TIMESTAMP
+            RETURNING id, driver_id, date, available, shift_preference, notes, created_at, updated_at,
+                      (xmax = 0) AS inserted
+        """
+        rows = await self.conn.fetch(query, *[list(column) for column in columns])
+        return [dict(row) for row in rows]
+
+    async def apply_availability_batch(
+        self,
+        creates: List[Dict[str, Any]],
+        updates: List[Dict[str, Any]],
+        deletes: List[int]
+    ) -> Dict[str, Dict]:
+        """
+        Apply availability creates, updates and deletes in one transaction, one statement each.
+
+        Deletes run first, then updates, then creates. Creates follow create_availability
+        (upsert, notes appended); updates follow update_availability_record and only touch
+        the fields present in each dict (besides 'id'). Returns
+        {"created": {(driver_id, date): row}, "updated": {id: row}, "deleted": {id: date}};
+        rows that did not exist are missing from "updated" / "deleted". Any error (e.g.
+        a unique violation) rolls the whole batch back; caches are evicted after commit.
+        """
+        deleted: Dict[int, Any] = {}
+        updated: Dict[int, Dict[str, Any]] = {}
+        touched_dates = set()
+        async with self.transaction():
+            if deletes:
+                rows = await self.conn.fetch(
+                    "DELETE FROM driver_availability WHERE id = ANY($1::int[]) RETURNING id, date",
+                    deletes
+                )
+                deleted = {row['id']: row['date'] for row in rows}
+                touched_dates.update(deleted.values())
+
+            if updates:
+                # old is a second reference to the row, so RETURNING sees its date before the update
+                rows = await self.conn.fetch(
+                    """
+                    UPDATE driver_availability da
+                    SET driver_id = COALESCE(u.driver_id, da.driver_id),
+                        date = COALESCE(u.date, da.date),
+                        available = COALESCE(u.available, da.available),
+                        shift_preference = CASE WHEN u.set_shift_preference THEN u.shift_preference ELSE da.shift_preference END,
+                        notes = CASE WHEN u.set_notes THEN u.notes ELSE da.notes END,
+                        updated_at = CURRENT_TIMESTAMP
+                    FROM unnest($1::int[], $2::int[], $3::date[], $4::bool[], $5::bool[], $6::text[], $7::bool[], $8::text[])
+                         AS u(id, driver_id, date, available, set_shift_preference, shift_preference, set_notes, notes),
+                         driver_availability old
+                    WHERE da.id = u.id AND old.id = u.id
+                    RETURNING da.id, da.driver_id, da.date, da.available, da.shift_preference, da.notes,
+                              da.created_at, da.updated_at, old.date AS previous_date
+                    """,
+                    [update['id'] for update in updates],
+                    [update.get('driver_id') for update in updates],
+                    [update.get('date') for update in updates],
+                    [update.get('available') for update in updates],
+                    ['shift_preference' in update for update in updates],
+                    [update.get('shift_preference') for update in updates],
+                    ['notes' in update for update in updates],
+                    [update.get('notes') for update in updates]
+                )
+                for row in rows:
+                    record = dict(row)
+                    touched_dates.update((record.pop('previous_date'), record['date']))
+                    updated[record['id']] = record
+
+            created = {(row['driver_id'], row['date']): row for row in await self._upsert_availability(creates)}
+            touched_dates.update(key[1] for key in created)
+            if touched_dates:
+                await self._publish_change('driver_availability', dates=touched_dates)
+        return {"created": created, "updated": updated, "deleted": deleted}
+
     async def get_availability_for_week(self, week_start: date) -> List[Dict]:
         """Get all availability records for a week - OPTIMIZED VERSION"""
-        from datetime import timedelta
-
         week_end = week_start + timedelta(days=7)
-        cache_key = str(week_start)
-        cached_entry = AVAILABILITY_CACHE.get(cache_key)
-        if cached_entry and (time.time() - cached_entry[0]) < AVAILABILITY_CACHE_TTL:
+        cached = AVAILABILITY_CACHE.get(week_start)
+        if cached is not None:
             print(f"♻️  [AVAILABILITY] Returning cached data for week {week_start}")
-            return cached_entry[1]
+            return cached
 
         print(f"\n{'='*60}")
         print(f"🔍 [DB SERVICE] get_availability_for_week")
@@ -408,10 +1129,7 @@ class DatabaseService:
         # Step 1: Check record count first
         try:
             start = time.time()
-            count = await self.conn.fetchval(
-                "SELECT COUNT(*) FROM driver_availability WHERE date >= $1 AND date < $2",
-                week_start, week_end
-            )
+            count = await self._fetchval_hot('availability_count_for_week', week_start, week_end)
             count_time = time.time() - start
             print(f"📊 Step 1: COUNT query")
             print(f"   Found: {count} records")
@@ -419,7 +1137,7 @@ class DatabaseService:
 
             if count == 0:
                 print(f"⚠️  No availability records found for this week!")
-                AVAILABILITY_CACHE[cache_key] = (time.time(), [])
+                AVAILABILITY_CACHE.set(week_start, [])
                 return []
 
             if count > 5000:
@@ -429,28 +1147,14 @@ class DatabaseService:
             print(f"❌ COUNT query failed: {str(e)}")
 
         # Step 2: Try main query with JOIN
-        query = """
-            SELECT 
-                da.id, 
-                da.driver_id, 
-                da.date, 
-                da.available, 
-                da.notes,
-                da.created_at, 
-                da.updated_at,
-                d.name as driver_name
-            FROM driver_availability da
-            INNER JOIN drivers d ON da.driver_id = d.driver_id
-            WHERE da.date >= $1 AND da.date < $2
-            ORDER BY d.name, da.date
-        """
+        query = HOT_STATEMENTS['availability_for_week']
 
         print(f"\n🔄 Step 2: Main JOIN query")
         print(f"   Query: {query[:100]}...")
 
         try:
             start = time.time()
-            rows = await self.conn.fetch(query, week_start, week_end)
+            rows = await self._fetch_hot('availability_for_week', week_start, week_end)
             elapsed = time.time() - start
 
             print(f"✅ JOIN query SUCCESS")
@@ -462,7 +1166,7 @@ class DatabaseService:
 
             print(f"{'='*60}\n")
             result = [dict(row) for row in rows]
-            AVAILABILITY_CACHE[cache_key] = (time.time(), result)
+            AVAILABILITY_CACHE.set(week_start, result)
             return result
 
         except Exception as e:
@@ -513,7 +1217,7 @@ class DatabaseService:
                 print(f"   Total time: {total_fallback_time:.3f}s")
                 print(f"   Returned: {len(result)} records")
                 print(f"{'='*60}\n")
-                AVAILABILITY_CACHE[cache_key] = (time.time(), result)
+                AVAILABILITY_CACHE.set(week_start, result)
                 return result
             except Exception as fallback_error:
                 print(f"⚠️ FALLBACK also FAILED: {str(fallback_error)}")
@@ -558,9 +1262,59 @@ class DatabaseService:
             update_data.get('notes', existing.get('notes')),
             availability_id
         )
+        await self._publish_change(
+            'driver_availability',
+            dates={existing['date'], update_data.get('date', existing['date'])}
+        )
         return dict(row) if row else None
 
-    
+    async def mark_drivers_unavailable_for_holidays(
+        self,
+        holidays: List[Dict[str, Any]],
+        driver_ids: Optional[List[int]] = None
+    ) -> int:
+        """
+        Mark drivers unavailable on every holiday date in a single statement.
+
+        Expands drivers × holidays server-side instead of one SELECT + INSERT per pair.
+        If driver_ids is None, all drivers are affected. Returns the number of rows written.
+        """
+        # One row per date - ON CONFLICT DO UPDATE cannot touch the same row twice
+        holiday_names: Dict[date, str] = {}
+        for holiday in holidays:
+            holiday_date = holiday['date']
+            if isinstance(holiday_date, str):
+                holiday_date = date.fromisoformat(holiday_date)
+            holiday_names.setdefault(holiday_date, str(holiday['name']))
+
+        if not holiday_names:
+            return 0
+
+        query = """
+            INSERT INTO driver_availability (driver_id, date, available, notes)
+            SELECT d.driver_id, h.date, FALSE, 'Feiertag: ' || h.name
+            FROM drivers d
+            CROSS JOIN unnest($1::date[], $2::text[]) AS h(date, name)
+            WHERE $3::int[] IS NULL OR d.driver_id = ANY($3::int[])
+            ON CONFLICT (driver_id, date) DO UPDATE
+            SET available = FALSE,
+                notes = CASE
+                    WHEN driver_availability.notes IS NULL THEN EXCLUDED.notes
+                    WHEN position(EXCLUDED.notes IN driver_availability.notes) > 0 THEN driver_availability.notes
+                    ELSE driver_availability.notes || '; ' || EXCLUDED.notes
+                END,
+                updated_at = CURRENT_TIMESTAMP
+        """
+        result = await self.conn.execute(
+            query,
+            list(holiday_names.keys()),
+            list(holiday_names.values()),
+            driver_ids
+        )
+        await self._publish_change('driver_availability', dates=holiday_names.keys())
+        # Status string is "INSERT 0 <rows>"
+        return int(result.split()[-1])
+
     async def delete_availability_for_week(self, week_start: date):
         """Delete availability records for a week"""
         query = """
@@ -569,6 +1323,7 @@ class DatabaseService:
         """
         
         await self.conn.execute(query, week_start)
+        await self._publish_change('driver_availability', dates=_week_dates(week_start))
     
     # ============= FIXED ASSIGNMENT OPERATIONS =============
     
@@ -602,24 +1357,36 @@ class DatabaseService:
                 assignment_data['route_id'],
                 assignment_data['date']
             )
+            await self._publish_change('fixed_assignments', dates=[assignment_data['date']])
         
         return assignment_id
     
-    async def get_fixed_assignments_for_week(self, week_start: date) -> List[Dict]:
-        """Get all fixed assignments for a week"""
+    async def create_fixed_assignments_batch(self, assignments: List[Dict[str, Any]]) -> int:
+        """Create many fixed assignments in one statement, skipping existing ones. Returns rows inserted"""
+        if not assignments:
+            return 0
+
         query = """
-            SELECT fa.id, fa.driver_id, fa.route_id, fa.date,
-                   fa.created_at, fa.updated_at,
-                   d.name as driver_name,
-                   r.route_name
-            FROM fixed_assignments fa
-            JOIN drivers d ON fa.driver_id = d.driver_id
-            LEFT JOIN routes r ON fa.route_id = r.route_id
-            WHERE fa.date >= $1 AND fa.date < $1 + INTERVAL '7 days'
-            ORDER BY d.name, fa.date
+            INSERT INTO fixed_assignments (driver_id, route_id, date)
+            SELECT * FROM unnest($1::int[], $2::int[], $3::date[])
+            ON CONFLICT (driver_id, date, route_id) DO NOTHING
         """
-        
-        rows = await self.conn.fetch(query, week_start)
+        result = await self.conn.execute(
+            query,
+            [assignment['driver_id'] for assignment in assignments],
+            [assignment['route_id'] for assignment in assignments],
+            [assignment['date'] for assignment in assignments]
+        )
+        await self._publish_change(
+            'fixed_assignments',
+            dates={assignment['date'] for assignment in assignments}
+        )
+        # Status string is "INSERT 0 <rows>"
+        return int(result.split()[-1])
+
+    async def get_fixed_assignments_for_week(self, week_start: date) -> List[Dict]:
+        """Get all fixed assignments for a week"""
+        rows = await self._fetch_hot('fixed_assignments_for_week', week_start)
         return [dict(row) for row in rows]
 
     async def get_fixed_assignment_by_id(self, assignment_id: int) -> Optional[Dict[str, Any]]:
@@ -647,14 +1414,327 @@ class DatabaseService:
         """
         
         await self.conn.execute(query, week_start)
+        await self._publish_change('fixed_assignments', dates=_week_dates(week_start))
     
     async def delete_fixed_assignment(self, assignment_id: int) -> bool:
         """Delete a single fixed assignment"""
-        result = await self.conn.execute(
-            "DELETE FROM fixed_assignments WHERE id = $1",
+        deleted_date = await self.conn.fetchval(
+            "DELETE FROM fixed_assignments WHERE id = $1 RETURNING date",
             assignment_id
         )
-        return result and result.endswith("1")
+        if deleted_date is None:
+            return False
+        await self._publish_change('fixed_assignments', dates=[deleted_date])
+        return True
+    
+    # ============= UPLOAD HISTORY =============
+    
+    async def get_data_version(self) -> int:
+        """Current data version (advanced on every planning-table write, see bump_data_version)"""
+        version = await self._fetchval_hot('data_version')
+        return version or 0
+    
+    async def bump_data_version(self) -> int:
+        """
+        Advance the data version after a planning-table write has committed (see _after_commit).
+        
+        The triggers take their nextval while the transaction is still open, so a
+        reader can pair such a version with the rows from before the commit. One more
+        step after commit gives the committed data a version nobody has seen yet.
+        """
+        self.data_version = await self.conn.fetchval("SELECT nextval('data_version_seq')")
+        return self.data_version
+    
+    async def find_reusable_upload(
+        self,
+        file_hash: str,
+        week_start: date,
+        action: str,
+        depot: Optional[str],
+        unavailable_drivers: List[Dict[str, Any]]
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Find an identical completed upload whose result is still what the database holds.
+        
+        Returns {'id', 'response'} with the stored UploadResponse dict, or None if the
+        upload has to run.
+        """
+        row = await self.conn.fetchrow(
+            """
+            SELECT uh.id, uh.response
+            FROM upload_history uh
+            WHERE uh.file_hash = $1
+              AND uh.week_start = $2
+              AND uh.action = $3
+              AND uh.depot IS NOT DISTINCT FROM $4
+              AND uh.unavailable_drivers = $5::jsonb
+              AND uh.status = 'success'
+              AND uh.response IS NOT NULL
+              AND uh.data_version = current_data_version()
+            ORDER BY uh.completed_at DESC
+            LIMIT 1
+            """,
+            file_hash,
+            week_start,
+            action,
+            depot,
+            unavailable_drivers
+        )
+        if not row:
+            return None
+        return dict(row)
+    
+    async def start_upload_history(
+        self,
+        filename: str,
+        week_start: date,
+        action: str,
+        depot: Optional[str],
+        file_hash: str,
+        unavailable_drivers: List[Dict[str, Any]]
+    ) -> int:
+        """Record an upload as 'processing', return its id"""
+        return await self.conn.fetchval(
+            """
+            INSERT INTO upload_history
+                (filename, week_start, action, depot, file_hash, unavailable_drivers, status)
+            VALUES ($1, $2, $3, $4, $5, $6::jsonb, 'processing')
+            RETURNING id
+            """,
+            filename,
+            week_start,
+            action,
+            depot,
+            file_hash,
+            unavailable_drivers
+        )
+    
+    async def complete_upload_history(
+        self,
+        upload_id: int,
+        records_affected: Dict[str, int],
+        response: Dict[str, Any],
+        data_version: int
+    ):
+        """Mark an upload successful and store its response and the resulting data version"""
+        await self.conn.execute(
+            """
+            UPDATE upload_history
+            SET status = 'success',
+                records_affected = $2::jsonb,
+                response = $3::jsonb,
+                data_version = $4,
+                completed_at = NOW()
+            WHERE id = $1
+            """,
+            upload_id,
+            records_affected,
+            response,
+            data_version
+        )
+    
+    async def get_upload_history(self, upload_id: int) -> Optional[Dict[str, Any]]:
+        """One upload_history row"""
+        row = await self.conn.fetchrow(
+            """
+            SELECT id, filename, week_start, action, status, records_affected, response,
+                   error_message, uploaded_at, completed_at, sheets_sync
+            FROM upload_history
+            WHERE id = $1
+            """,
+            upload_id
+        )
+        return dict(row) if row else None
+    
+    async def set_upload_sheets_sync(self, upload_id: int, sheets_sync: Dict[str, Any]):
+        """Store the outcome of an upload's background Google Sheets sync"""
+        await self.conn.execute(
+            "UPDATE upload_history SET sheets_sync = $2 WHERE id = $1",
+            upload_id,
+            sheets_sync
+        )
+    
+    async def fail_upload_history(self, upload_id: int, error_message: str):
+        """Mark an upload failed"""
+        await self.conn.execute(
+            """
+            UPDATE upload_history
+            SET status = 'failed',
+                error_message = $2,
+                completed_at = NOW()
+            WHERE id = $1
+            """,
+            upload_id,
+            error_message
+        )
+    
+    # ============= NOTIFICATIONS =============
+    
+    NOTIFICATION_COLUMNS = """
+        id, driver_name, date, reason, actual_message, whatsapp_from,
+        status, created_at, updated_at, resolved_at, seq
+    """
+    
+    async def get_notifications(self, resolved_since: datetime) -> List[Dict[str, Any]]:
+        """Open notifications plus those resolved after resolved_since, oldest first"""
+        rows = await self.conn.fetch(
+            f"""
+            SELECT {self.NOTIFICATION_COLUMNS}
+            FROM notifications
+            WHERE status <> 'resolved' OR resolved_at >= $1
+            ORDER BY created_at, id
+            """,
+            resolved_since
+        )
+        return [dict(row) for row in rows]
+    
+    async def create_notification(self, notification: Dict[str, Any]) -> Tuple[Dict[str, Any], bool]:
+        """
+        Insert a notification unless one is already open for the same driver and date.
+        
+        Returns (row, created); row is the existing open notification if not created.
+        """
+        while True:
+            row = await self.conn.fetchrow(
+                f"""
+                INSERT INTO notifications (id, driver_name, date, reason, actual_message, whatsapp_from)
+                VALUES ($1, $2, $3, $4, $5, $6)
+                ON CONFLICT (driver_name, date) WHERE status <> 'resolved' DO NOTHING
+                RETURNING {self.NOTIFICATION_COLUMNS}
+                """,
+                notification['id'],
+                notification['driver_name'],
+                notification['date'],
+                notification.get('reason') or '',
+                notification.get('actual_message'),
+                notification.get('whatsapp_from')
+            )
+            if row:
+                await self._publish_change('notifications')
+                return dict(row), True
+            
+            existing = await self.conn.fetchrow(
+                f"""
+                SELECT {self.NOTIFICATION_COLUMNS}
+                FROM notifications
+                WHERE driver_name = $1 AND date = $2 AND status <> 'resolved'
+                """,
+                notification['driver_name'],
+                notification['date']
+            )
+            if existing:
+                return dict(existing), False
+            # The conflicting notification was resolved in between - the key is free again
+    
+    async def resolve_notification(self, notification_id: str) -> Optional[Dict[str, Any]]:
+        """Mark an open notification resolved, return it (None if missing or already resolved)"""
+        row = await self.conn.fetchrow(
+            f"""
+            UPDATE notifications
+            SET status = 'resolved', resolved_at = NOW(), updated_at = NOW()
+            WHERE id = $1 AND status <> 'resolved'
+            RETURNING {self.NOTIFICATION_COLUMNS}
+            """,
+            notification_id
+        )
+        if not row:
+            return None
+        await self._publish_change('notifications')
+        return dict(row)
+    
+    async def purge_resolved_notifications(self, resolved_before: datetime) -> int:
+        """Delete notifications resolved before the given time, return how many"""
+        result = await self.conn.execute(
+            """
+            DELETE FROM notifications
+            WHERE status = 'resolved' AND resolved_at < $1
+            """,
+            resolved_before
+        )
+        deleted = int(result.split()[-1])
+        if deleted:
+            await self._publish_change('notifications')
+        return deleted
+    
+    # ============= REPLY OUTBOX =============
+    
+    REPLY_COLUMNS = """
+        id, recipient, reply, status, attempts, next_attempt_at, last_error,
+        response_status, created_at, updated_at, sent_at
+    """
+    
+    async def enqueue_reply(self, recipient: str, reply: str) -> Dict[str, Any]:
+        """Queue a reply for the outbox worker, return the outbox row"""
+        row = await self.conn.fetchrow(
+            f"""
+            INSERT INTO reply_outbox (recipient, reply)
+            VALUES ($1, $2)
+            RETURNING {self.REPLY_COLUMNS}
+            """,
+            recipient,
+            reply
+        )
+        return dict(row)
+    
+    async def get_reply(self, reply_id: int) -> Optional[Dict[str, Any]]:
+        row = await self.conn.fetchrow(
+            f"SELECT {self.REPLY_COLUMNS} FROM reply_outbox WHERE id = $1",
+            reply_id
+        )
+        return dict(row) if row else None
+    
+    async def claim_due_replies(self, limit: int, stuck_after_seconds: float) -> List[Dict[str, Any]]:
+        """
+        Mark up to `limit` due replies as sending and return them.
+        
+        Rows left in 'sending' for stuck_after_seconds (worker died mid-send) are due
+        again. SKIP LOCKED keeps workers of other processes from claiming the same rows.
+        """
+        rows = await self.conn.fetch(
+            f"""
+            UPDATE reply_outbox
+            SET status = 'sending', attempts = attempts + 1, updated_at = NOW()
+            WHERE id IN (
+                SELECT id FROM reply_outbox
+                WHERE (status = 'pending' AND next_attempt_at <= NOW())
+                   OR (status = 'sending' AND updated_at < NOW() - make_interval(secs => $2))
+                ORDER BY next_attempt_at
+                LIMIT $1
+                FOR UPDATE SKIP LOCKED
+            )
+            RETURNING {self.REPLY_COLUMNS}
+            """,
+            limit,
+            stuck_after_seconds
+        )
+        return [dict(row) for row in rows]
+    
+    async def finish_reply(
+        self,
+        reply_id: int,
+        status: str,
+        response_status: Optional[int] = None,
+        error: Optional[str] = None,
+        retry_in_seconds: Optional[float] = None
+    ):
+        """Record a send attempt: 'sent', 'failed', or 'pending' again after retry_in_seconds"""
+        await self.conn.execute(
+            """
+            UPDATE reply_outbox
+            SET status = $2,
+                response_status = $3,
+                last_error = $4,
+                next_attempt_at = NOW() + make_interval(secs => COALESCE($5, 0)),
+                sent_at = CASE WHEN $2 = 'sent' THEN NOW() END,
+                updated_at = NOW()
+            WHERE id = $1
+            """,
+            reply_id,
+            status,
+            response_status,
+            error,
+            retry_in_seconds
+        )
     
     # ============= HELPER METHODS =============
     
@@ -680,13 +1760,7 @@ class DatabaseService:
         if not row:
             return None
         row_dict = dict(row)
-        details = row_dict.get('details') or {}
-        if isinstance(details, str):
-            try:
-                details = json.loads(details)
-            except json.JSONDecodeError:
-                details = {}
-        row_dict['details'] = details
+        row_dict['details'] = row_dict.get('details') or {}
         return row_dict
 
     async def update_route(self, route_id: int, update_data: Dict[str, Any]) -> Optional[Dict]:
@@ -713,28 +1787,28 @@ class DatabaseService:
             new_route_name,
             new_date,
             new_day,
-            json.dumps(new_details),
+            new_details,
             route_id
         )
         if not row:
             return None
+        # Fixed assignments show the route name
+        await self._publish_change('routes', 'fixed_assignments', dates={existing['date'], row['date']})
         updated = dict(row)
-        details = updated.get('details') or {}
-        if isinstance(details, str):
-            try:
-                details = json.loads(details)
-            except json.JSONDecodeError:
-                details = {}
-        updated['details'] = details
+        updated['details'] = updated.get('details') or {}
         return updated
 
     async def delete_route(self, route_id: int) -> bool:
         """Delete a route by ID"""
-        result = await self.conn.execute(
-            "DELETE FROM routes WHERE route_id = $1",
+        deleted_date = await self.conn.fetchval(
+            "DELETE FROM routes WHERE route_id = $1 RETURNING date",
             route_id
         )
-        return result.endswith("1")
+        if deleted_date is None:
+            return False
+        # Fixed assignments cascade with the route
+        await self._publish_change('routes', 'fixed_assignments', dates=[deleted_date])
+        return True
 
     async def delete_driver(self, driver_id: int) -> bool:
         """Delete a driver by ID"""
@@ -742,4 +1816,6 @@ class DatabaseService:
             "DELETE FROM drivers WHERE driver_id = $1",
             driver_id
         )
+        # Availability rows and fixed assignments cascade with the driver
+        await self._publish_change('drivers', 'driver_availability', 'fixed_assignments')
         return result.endswith("1")
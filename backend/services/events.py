@@ -0,0 +1,223 @@
+import asyncio
+import itertools
+import json
+from collections import deque
+from datetime import datetime
+from typing import Any, AsyncIterator, Deque, Dict, List, Optional, Set
+
+from config.settings import settings
+from services.cache import WORKER_ID
+
+
+class Event:
+    """
+    One published event. The id ("<publishing worker>-<counter>") is assigned once by
+    the publishing worker and sent along to the others, so it names the same event
+    on every worker and doubles as the SSE id.
+    """
+
+    __slots__ = ("id", "topic", "type", "data", "created_at")
+
+    def __init__(self, event_id: str, topic: str, event_type: str, data: Dict[str, Any], created_at: str):
+        self.id = event_id
+        self.topic = topic
+        self.type = event_type
+        self.data = data
+        self.created_at = created_at
+
+    def to_sse(self) -> bytes:
+        """Server-Sent Events frame"""
+        body = json.dumps({**self.data, "created_at": self.created_at}, default=str)
+        return f"id: {self.id}\nevent: {self.type}\ndata: {body}\n\n".encode()
+
+
+class Subscription:
+    """Queue of events for one subscriber; the oldest events are dropped if it falls behind"""
+
+    def __init__(self, bus: 'EventBus', topic: str, max_size: int):
+        self.bus = bus
+        self.topic = topic
+        self.queue: "asyncio.Queue[Event]" = asyncio.Queue(maxsize=max_size)
+        self.dropped = 0
+
+    def put(self, event: Event):
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait(event)
+
+    async def get(self, timeout: Optional[float] = None) -> Optional[Event]:
+        """Next event, or None after timeout seconds"""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def close(self):
+        self.bus._subscribers.get(self.topic, set()).discard(self)
+
+
+class EventBus:
+    """
+    In-process pub/sub for live events (upload progress, ...).
+
+    publish() is synchronous and never blocks, so it can be called from progress
+    hooks. Each topic keeps its last EVENT_REPLAY_SIZE events so a subscriber that
+    (re)connects with a Last-Event-ID gets what it missed. Only reaches subscribers
+    of this worker process - see PostgresEventBus for several workers.
+    """
+
+    def __init__(self, replay_size: int, subscriber_queue_size: int):
+        self.replay_size = replay_size
+        self.subscriber_queue_size = subscriber_queue_size
+        self._ids = itertools.count(1)
+        self._replay: Dict[str, Deque[Event]] = {}
+        self._subscribers: Dict[str, Set[Subscription]] = {}
+
+    async def start(self):
+        pass
+
+    async def stop(self):
+        pass
+
+    def publish(self, topic: str, event_type: str, data: Dict[str, Any]):
+        self._deliver(self._next_id(), topic, event_type, data, datetime.utcnow().isoformat())
+
+    def _next_id(self) -> str:
+        return f"{WORKER_ID}-{next(self._ids)}"
+
+    def _deliver(self, event_id: str, topic: str, event_type: str, data: Dict[str, Any], created_at: str):
+        event = Event(event_id, topic, event_type, data, created_at)
+        self._replay.setdefault(topic, deque(maxlen=self.replay_size)).append(event)
+        for subscription in list(self._subscribers.get(topic, ())):
+            subscription.put(event)
+
+    def subscribe(self, topic: str, last_event_id: Optional[str] = None, replay: bool = False) -> Subscription:
+        """
+        New subscription; with last_event_id, the buffered events after it are queued
+        first (with replay, all buffered events).
+
+        Ids from different workers do not sort, so replay starts after the position of
+        that event in the buffer. An id no longer buffered replays the whole buffer.
+        """
+        subscription = Subscription(self, topic, self.subscriber_queue_size)
+        if last_event_id is not None or replay:
+            buffered = list(self._replay.get(topic, ()))
+            ids = [event.id for event in buffered]
+            start = ids.index(last_event_id) + 1 if last_event_id in ids else 0
+            for event in buffered[start:]:
+                subscription.put(event)
+        self._subscribers.setdefault(topic, set()).add(subscription)
+        return subscription
+
+    async def stream(
+        self,
+        topic: str,
+        last_event_id: Optional[str] = None,
+        replay: bool = False,
+        keepalive: float = 15.0
+    ) -> AsyncIterator[Optional[Event]]:
+        """Events of a topic as they arrive; yields None every `keepalive` seconds without one"""
+        subscription = self.subscribe(topic, last_event_id, replay)
+        try:
+            while True:
+                yield await subscription.get(timeout=keepalive)
+        finally:
+            subscription.close()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": type(self).__name__,
+            "subscribers": {topic: len(subs) for topic, subs in self._subscribers.items() if subs},
+            "buffered": {topic: len(events) for topic, events in self._replay.items()},
+        }
+
+
+class PostgresEventBus(EventBus):
+    """
+    EventBus shared by all workers through Postgres NOTIFY on EVENT_BUS_CHANNEL.
+
+    Events are delivered locally right away and sent to the other workers from a
+    background task on a pool connection - not the publisher's, whose open
+    transaction would hold them back until commit. Needs the db_manager LISTEN
+    connection (see main.py).
+    """
+
+    # NOTIFY payloads must stay below 8000 bytes
+    MAX_PAYLOAD = 7900
+
+    def __init__(self, replay_size: int, subscriber_queue_size: int, channel: str):
+        super().__init__(replay_size, subscriber_queue_size)
+        self.channel = channel
+        self._outgoing: List[str] = []
+        self._wake = asyncio.Event()
+        self._sender: Optional[asyncio.Task] = None
+
+    async def start(self):
+        from database.connection import db_manager
+        await db_manager.add_listener(self.channel, self.handle_notification)
+        self._sender = asyncio.create_task(self._send_loop(), name="event-bus-notify")
+
+    async def stop(self):
+        if self._sender:
+            self._sender.cancel()
+            await asyncio.gather(self._sender, return_exceptions=True)
+            self._sender = None
+
+    def publish(self, topic: str, event_type: str, data: Dict[str, Any]):
+        event_id = self._next_id()
+        created_at = datetime.utcnow().isoformat()
+        self._deliver(event_id, topic, event_type, data, created_at)
+        message = {
+            "id": event_id, "topic": topic, "type": event_type, "data": data,
+            "created_at": created_at, "origin": WORKER_ID
+        }
+        payload = json.dumps(message, default=str)
+        if len(payload.encode()) > self.MAX_PAYLOAD:
+            message["data"] = {"truncated": True, **{k: v for k, v in data.items() if k == "upload_id"}}
+            payload = json.dumps(message, default=str)
+        self._outgoing.append(payload)
+        self._wake.set()
+
+    async def _send_loop(self):
+        from database.connection import db_manager
+        while True:
+            await self._wake.wait()
+            self._wake.clear()
+            payloads, self._outgoing = self._outgoing, []
+            if not payloads:
+                continue
+            try:
+                async with db_manager.pool.acquire() as conn:
+                    await conn.execute(
+                        "SELECT pg_notify($1, payload) FROM unnest($2::text[]) AS payload",
+                        self.channel,
+                        payloads
+                    )
+            except Exception as e:
+                print(f"⚠️  [EVENTS] Could not NOTIFY {len(payloads)} events: {e}")
+
+    def handle_notification(self, connection, pid: int, channel: str, payload: str):
+        """asyncpg listener callback: deliver events published by other workers"""
+        try:
+            message = json.loads(payload)
+        except json.JSONDecodeError:
+            print(f"⚠️  [EVENTS] Ignoring malformed event payload: {payload[:100]}")
+            return
+        if message.get("origin") == WORKER_ID:
+            return
+        self._deliver(
+            message["id"], message["topic"], message["type"], message.get("data") or {}, message.get("created_at")
+        )
+
+
+def _create_event_bus() -> EventBus:
+    if settings.EVENT_BUS_BACKEND == "postgres":
+        return PostgresEventBus(settings.EVENT_REPLAY_SIZE, settings.EVENT_SUBSCRIBER_QUEUE_SIZE, settings.EVENT_BUS_CHANNEL)
+    if settings.EVENT_BUS_BACKEND != "memory":
+        print(f"⚠️  Unknown EVENT_BUS_BACKEND '{settings.EVENT_BUS_BACKEND}' - using memory")
+    return EventBus(settings.EVENT_REPLAY_SIZE, settings.EVENT_SUBSCRIBER_QUEUE_SIZE)
+
+
+# Global event bus (started/stopped in main.py)
+event_bus = _create_event_bus()
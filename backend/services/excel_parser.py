@@ -1,7 +1,7 @@
 import openpyxl
 from openpyxl.worksheet.worksheet import Worksheet
 from datetime import datetime, date, timedelta
-from typing import Dict, List, Tuple, Optional, Any
+from typing import Callable, Dict, List, Tuple, Optional, Any, Iterator
 import re
 
 
@@ -14,6 +14,9 @@ class ExcelParser:
     4. Dienstplan (Weekly Planning Grid) - DP-Vorlage
     """
     
+    # Called with every warning message (from the parsing thread during uploads)
+    on_warning: Optional[Callable[[str], None]] = None
+    
     def __init__(self, file_path: str):
         self.file_path = file_path
         # keep_vba=False tells openpyxl to ignore macros and just read the data
@@ -27,9 +30,17 @@ class ExcelParser:
             'school_days': {}
         }
         self.seasonal_routes = {}
+        # (route_name, date) of every generated route, for fixed assignment lookups
+        self.route_keys = set()
         
         print(f"📊 Available sheets in Excel: {self.workbook.sheetnames}")
     
+    def _warn(self, message: str, indent: str = ""):
+        """Print a warning and pass it on to on_warning"""
+        print(f"{indent}⚠️ {message}")
+        if self.on_warning:
+            self.on_warning(message)
+    
     def _find_sheet(self, *possible_names):
         """Find sheet by multiple possible names (case-insensitive)"""
         sheet_names_lower = {name.lower(): name for name in self.workbook.sheetnames}
@@ -43,6 +54,30 @@ class ExcelParser:
     
     def parse_all(self, week_start: date) -> Dict[str, Any]:
         """Parse all sheets and return structured data - FIXED ORDER"""
+        for _ in self.iter_batches(week_start, keep_data=True):
+            pass
+        
+        return self.data
+    
+    def iter_batches(
+        self,
+        week_start: date,
+        batch_size: int = 500,
+        keep_data: bool = False
+    ) -> Iterator[Tuple[str, Any]]:
+        """
+        Parse all sheets (same order as parse_all), yielding (kind, records) batches
+        while the sheets are read, so they can be written while parsing continues.
+        
+        Routes, fixed assignments and 'frei' availability - the bulk of a plan - are
+        yielded every batch_size rows as they are generated and, unless keep_data
+        (parse_all), not kept in self.data, so memory stays bounded by the batch size.
+        Drivers, holidays and school days are small and needed by the later steps
+        (name matching, holiday and school day checks), so they are always kept;
+        drivers are yielded once Dienstplan has filled in their worked hours.
+        
+        Kinds: drivers, public_holidays, school_days, routes, fixed_assignments, driver_availability
+        """
         
         # 1. Parse Lenker sheet FIRST to get driver base info
         print("📋 Step 1: Parsing Lenker sheet...")
@@ -56,15 +91,44 @@ class ExcelParser:
         print("📋 Step 3: Parsing Dienstplan sheet...")
         self.parse_dienstplan_sheet(week_start)
         
+        # Drivers are final only after Dienstplan filled in their worked hours
+        yield from self._chunks('drivers', self.data['drivers'], batch_size)
+        yield ('public_holidays', list(self.data['public_holidays']))
+        yield ('school_days', dict(self.data['school_days']))
+        
         # 4. Parse Dienste sheet - now with day-by-day logic
         print("📋 Step 4: Parsing Dienste sheet...")
-        self.parse_dienste_sheet(week_start)
+        yield from self._batched(self.iter_dienste_routes(week_start), batch_size, keep_data)
         
         # 5. Parse fixed assignments from Lenker sheet
         print("📋 Step 5: Parsing fixed assignments...")
-        self.parse_fixed_assignments(week_start)
-        
-        return self.data
+        yield from self._batched(self.iter_fixed_assignments(week_start), batch_size, keep_data)
+    
+    @staticmethod
+    def _chunks(kind: str, records: List[Dict], batch_size: int) -> Iterator[Tuple[str, List[Dict]]]:
+        """Split records into (kind, batch) tuples"""
+        for start in range(0, len(records), batch_size):
+            yield (kind, records[start:start + batch_size])
+    
+    def _batched(
+        self,
+        records: Iterator[Tuple[str, Dict]],
+        batch_size: int,
+        keep_data: bool
+    ) -> Iterator[Tuple[str, List[Dict]]]:
+        """Group (kind, record) pairs into (kind, batch) tuples as they arrive"""
+        buffers: Dict[str, List[Dict]] = {}
+        for kind, record in records:
+            if keep_data:
+                self.data[kind].append(record)
+            buffer = buffers.setdefault(kind, [])
+            buffer.append(record)
+            if len(buffer) >= batch_size:
+                yield (kind, buffer)
+                buffers[kind] = []
+        for kind, buffer in buffers.items():
+            if buffer:
+                yield (kind, buffer)
     
     # ============= HELPER METHOD FOR FUZZY DRIVER MATCHING =============
     
@@ -103,7 +167,7 @@ class ExcelParser:
         sheet = self._find_sheet('DP-Vorlage', 'Dienstplan', 'Planning', 'dienstplan', 'Schedule')
         
         if not sheet:
-            print("⚠️ Planning sheet not found")
+            self._warn("Planning sheet not found")
             return
         
         print("📅 Parsing Dienstplan sheet for school days...")
@@ -163,7 +227,7 @@ class ExcelParser:
                 break
         
         if not date_row or not date_start_col:
-            print("⚠️ Could not find date row in Dienstplan")
+            self._warn("Could not find date row in Dienstplan")
             print("🔍 Will use AI to determine school vacation periods...")
             self._determine_school_days_with_ai(week_start)
             # Still try to parse driver hours
@@ -247,7 +311,7 @@ class ExcelParser:
                 missing_days.append(current_date)
         
         if missing_days:
-            print(f"⚠️ Missing {len(missing_days)} days from Excel data")
+            self._warn(f"Missing {len(missing_days)} days from Excel data")
             print("🔍 Using fallback for missing dates...")
             self._determine_school_days_with_ai(week_start)
         
@@ -288,11 +352,11 @@ class ExcelParser:
                 break
         
         if not driver_header_row:
-            print("⚠️ Could not find 'Lenker' header in Dienstplan")
+            self._warn("Could not find 'Lenker' header in Dienstplan")
             return
         
         if not ist_std_col:
-            print("⚠️ Could not find 'Ist-Std' header")
+            self._warn("Could not find 'Ist-Std' header")
             return
         
         # Parse driver hours
@@ -349,12 +413,12 @@ class ExcelParser:
                 hours_updated += 1
             else:
                 drivers_not_found.append(driver_name_str)
-                print(f"   ⚠️  {driver_name_str}: Not found in Lenker sheet")
+                self._warn(f"{driver_name_str}: Not found in Lenker sheet", indent="   ")
         
         print(f"\n📊 Hours parsing complete:")
         print(f"   ✅ Updated: {hours_updated} drivers")
         if drivers_not_found:
-            print(f"   ⚠️  Not found: {', '.join(drivers_not_found[:5])}")
+            self._warn(f"Not found: {', '.join(drivers_not_found[:5])}", indent="   ")
             if len(drivers_not_found) > 5:
                 print(f"       ... and {len(drivers_not_found) - 5} more")
     
@@ -393,12 +457,12 @@ class ExcelParser:
     
     # ============= DIENSTE SHEET PARSING =============
     
-    def parse_dienste_sheet(self, week_start: date):
-        """Parse routes sheet with day-by-day seasonal availability"""
+    def iter_dienste_routes(self, week_start: date) -> Iterator[Tuple[str, Dict]]:
+        """Parse routes sheet with day-by-day seasonal availability, yielding ('routes', route)"""
         sheet = self._find_sheet('Dienste', 'Routes', 'dienste')
         
         if not sheet:
-            print("⚠️ Routes sheet not found")
+            self._warn("Routes sheet not found")
             return
         
         print("📋 Parsing Dienste sheet...")
@@ -409,7 +473,7 @@ class ExcelParser:
         self._parse_seasonal_routes(sheet)
         
         print(f"📅 Generating routes for week starting {week_start}...")
-        self._generate_weekly_routes(week_start, route_definitions)
+        yield from self._iter_weekly_routes(week_start, route_definitions)
     
     def _parse_route_definitions(self, sheet: Worksheet) -> Dict[str, Dict]:
         """Parse first table with route details"""
@@ -474,7 +538,7 @@ class ExcelParser:
                 break
         
         if not header_row:
-            print("⚠️ Could not find seasonal routes table")
+            self._warn("Could not find seasonal routes table")
             return
         
         print(f"✅ Found seasonal routes table at row {header_row}")
@@ -542,7 +606,7 @@ class ExcelParser:
         """Get routes for specific season+school combination"""
         return self.seasonal_routes.get(season_key, [])
     
-    def _generate_weekly_routes(self, week_start: date, route_definitions: Dict):
+    def _iter_weekly_routes(self, week_start: date, route_definitions: Dict) -> Iterator[Tuple[str, Dict]]:
         """Generate route entries for each day"""
         holiday_dates = set()
         for holiday in self.data['public_holidays']:
@@ -588,7 +652,7 @@ class ExcelParser:
                     if not vad_time or vad_time == '00:00':
                         continue
                     
-                    self.data['routes'].append({
+                    yield self._route({
                         'date': current_date,
                         'route_name': route_name,
                         'day_of_week': day_name,
@@ -614,7 +678,7 @@ class ExcelParser:
                     
                     if route_name not in route_definitions:
                         if route_name in ['DI', 'MB']:
-                            self.data['routes'].append({
+                            yield self._route({
                                 'date': current_date,
                                 'route_name': route_name,
                                 'day_of_week': day_name,
@@ -636,7 +700,7 @@ class ExcelParser:
                     if not vad_time or vad_time == '00:00':
                         continue
                     
-                    self.data['routes'].append({
+                    yield self._route({
                         'date': current_date,
                         'route_name': route_name,
                         'day_of_week': day_name,
@@ -654,7 +718,12 @@ class ExcelParser:
                 
                 print(f"    ✅ Added {weekday_routes} routes")
         
-        print(f"✅ Total routes generated: {len(self.data['routes'])}")
+        print(f"✅ Total routes generated: {len(self.route_keys)}")
+    
+    def _route(self, route: Dict) -> Tuple[str, Dict]:
+        """Remember the route for fixed assignment lookups and tag it for _batched"""
+        self.route_keys.add((route['route_name'], route['date']))
+        return ('routes', route)
     
     # ============= LENKER SHEET PARSING =============
     
@@ -663,7 +732,7 @@ class ExcelParser:
         sheet = self._find_sheet('Lenker', 'Drivers', 'lenker', 'Feldkirchen')
         
         if not sheet:
-            print("⚠️ Drivers sheet not found")
+            self._warn("Drivers sheet not found")
             return
         
         first_cell = sheet.cell(1, 1).value
@@ -716,14 +785,12 @@ class ExcelParser:
     
     # ============= FIXED ASSIGNMENTS PARSING =============
     
-    def parse_fixed_assignments(self, week_start: date):
-        """Parse fixed assignments day by day"""
+    def iter_fixed_assignments(self, week_start: date) -> Iterator[Tuple[str, Dict]]:
+        """Parse fixed assignments day by day, yielding ('fixed_assignments' or 'driver_availability', record)"""
         print("📌 Parsing fixed assignments (day by day)...")
         
-        route_lookup = {}
-        for route in self.data['routes']:
-            key = (route['route_name'], route['date'])
-            route_lookup[key] = route
+        route_lookup = self.route_keys
+        counts = {'fixed_assignments': 0, 'driver_availability': 0}
         
         holiday_dates = set()
         for holiday in self.data['public_holidays']:
@@ -757,7 +824,8 @@ class ExcelParser:
                 fixed_route = str(fixed_route_raw).strip()
                 
                 if fixed_route.lower() == 'frei':
-                    self.data['driver_availability'].append({
+                    counts['driver_availability'] += 1
+                    yield ('driver_availability', {
                         'driver_name': driver_name,
                         'date': current_date,
                         'available': False,
@@ -768,7 +836,8 @@ class ExcelParser:
                 if fixed_route in ['MB', 'DI']:
                     route_key = (fixed_route, current_date)
                     if route_key in route_lookup:
-                        self.data['fixed_assignments'].append({
+                        counts['fixed_assignments'] += 1
+                        yield ('fixed_assignments', {
                             'driver_name': driver_name,
                             'route_name': fixed_route,
                             'date': current_date,
@@ -782,7 +851,8 @@ class ExcelParser:
                 
                 route_key = (primary_route_with_suffix, current_date)
                 if route_key in route_lookup:
-                    self.data['fixed_assignments'].append({
+                    counts['fixed_assignments'] += 1
+                    yield ('fixed_assignments', {
                         'driver_name': driver_name,
                         'route_name': primary_route_with_suffix,
                         'date': current_date,
@@ -791,15 +861,16 @@ class ExcelParser:
                 else:
                     route_key_no_suffix = (primary_route_base, current_date)
                     if route_key_no_suffix in route_lookup:
-                        self.data['fixed_assignments'].append({
+                        counts['fixed_assignments'] += 1
+                        yield ('fixed_assignments', {
                             'driver_name': driver_name,
                             'route_name': primary_route_base,
                             'date': current_date,
                             'notes': f'Fixed assignment ({school_status})'
                         })
         
-        print(f"✅ Created {len(self.data['fixed_assignments'])} fixed assignments")
-        print(f"✅ Created {len(self.data['driver_availability'])} 'frei' records")
+        print(f"✅ Created {counts['fixed_assignments']} fixed assignments")
+        print(f"✅ Created {counts['driver_availability']} 'frei' records")
     
     # ============= FEIERTAG SHEET PARSING =============
     
@@ -1,148 +1,256 @@
 from google.oauth2 import service_account
+from google_auth_httplib2 import AuthorizedHttp
 from googleapiclient.discovery import build
+from googleapiclient.errors import HttpError
 from googleapiclient.http import MediaFileUpload
+import google.auth.exceptions
+import httplib2
 import google.auth.transport.requests
 from config.settings import settings
+import json
 import os
-from typing import Optional
+import threading
+import time
+from typing import Dict, Optional
+
+
+class SheetNotFoundError(Exception):
+    """The target sheet does not exist or is not shared with the service account"""
 
 
 class GoogleSheetsService:
-    """Service for syncing Excel files to Google Sheets"""
+    """
+    Service for syncing Excel files to Google Sheets
+    
+    All calls go through one AuthorizedHttp, which reuses its connection and
+    refreshes the access token only when it is about to expire. Sheet name -> file
+    id lookups are cached for GOOGLE_SHEET_ID_TTL seconds in
+    GOOGLE_SHEET_ID_CACHE_FILE, so a sync is normally a single update call.
+    """
+    
+    # Files up to this size go up in one multipart request instead of a resumable session
+    SIMPLE_UPLOAD_MAX_BYTES = 5 * 1024 * 1024
     
     def __init__(self):
+        """Cheap: nothing is loaded or fetched until ensure_initialized() runs"""
         self.credentials = None
         self.drive_service = None
-        self._initialize_credentials()
-    
-    def _initialize_credentials(self):
-        """Initialize Google API credentials"""
+        self._file_ids: Dict[str, Dict] = self._load_file_ids()
+        self._file_ids_lock = threading.Lock()
+        self._init_lock = threading.Lock()
+        # disabled / unavailable (for this session) / not_initialized / ready
+        self.state = "not_initialized"
+        self.last_error: Optional[str] = None
         if not settings.ENABLE_GOOGLE_SHEETS_SYNC:
             print("ℹ️  Google Sheets sync is disabled")
-            return
+            self.state = "disabled"
+        elif not os.path.exists(settings.GOOGLE_CREDENTIALS_FILE):
+            print(f"⚠️  Google credentials file not found: {settings.GOOGLE_CREDENTIALS_FILE}")
+            print("   Google Sheets sync will be disabled for this session")
+            self.state = "unavailable"
+            self.last_error = f"Google credentials file not found: {settings.GOOGLE_CREDENTIALS_FILE}"
+    
+    def ensure_initialized(self):
+        """
+        Load credentials and build the Drive service on first use (blocking, network).
         
+        Runs on the sheet-sync thread, either for the first sync or as the warm-up after
+        startup (see SheetSyncManager.warm_up). A retryable failure (see is_retryable)
+        leaves the service not_initialized so the next call tries again; any other
+        failure marks it unavailable for this session. Raises the failure.
+        """
+        if self.drive_service:
+            return
+        with self._init_lock:
+            if self.drive_service:
+                return
+            if self.state in ("disabled", "unavailable"):
+                raise RuntimeError(f"Google Sheets service not available: {self.last_error or self.state}")
+            try:
+                self._initialize_credentials()
+            except Exception as e:
+                self.last_error = str(e)
+                if not self.is_retryable(e):
+                    self.state = "unavailable"
+                print(f"❌ Failed to initialize Google Sheets service: {str(e)}")
+                raise
+            self.state = "ready"
+            self.last_error = None
+    
+    def _initialize_credentials(self):
+        """Initialize Google API credentials"""
         credentials_path = settings.GOOGLE_CREDENTIALS_FILE
+        print(f"🔐 Loading Google credentials from: {credentials_path}")
+        credentials = service_account.Credentials.from_service_account_file(
+            credentials_path,
+            scopes=['https://www.googleapis.com/auth/drive']
+        )
         
-        if not os.path.exists(credentials_path):
-            print(f"⚠️  Google credentials file not found: {credentials_path}")
-            print("   Google Sheets sync will be disabled for this session")
-            return
+        # Fetch the first token up front; AuthorizedHttp refreshes it shortly before expiry
+        print("🔄 Refreshing authentication token...")
+        request = google.auth.transport.requests.Request()
+        credentials.refresh(request)
         
-        try:
-            print(f"🔐 Loading Google credentials from: {credentials_path}")
-            self.credentials = service_account.Credentials.from_service_account_file(
-                credentials_path,
-                scopes=['https://www.googleapis.com/auth/drive']
-            )
-            
-            # Force token refresh
-            print("🔄 Refreshing authentication token...")
-            request = google.auth.transport.requests.Request()
-            self.credentials.refresh(request)
-            
-            # Build Drive service
-            self.drive_service = build('drive', 'v3', credentials=self.credentials)
-            print("✅ Google Sheets service initialized successfully")
-            
-        except Exception as e:
-            print(f"❌ Failed to initialize Google Sheets service: {str(e)}")
-            self.credentials = None
-            self.drive_service = None
+        # Build Drive service on one authorized transport, reused by every call
+        http = AuthorizedHttp(credentials, http=httplib2.Http(timeout=settings.GOOGLE_HTTP_TIMEOUT))
+        self.drive_service = build('drive', 'v3', http=http, cache_discovery=False)
+        self.credentials = credentials
+        print("✅ Google Sheets service initialized successfully")
     
-    async def upload_excel_to_sheet(
+    def upload_excel_to_sheet(
         self, 
         excel_file_path: str, 
         sheet_name: Optional[str] = None
-    ) -> Optional[dict]:
+    ) -> dict:
         """
         Upload/replace Google Sheet with Excel file
         
+        Blocking (googleapiclient): run it on a worker thread, see services/sheet_sync.py.
+        
         Args:
             excel_file_path: Path to the Excel file
             sheet_name: Name of the Google Sheet (defaults to settings.GOOGLE_SHEET_NAME)
         
         Returns:
-            dict with file info if successful, None if failed
+            dict with file info
+        
+        Raises:
+            SheetNotFoundError, HttpError or network errors (see is_retryable)
         """
-        if not self.drive_service:
-            print("⚠️  Google Sheets service not available - skipping sync")
-            return None
+        self.ensure_initialized()
         
         if sheet_name is None:
             sheet_name = settings.GOOGLE_SHEET_NAME
         
+        print(f"\n📊 Syncing to Google Sheet: '{sheet_name}'")
+        
+        sheet = self._resolve_sheet(sheet_name)
+        try:
+            updated_file = self._update_sheet(sheet['id'], excel_file_path)
+        except HttpError as e:
+            if e.resp.status != 404:
+                raise
+            # Deleted or unshared since it was cached - look it up again
+            print(f"⚠️  Cached file {sheet['id']} for '{sheet_name}' is gone, looking the sheet up again")
+            self._forget_sheet(sheet_name)
+            sheet = self._resolve_sheet(sheet_name)
+            updated_file = self._update_sheet(sheet['id'], excel_file_path)
+        
+        print("\n" + "="*50)
+        print("🎉 SUCCESS! Google Sheet updated!")
+        print("="*50)
+        print(f"📊 Sheet name: {updated_file.get('name')}")
+        print(f"🆔 File ID: {updated_file.get('id')}")
+        print(f"🔗 View sheet: {updated_file.get('webViewLink')}")
+        print(f"⏰ Last modified: {updated_file.get('modifiedTime')}")
+        print("="*50)
+        
+        return updated_file
+    
+    def _resolve_sheet(self, sheet_name: str) -> Dict:
+        """File id and web link of the sheet called sheet_name (cached)"""
+        with self._file_ids_lock:
+            cached = self._file_ids.get(sheet_name)
+        if cached and time.time() - cached['resolved_at'] < settings.GOOGLE_SHEET_ID_TTL:
+            return cached
+        
+        # Find the Google Sheet
+        print(f"🔍 Looking for sheet: '{sheet_name}'...")
+        query = f"name='{sheet_name}' and mimeType='application/vnd.google-apps.spreadsheet'"
+        results = self.drive_service.files().list(
+            q=query, 
+            fields="files(id, name, webViewLink)"
+        ).execute()
+        
+        files = results.get('files', [])
+        
+        if not files:
+            print(f"❌ ERROR: Sheet '{sheet_name}' not found in Google Drive!")
+            print("💡 Make sure:")
+            print("   1. The sheet exists in Google Drive")
+            print("   2. The sheet name matches exactly")
+            print("   3. The service account has access to it")
+            raise SheetNotFoundError(f"Sheet '{sheet_name}' not found in Google Drive")
+        
+        sheet = {
+            'id': files[0]['id'],
+            'webViewLink': files[0].get('webViewLink', 'N/A'),
+            'resolved_at': time.time()
+        }
+        print(f"✅ Found sheet with ID: {sheet['id']}")
+        print(f"🔗 Sheet link: {sheet['webViewLink']}")
+        with self._file_ids_lock:
+            self._file_ids[sheet_name] = sheet
+            self._save_file_ids()
+        return sheet
+    
+    def _forget_sheet(self, sheet_name: str):
+        with self._file_ids_lock:
+            if self._file_ids.pop(sheet_name, None):
+                self._save_file_ids()
+    
+    def _update_sheet(self, file_id: str, excel_file_path: str) -> dict:
+        """Replace the content of file_id with the Excel file"""
+        # Upload Excel and replace content
+        print(f"📤 Uploading Excel file...")
+        from pathlib import Path
+        ext = Path(excel_file_path).suffix.lower()
+        if ext == '.xlsm':
+            mimetype = 'application/vnd.ms-excel.sheet.macroEnabled.12'
+        elif ext == '.xls':
+            mimetype = 'application/vnd.ms-excel'
+        else:
+            mimetype = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+        print(f"dY\"v Using MIME type '{mimetype}' for upload")
+        
+        media = MediaFileUpload(
+            excel_file_path,
+            mimetype=mimetype,
+            resumable=os.path.getsize(excel_file_path) > self.SIMPLE_UPLOAD_MAX_BYTES
+        )
+        
+        return self.drive_service.files().update(
+            fileId=file_id,
+            media_body=media,
+            fields='id, name, webViewLink, modifiedTime'
+        ).execute()
+    
+    @staticmethod
+    def _load_file_ids() -> Dict[str, Dict]:
         try:
-            print(f"\n📊 Syncing to Google Sheet: '{sheet_name}'")
-            
-            # Find the Google Sheet
-            print(f"🔍 Looking for sheet: '{sheet_name}'...")
-            query = f"name='{sheet_name}' and mimeType='application/vnd.google-apps.spreadsheet'"
-            results = self.drive_service.files().list(
-                q=query, 
-                fields="files(id, name, webViewLink)"
-            ).execute()
-            
-            files = results.get('files', [])
-            
-            if not files:
-                print(f"❌ ERROR: Sheet '{sheet_name}' not found in Google Drive!")
-                print("💡 Make sure:")
-                print("   1. The sheet exists in Google Drive")
-                print("   2. The sheet name matches exactly")
-                print("   3. The service account has access to it")
-                return None
-            
-            file_id = files[0]['id']
-            web_link = files[0].get('webViewLink', 'N/A')
-            print(f"✅ Found sheet with ID: {file_id}")
-            print(f"🔗 Sheet link: {web_link}")
-            
-            # Upload Excel and replace content
-            print(f"📤 Uploading Excel file...")
-            from pathlib import Path
-            ext = Path(excel_file_path).suffix.lower()
-            if ext == '.xlsm':
-                mimetype = 'application/vnd.ms-excel.sheet.macroEnabled.12'
-            elif ext == '.xls':
-                mimetype = 'application/vnd.ms-excel'
-            else:
-                mimetype = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-            print(f"dY\"v Using MIME type '{mimetype}' for upload")
-            
-            media = MediaFileUpload(
-                excel_file_path,
-                mimetype=mimetype,
-                resumable=True
-            )
-            
-            updated_file = self.drive_service.files().update(
-                fileId=file_id,
-                media_body=media,
-                fields='id, name, webViewLink, modifiedTime'
-            ).execute()
-            
-            print("\n" + "="*50)
-            print("🎉 SUCCESS! Google Sheet updated!")
-            print("="*50)
-            print(f"📊 Sheet name: {updated_file.get('name')}")
-            print(f"🆔 File ID: {updated_file.get('id')}")
-            print(f"🔗 View sheet: {updated_file.get('webViewLink')}")
-            print(f"⏰ Last modified: {updated_file.get('modifiedTime')}")
-            print("="*50)
-            
-            return updated_file
-            
-        except Exception as e:
-            print(f"\n❌ ERROR syncing to Google Sheets: {str(e)}")
-            import traceback
-            print("📋 Full error details:")
-            traceback.print_exc()
-            return None
+            with open(settings.GOOGLE_SHEET_ID_CACHE_FILE) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            print(f"⚠️  Ignoring unreadable sheet id cache {settings.GOOGLE_SHEET_ID_CACHE_FILE}: {e}")
+            return {}
+    
+    def _save_file_ids(self):
+        """Write the cache (caller holds the lock); atomic so a crash never leaves half a file"""
+        path = settings.GOOGLE_SHEET_ID_CACHE_FILE
+        try:
+            with open(f"{path}.tmp", "w") as f:
+                json.dump(self._file_ids, f)
+            os.replace(f"{path}.tmp", path)
+        except OSError as e:
+            print(f"⚠️  Could not save sheet id cache {path}: {e}")
+    
+    @staticmethod
+    def is_retryable(error: Exception) -> bool:
+        """Worth retrying: rate limits, server errors and network failures"""
+        if isinstance(error, HttpError):
+            return error.resp.status in (408, 429) or error.resp.status >= 500
+        return isinstance(error, (OSError, httplib2.HttpLib2Error, google.auth.exceptions.TransportError))
     
     def is_available(self) -> bool:
-        """Check if Google Sheets service is available"""
-        return self.drive_service is not None
+        """
+        Whether syncs can be attempted - from cached state, never touches the network.
+        True before the first initialisation; False once it is disabled, has no
+        credentials file or failed for good.
+        """
+        return self.state in ("not_initialized", "ready")
 
 
-# Global Google Sheets service instance
+# Global Google Sheets service instance (credentials are loaded on first use or warm-up)
 google_sheets_service = GoogleSheetsService()
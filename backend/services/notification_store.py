@@ -0,0 +1,239 @@
+import asyncio
+import contextvars
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+import asyncpg
+
+from config.settings import settings
+from services.cache import cache_invalidator
+from services.database_service import DatabaseService
+
+
+class NotificationStore:
+    """
+    In-process index over the notifications table.
+
+    Rows are indexed by id, by dedup key (driver_name, date) of the open ones, per
+    status in created_at order, and by seq for the change feed - all dicts, so
+    create/lookup/resolve are O(1) (amortized). The table
+    is the source of truth: the index reloads after NOTIFICATION_INDEX_TTL seconds,
+    or right away when another worker's change arrives through the cache
+    invalidation listener. Writes made through the store update the index in place.
+
+    Every insert/update gives the row a new `seq` from notifications_seq, which is
+    the cursor of the change feed (see changes()). Seqs are taken under a lock held
+    until commit (set_notification_seq), so they become visible in increasing order.
+    """
+
+    def __init__(self, ttl: float, retention_days: int):
+        self.ttl = ttl
+        self.retention = timedelta(days=retention_days)
+        self._by_id: Dict[str, Dict[str, Any]] = {}
+        self._by_key: Dict[Tuple[str, str], str] = {}  # open notifications only
+        self._by_status: Dict[str, "OrderedDict[str, None]"] = {}
+        self._feed: "OrderedDict[int, str]" = OrderedDict()  # seq -> id, ascending seq
+        self._changed = asyncio.Event()
+        # Set while this task writes through the store (see _own_write)
+        self._own = contextvars.ContextVar("notification_store_own_write", default=False)
+        self._loaded_at: Optional[float] = None
+        self._lock = asyncio.Lock()
+        self._purge_task: Optional[asyncio.Task] = None
+        self.reloads = 0
+
+    # ============= INDEX =============
+
+    def mark_stale(self, dates=None) -> int:
+        """Cache invalidation handler: reload on next use (not for the store's own writes)"""
+        if self._own.get():
+            return 0
+        self._loaded_at = None
+        self._notify()
+        return len(self._by_id)
+
+    def _notify(self):
+        """Wake the changes() waiters"""
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    @contextmanager
+    def _own_write(self):
+        """
+        Around a write made through the store: the change it publishes would mark the
+        index stale, but the caller indexes the written row itself instead.
+        
+        Only the writing task's own change is skipped: other workers' changes arrive
+        through the listener callback, outside this context, and still mark the index
+        stale while the write is in progress.
+        """
+        token = self._own.set(True)
+        try:
+            yield
+        finally:
+            self._own.reset(token)
+
+    def _index(self, row: Dict[str, Any], feed: bool = True):
+        previous = self._by_id.get(row['id'])
+        if previous:
+            self._unindex(previous)
+        self._by_id[row['id']] = row
+        self._by_status.setdefault(row['status'], OrderedDict())[row['id']] = None
+        if row['status'] != 'resolved':
+            self._by_key[(row['driver_name'], row['date'])] = row['id']
+        if not feed:
+            return
+        last_seq = next(reversed(self._feed), None)
+        self._feed[row['seq']] = row['id']
+        if last_seq is not None and row['seq'] < last_seq:
+            # Concurrent own writes finishing out of seq order - rare, re-sort once
+            self._feed = OrderedDict(sorted(self._feed.items()))
+
+    def _unindex(self, row: Dict[str, Any]):
+        self._by_id.pop(row['id'], None)
+        self._by_status.get(row['status'], {}).pop(row['id'], None)
+        key = (row['driver_name'], row['date'])
+        if self._by_key.get(key) == row['id']:
+            del self._by_key[key]
+        self._feed.pop(row['seq'], None)
+
+    def _is_fresh(self) -> bool:
+        return self._loaded_at is not None and time.monotonic() - self._loaded_at < self.ttl
+
+    async def _ensure_fresh(self, conn: asyncpg.Connection):
+        if self._is_fresh():
+            return
+        async with self._lock:
+            if self._is_fresh():
+                return
+            started = time.monotonic()
+            rows = await DatabaseService(conn).get_notifications(datetime.utcnow() - self.retention)
+            self._by_id.clear()
+            self._by_key.clear()
+            self._by_status.clear()
+            self._feed.clear()
+            for row in rows:  # created_at order
+                self._index(row, feed=False)
+            self._feed = OrderedDict(sorted((row['seq'], row['id']) for row in rows))
+            self._loaded_at = started
+            self.reloads += 1
+
+    # ============= OPERATIONS =============
+
+    async def create(self, conn: asyncpg.Connection, notification: Dict[str, Any]) -> Tuple[Dict[str, Any], bool]:
+        """Store a notification; returns (open notification for its driver/date, created)"""
+        await self._ensure_fresh(conn)
+        existing_id = self._by_key.get((notification['driver_name'], notification['date']))
+        if existing_id:
+            return self._by_id[existing_id], False
+        with self._own_write():
+            row, created = await DatabaseService(conn).create_notification(notification)
+        self._index(row)
+        self._notify()
+        return row, created
+
+    async def get(self, conn: asyncpg.Connection, notification_id: str) -> Optional[Dict[str, Any]]:
+        await self._ensure_fresh(conn)
+        return self._by_id.get(notification_id)
+
+    async def list(self, conn: asyncpg.Connection, status: str = 'pending') -> List[Dict[str, Any]]:
+        """Notifications with the given status, oldest first"""
+        await self._ensure_fresh(conn)
+        return [self._by_id[notification_id] for notification_id in self._by_status.get(status, ())]
+
+    async def resolve(self, conn: asyncpg.Connection, notification_id: str) -> Optional[Dict[str, Any]]:
+        """Resolve an open notification (frees its dedup key), None if not open"""
+        await self._ensure_fresh(conn)
+        row = self._by_id.get(notification_id)
+        if row is None or row['status'] == 'resolved':
+            return None
+        with self._own_write():
+            resolved = await DatabaseService(conn).resolve_notification(notification_id)
+        if resolved is None:
+            self.mark_stale()  # Resolved elsewhere meanwhile
+            return None
+        self._index(resolved)
+        self._notify()
+        return resolved
+
+    async def changes(self, pool: asyncpg.Pool, since: int, wait: float = 0.0) -> Tuple[List[Dict[str, Any]], int]:
+        """
+        Notifications created or updated after cursor `since` (resolved ones included,
+        so clients can drop them) and the cursor for the next call.
+
+        With `wait`, blocks up to that many seconds until there is a change. Takes a
+        pool connection only to reload the index, never for the wait itself.
+        """
+        deadline = time.monotonic() + wait
+        while True:
+            changed = self._changed
+            if not self._is_fresh():
+                async with pool.acquire() as conn:
+                    await self._ensure_fresh(conn)
+            rows = []
+            for seq in reversed(self._feed):  # newest first, stops at the cursor
+                if seq <= since:
+                    break
+                rows.append(self._by_id[self._feed[seq]])
+            rows.reverse()
+            remaining = deadline - time.monotonic()
+            if rows or remaining <= 0:
+                # Behind the client's cursor (e.g. database reset): hand out ours so it catches up
+                return rows, next(reversed(self._feed), 0)
+            try:
+                # Wake at least once per TTL to reload changes made by other workers
+                await asyncio.wait_for(changed.wait(), min(remaining, self.ttl))
+            except asyncio.TimeoutError:
+                pass
+
+    # ============= RETENTION =============
+
+    async def purge(self, conn: asyncpg.Connection) -> int:
+        """Delete notifications resolved longer than NOTIFICATION_RETENTION_DAYS ago"""
+        cutoff = datetime.utcnow() - self.retention
+        with self._own_write():
+            deleted = await DatabaseService(conn).purge_resolved_notifications(cutoff)
+        for notification_id in list(self._by_status.get('resolved', ())):
+            row = self._by_id[notification_id]
+            if row['resolved_at'] and row['resolved_at'] < cutoff:
+                self._unindex(row)
+        return deleted
+
+    def start_retention(self, pool: asyncpg.Pool, interval: float):
+        """Purge every `interval` seconds in the background"""
+        async def run():
+            while True:
+                try:
+                    async with pool.acquire() as conn:
+                        deleted = await self.purge(conn)
+                    if deleted:
+                        print(f"🧹 [NOTIFICATIONS] Purged {deleted} resolved notifications")
+                except Exception as e:
+                    print(f"⚠️  [NOTIFICATIONS] Retention purge failed: {e}")
+                await asyncio.sleep(interval)
+
+        if self._purge_task is None or self._purge_task.done():
+            self._purge_task = asyncio.create_task(run(), name="notification-retention")
+
+    async def stop_retention(self):
+        if self._purge_task:
+            self._purge_task.cancel()
+            await asyncio.gather(self._purge_task, return_exceptions=True)
+            self._purge_task = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "indexed": len(self._by_id),
+            "by_status": {status: len(ids) for status, ids in self._by_status.items()},
+            "reloads": self.reloads,
+        }
+
+
+# Global notification store
+notification_store = NotificationStore(
+    ttl=settings.NOTIFICATION_INDEX_TTL,
+    retention_days=settings.NOTIFICATION_RETENTION_DAYS
+)
+cache_invalidator.register('notifications', notification_store.mark_stale)
@@ -0,0 +1,169 @@
+import asyncio
+import random
+from typing import Any, Dict, Optional, Set
+
+import asyncpg
+import httpx
+
+from config.settings import settings
+from services.database_service import DatabaseService
+
+
+class ReplyOutbox:
+    """
+    Forwards the WhatsApp replies queued in reply_outbox to the bridge (REPLY_ENDPOINT).
+
+    A background task claims due rows and sends at most `concurrency` at a time over
+    one keep-alive httpx client, so a slow bridge never blocks request handling.
+    Network errors, 408/429 and 5xx responses are retried with exponential backoff;
+    other 4xx responses, or running out of attempts, mark the reply failed. Rows are
+    claimed with SKIP LOCKED, so every worker process can run an outbox.
+    """
+
+    RETRY_STATUSES = {408, 429}
+
+    def __init__(
+        self,
+        endpoint: str,
+        concurrency: int,
+        timeout: float,
+        max_attempts: int,
+        retry_base: float,
+        retry_max: float,
+        poll_interval: float
+    ):
+        self.endpoint = endpoint
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.max_attempts = max_attempts
+        self.retry_base = retry_base
+        self.retry_max = retry_max
+        self.poll_interval = poll_interval
+        self._pool: Optional[asyncpg.Pool] = None
+        self._client: Optional[httpx.AsyncClient] = None
+        self._task: Optional[asyncio.Task] = None
+        self._in_flight: Set[asyncio.Task] = set()
+        self._wake = asyncio.Event()
+        self.sent = 0
+        self.retried = 0
+        self.failed = 0
+
+    async def start(self, pool: asyncpg.Pool, client: Optional[httpx.AsyncClient] = None):
+        """Start the sender (idempotent); `client` replaces the default pooled client"""
+        if self._task:
+            return
+        self._pool = pool
+        self._client = client or httpx.AsyncClient(
+            timeout=self.timeout,
+            limits=httpx.Limits(max_connections=self.concurrency, max_keepalive_connections=self.concurrency)
+        )
+        self._task = asyncio.create_task(self._run(), name="reply-outbox")
+        print(f"📮 Reply outbox started ({self.concurrency} concurrent sends to {self.endpoint})")
+
+    async def stop(self):
+        """Stop sending; replies cut off mid-send are picked up again after a restart"""
+        tasks = [task for task in [self._task, *self._in_flight] if task]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._task = None
+        self._in_flight.clear()
+        if self._client:
+            await self._client.aclose()
+            self._client = None
+
+    async def enqueue(self, conn: asyncpg.Connection, recipient: str, reply: str) -> Dict[str, Any]:
+        """Store a reply in the outbox and wake the sender"""
+        row = await DatabaseService(conn).enqueue_reply(recipient, reply)
+        self._wake.set()
+        return row
+
+    def retry_delay(self, attempts: int) -> float:
+        """Backoff before the next attempt, with jitter so workers do not retry in lockstep"""
+        delay = min(self.retry_max, self.retry_base * 2 ** (attempts - 1))
+        return delay * random.uniform(0.8, 1.0)
+
+    async def _run(self):
+        while True:
+            free = self.concurrency - len(self._in_flight)
+            if free > 0:
+                try:
+                    async with self._pool.acquire() as conn:
+                        # A send never takes longer than the timeout - older 'sending' rows were orphaned
+                        due = await DatabaseService(conn).claim_due_replies(free, self.timeout * 3)
+                except Exception as e:
+                    print(f"⚠️  [REPLIES] Could not read the outbox: {e}")
+                    due = []
+                for row in due:
+                    task = asyncio.create_task(self._send(row))
+                    self._in_flight.add(task)
+                    task.add_done_callback(self._sent)
+                if len(due) == free:
+                    continue  # Probably more due - claim again once a slot frees up
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+
+    def _sent(self, task: asyncio.Task):
+        self._in_flight.discard(task)
+        self._wake.set()
+
+    async def _send(self, row: Dict[str, Any]):
+        response_status = None
+        try:
+            response = await self._client.post(self.endpoint, json={"to": row['recipient'], "reply": row['reply']})
+            response_status = response.status_code
+            print(f"[notifications] reply {row['id']} response:", response.status_code, response.text[:200])
+            if response.status_code < 400:
+                await self._finish(row, 'sent', response_status)
+                return
+            error = f"Reply endpoint error {response.status_code}: {response.text[:500]}"
+            retryable = response.status_code >= 500 or response.status_code in self.RETRY_STATUSES
+        except httpx.HTTPError as exc:
+            error = f"Failed to reach reply endpoint: {type(exc).__name__} {exc}".strip()
+            retryable = True
+        print(f"[notifications] reply {row['id']} attempt {row['attempts']} failed:", error)
+
+        if retryable and row['attempts'] < self.max_attempts:
+            await self._finish(row, 'pending', response_status, error, self.retry_delay(row['attempts']))
+        else:
+            await self._finish(row, 'failed', response_status, error)
+
+    async def _finish(self, row: Dict[str, Any], status: str, response_status: Optional[int],
+                      error: Optional[str] = None, retry_in: Optional[float] = None):
+        try:
+            async with self._pool.acquire() as conn:
+                await DatabaseService(conn).finish_reply(row['id'], status, response_status, error, retry_in)
+        except Exception as e:
+            # Left in 'sending' - claimed again once it counts as orphaned
+            print(f"⚠️  [REPLIES] Could not record reply {row['id']} as {status}: {e}")
+            return
+        if status == 'sent':
+            self.sent += 1
+        elif status == 'failed':
+            self.failed += 1
+        else:
+            self.retried += 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "running": self._task is not None,
+            "in_flight": len(self._in_flight),
+            "sent": self.sent,
+            "retried": self.retried,
+            "failed": self.failed,
+        }
+
+
+# Global reply outbox (started/stopped in main.py)
+reply_outbox = ReplyOutbox(
+    endpoint=settings.REPLY_ENDPOINT,
+    concurrency=settings.REPLY_CONCURRENCY,
+    timeout=settings.REPLY_TIMEOUT,
+    max_attempts=settings.REPLY_MAX_ATTEMPTS,
+    retry_base=settings.REPLY_RETRY_BASE,
+    retry_max=settings.REPLY_RETRY_MAX,
+    poll_interval=settings.REPLY_POLL_INTERVAL
+)
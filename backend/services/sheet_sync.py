@@ -0,0 +1,235 @@
+import asyncio
+import os
+import random
+import shutil
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Optional, Union
+
+import asyncpg
+
+from config.settings import settings
+from services.database_service import DatabaseService
+from services.google_sheets_service import google_sheets_service
+
+
+class SheetSyncJob:
+    """Copy of one upload's Excel file to a Google Sheet; sync_id is the upload_history id"""
+
+    def __init__(self, sync_id: int, file_path: str, sheet_name: str,
+                 on_change: Optional[Callable[['SheetSyncJob'], None]] = None):
+        self.sync_id = sync_id
+        self.file_path = file_path
+        self.sheet_name = sheet_name
+        self.on_change = on_change
+        self.status = "queued"  # queued -> running (-> retrying -> running) -> succeeded / failed / superseded
+        self.attempts = 0
+        self.created_at = datetime.utcnow()
+        self.started_at: Optional[datetime] = None
+        self.finished_at: Optional[datetime] = None
+        self.next_attempt_at: Optional[datetime] = None
+        self.result: Optional[Dict[str, Any]] = None
+        self.error: Optional[str] = None
+
+    def set_status(self, status: str, error: Optional[str] = None):
+        self.status = status
+        if error is not None:
+            self.error = error
+        if status in ("succeeded", "failed", "superseded"):
+            self.finished_at = datetime.utcnow()
+        if self.on_change:
+            self.on_change(self)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "sync_id": self.sync_id,
+            "sheet_name": self.sheet_name,
+            "status": self.status,
+            "attempts": self.attempts,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "next_attempt_at": self.next_attempt_at,
+            "sheet": self.result,
+            "error": self.error,
+        }
+
+
+class SheetSyncManager:
+    """
+    Runs Google Sheets syncs in the background, off the upload's critical path.
+
+    The googleapiclient calls block, so they run on a single worker thread: the
+    httplib2 transport behind drive_service is not thread-safe, and syncs of the
+    same sheet must not overlap anyway. Retryable errors (see
+    GoogleSheetsService.is_retryable) are retried with exponential backoff. A sync
+    still waiting when a newer upload for the same sheet arrives is superseded -
+    the sheet ends up with the latest file either way. The final status is stored
+    in upload_history.sheets_sync for other workers and after a restart.
+    """
+
+    def __init__(self, max_attempts: int, retry_base: float, retry_max: float, keep_finished: int):
+        self.max_attempts = max_attempts
+        self.retry_base = retry_base
+        self.retry_max = retry_max
+        self.keep_finished = keep_finished
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._jobs: "OrderedDict[int, SheetSyncJob]" = OrderedDict()
+        self._latest: Dict[str, int] = {}  # sheet name -> newest sync_id
+        self._pool: Optional[asyncpg.Pool] = None
+
+    def start(self, pool: Optional[asyncpg.Pool] = None):
+        """Start the worker (idempotent; needs a running event loop)"""
+        if pool is not None:
+            self._pool = pool
+        if self._task:
+            return
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sheet-sync")
+        self._queue = asyncio.Queue()
+        self._task = asyncio.create_task(self._worker(), name="sheet-sync")
+
+    async def stop(self):
+        """Cancel the worker; a Drive call already running finishes on its thread"""
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        if self._executor:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+        for job in self._jobs.values():
+            if job.status in ("queued", "running", "retrying"):
+                job.set_status("failed", error="Server shut down before the sync finished")
+                remove_file(job.file_path)
+
+    def warm_up(self):
+        """Initialise the Google Sheets service on the sync thread without waiting for it"""
+        self.start()
+        if google_sheets_service.state != "not_initialized":
+            return
+        print("🔄 Warming up the Google Sheets service in the background...")
+        self._executor.submit(self._warm_up)
+
+    @staticmethod
+    def _warm_up():
+        try:
+            google_sheets_service.ensure_initialized()
+        except Exception:
+            pass  # Logged by ensure_initialized; the first sync tries again if it was transient
+
+    def submit(self, sync_id: int, file_path: str, sheet_name: Optional[str],
+               on_change: Optional[Callable[[SheetSyncJob], None]] = None) -> SheetSyncJob:
+        """
+        Queue a sync of file_path. The file is linked (or copied) first, so the
+        caller may delete its own copy right away.
+        """
+        self.start()
+        sheet_name = sheet_name or settings.GOOGLE_SHEET_NAME
+        own_path = f"{file_path}.sheet-sync"
+        try:
+            os.link(file_path, own_path)
+        except OSError:
+            shutil.copyfile(file_path, own_path)
+
+        job = SheetSyncJob(sync_id, own_path, sheet_name, on_change)
+        self._latest[sheet_name] = sync_id
+        self._jobs[sync_id] = job
+        finished = [sid for sid, tracked in self._jobs.items() if tracked.finished_at]
+        for sid in finished[:max(0, len(finished) - self.keep_finished)]:
+            del self._jobs[sid]
+        self._queue.put_nowait(job)
+        job.set_status("queued")
+        return job
+
+    def get(self, sync_id: int) -> Optional[SheetSyncJob]:
+        return self._jobs.get(sync_id)
+
+    def stats(self) -> Dict[str, Any]:
+        counts: Dict[str, int] = {}
+        for job in self._jobs.values():
+            counts[job.status] = counts.get(job.status, 0) + 1
+        return {
+            "running": self._task is not None,
+            "queued": self._queue.qsize() if self._queue else 0,
+            "jobs": counts,
+        }
+
+    def retry_delay(self, attempts: int) -> float:
+        delay = min(self.retry_max, self.retry_base * 2 ** (attempts - 1))
+        return delay * random.uniform(0.8, 1.0)
+
+    async def _worker(self):
+        while True:
+            job = await self._queue.get()
+            try:
+                await self._run(job)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                job.set_status("failed", error=str(e))
+            finally:
+                if job.finished_at:
+                    remove_file(job.file_path)
+                    await self._record(job)
+                self._queue.task_done()
+
+    async def _record(self, job: SheetSyncJob):
+        if self._pool is None:
+            return
+        try:
+            async with self._pool.acquire() as conn:
+                await DatabaseService(conn).set_upload_sheets_sync(job.sync_id, job.to_dict())
+        except Exception as e:
+            print(f"⚠️  Could not record sheet sync {job.sync_id}: {e}")
+
+    async def _run(self, job: SheetSyncJob):
+        loop = asyncio.get_running_loop()
+        job.started_at = datetime.utcnow()
+        while True:
+            if self._latest.get(job.sheet_name) != job.sync_id:
+                job.set_status("superseded")
+                print(f"⏭️  Sheet sync {job.sync_id} superseded by a newer upload to '{job.sheet_name}'")
+                return
+
+            job.attempts += 1
+            job.next_attempt_at = None
+            job.set_status("running")
+            try:
+                job.result = await loop.run_in_executor(
+                    self._executor, google_sheets_service.upload_excel_to_sheet, job.file_path, job.sheet_name
+                )
+            except Exception as e:
+                if not google_sheets_service.is_retryable(e) or job.attempts >= self.max_attempts:
+                    print(f"❌ Sheet sync {job.sync_id} failed after {job.attempts} attempt(s): {e}")
+                    job.set_status("failed", error=str(e))
+                    return
+                delay = self.retry_delay(job.attempts)
+                job.next_attempt_at = datetime.utcnow() + timedelta(seconds=delay)
+                print(f"🔁 Sheet sync {job.sync_id} attempt {job.attempts} failed ({e}) - retrying in {delay:.0f}s")
+                job.set_status("retrying", error=str(e))
+                await asyncio.sleep(delay)
+                continue
+
+            job.error = None
+            job.set_status("succeeded")
+            return
+
+
+def remove_file(path: Union[str, os.PathLike]):
+    """Delete an uploaded workbook (or a copy of it); a missing file is fine"""
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+# Global sheet sync manager (worker starts with the app, see main.py)
+sheet_sync = SheetSyncManager(
+    max_attempts=settings.SHEETS_SYNC_MAX_ATTEMPTS,
+    retry_base=settings.SHEETS_SYNC_RETRY_BASE,
+    retry_max=settings.SHEETS_SYNC_RETRY_MAX,
+    keep_finished=settings.SHEETS_SYNC_HISTORY
+)
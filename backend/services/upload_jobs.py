@@ -0,0 +1,144 @@
+import asyncio
+from collections import OrderedDict
+from datetime import date, datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from config.settings import settings
+
+
+class UploadJob:
+    """One background upload; job_id is the upload_history id"""
+
+    def __init__(self, job_id: int, filename: str, week_start: date, work: Callable[['UploadJob'], Awaitable[Any]]):
+        self.job_id = job_id
+        self.filename = filename
+        self.week_start = week_start
+        self.work = work
+        self.status = "queued"  # queued -> running -> succeeded / failed
+        self.stage = "queued"  # queued, pipeline phase (drivers, routes, ...), done
+        self.progress: Dict[str, int] = {}
+        self.created_at = datetime.utcnow()
+        self.started_at: Optional[datetime] = None
+        self.finished_at: Optional[datetime] = None
+        self.result: Any = None
+        self.error: Optional[str] = None
+
+    def update(self, stage: str, progress: Optional[Dict[str, int]] = None):
+        """Progress hook for the upload code"""
+        self.stage = stage
+        if progress is not None:
+            self.progress = dict(progress)
+
+    def finish(self, result: Any = None, error: Optional[str] = None):
+        self.status = "failed" if error else "succeeded"
+        self.stage = "done"
+        self.result = result
+        self.error = error
+        self.finished_at = datetime.utcnow()
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.job_id,
+            "status": self.status,
+            "stage": self.stage,
+            "filename": self.filename,
+            "week_start": self.week_start,
+            "progress": self.progress,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "result": self.result,
+            "error": self.error,
+        }
+
+
+class UploadJobManager:
+    """
+    Runs uploads in the background on a fixed number of worker tasks.
+
+    Jobs wait in a bounded queue (submit() raises asyncio.QueueFull when it is full),
+    so a burst of uploads cannot open more than UPLOAD_JOB_WORKERS pipelines - and
+    pool connections - at once. Finished jobs are kept for status polling, oldest
+    dropped first; they are also recorded in upload_history.
+    """
+
+    def __init__(self, workers: int, queue_size: int, keep_finished: int):
+        self.workers = workers
+        self.keep_finished = keep_finished
+        self._queue: Optional[asyncio.Queue] = None
+        self._queue_size = queue_size
+        self._tasks: List[asyncio.Task] = []
+        self._jobs: "OrderedDict[int, UploadJob]" = OrderedDict()
+
+    def start(self):
+        """Start the workers (idempotent; needs a running event loop)"""
+        if self._tasks:
+            return
+        self._queue = asyncio.Queue(maxsize=self._queue_size)
+        self._tasks = [
+            asyncio.create_task(self._worker(), name=f"upload-job-worker-{n}")
+            for n in range(self.workers)
+        ]
+        print(f"🧵 Upload job workers started ({self.workers} workers, queue of {self._queue_size})")
+
+    async def stop(self):
+        """Cancel the workers; running uploads roll back"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        for job in self._jobs.values():
+            if job.status in ("queued", "running"):
+                job.finish(error="Server shut down before the upload finished")
+
+    def submit(self, job: UploadJob) -> UploadJob:
+        """Queue a job, raise asyncio.QueueFull if too many are waiting"""
+        self.start()
+        self._queue.put_nowait(job)
+        self.track(job)
+        return job
+
+    def track(self, job: UploadJob):
+        """Make a job visible to get() (e.g. one answered without running)"""
+        self._jobs[job.job_id] = job
+        finished = [job_id for job_id, tracked in self._jobs.items() if tracked.status in ("succeeded", "failed")]
+        for job_id in finished[:max(0, len(finished) - self.keep_finished)]:
+            del self._jobs[job_id]
+
+    def get(self, job_id: int) -> Optional[UploadJob]:
+        return self._jobs.get(job_id)
+
+    def stats(self) -> Dict[str, Any]:
+        counts: Dict[str, int] = {}
+        for job in self._jobs.values():
+            counts[job.status] = counts.get(job.status, 0) + 1
+        return {
+            "workers": len(self._tasks),
+            "queued": self._queue.qsize() if self._queue else 0,
+            "jobs": counts,
+        }
+
+    async def _worker(self):
+        while True:
+            job = await self._queue.get()
+            job.status = "running"
+            job.started_at = datetime.utcnow()
+            try:
+                result = await job.work(job)
+            except asyncio.CancelledError:
+                job.finish(error="Server shut down before the upload finished")
+                raise
+            except Exception as e:
+                job.finish(error=str(e))
+            else:
+                job.finish(result=result)
+            finally:
+                self._queue.task_done()
+
+
+# Global job manager (workers start with the app, see main.py)
+upload_jobs = UploadJobManager(
+    workers=settings.UPLOAD_JOB_WORKERS,
+    queue_size=settings.UPLOAD_JOB_QUEUE_SIZE,
+    keep_finished=settings.UPLOAD_JOB_HISTORY
+)
@@ -0,0 +1,351 @@
+import asyncio
+import threading
+import time
+import asyncpg
+from datetime import date, timedelta
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+from services.excel_parser import ExcelParser
+from services.database_service import DatabaseService
+from config.settings import settings
+
+
+class UploadPipeline:
+    """
+    Parse a weekly plan and write it to the database as a producer/consumer pipeline.
+
+    The parser runs in a worker thread and puts record batches into a bounded
+    asyncio.Queue; the DB writer flushes each batch with one set-based statement.
+    Routes, fixed assignments and availability are yielded while they are parsed,
+    so writes overlap with parsing and at most UPLOAD_QUEUE_SIZE batches are
+    buffered in between.
+    
+    The old data is cleared in its own short transaction before the load starts,
+    as the upload always did: TRUNCATE takes an ACCESS EXCLUSIVE lock, and holding
+    it for the whole load would block every reader until commit. The trade-off is
+    that readers see empty planning tables while the new plan loads, and a failed
+    load leaves them empty until the next upload. The load itself is one
+    transaction, so nobody sees a half-written plan. weekly_stats is recounted
+    once at the end of it instead of per batch.
+    
+    Loads run one at a time, also across upload workers: the load transaction
+    first takes an advisory lock. If anything was written between our clear and
+    getting that lock (usually another upload's plan), the tables are cleared
+    again inside the load transaction, so two plans never end up merged.
+    """
+
+    parser_class = ExcelParser
+
+    def __init__(
+        self,
+        conn: asyncpg.Connection,
+        week_start: date,
+        unavailable_list: Optional[List[Dict[str, Any]]] = None,
+        on_progress: Optional[Callable[[str, Dict[str, int]], None]] = None,
+        on_warning: Optional[Callable[[str], None]] = None
+    ):
+        self.conn = conn
+        self.db_service = DatabaseService(conn)
+        self.week_start = week_start
+        self.unavailable_list = unavailable_list or []
+
+        self.records_created = {
+            'drivers': 0,
+            'routes': 0,
+            'driver_availability': 0,
+            'fixed_assignments': 0
+        }
+        self.school_days: Dict[date, bool] = {}
+        # Per phase: rows written, statements issued, seconds spent
+        self.stats: Dict[str, Dict[str, float]] = {}
+
+        self.driver_id_map: Dict[str, int] = {}  # Map driver name to driver_id
+        self.route_id_map: Dict[Tuple[str, date], int] = {}  # Map (route_name, date) to route_id
+        self.unavailable_set: Set[Tuple[int, date]] = set()  # (driver_id, date) already unavailable
+        self._parse_seconds = 0.0
+        # Called with (phase, records_created) after every written batch
+        self.on_progress = on_progress
+        # Called with parser and writer warnings (skipped rows, missing sheets, ...)
+        self.on_warning = on_warning
+
+    async def run(self, file_path: str) -> Dict[str, Any]:
+        """Clear, then load in one transaction; return records_created, school_days, stats and data_version"""
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue(maxsize=settings.UPLOAD_QUEUE_SIZE)
+        stop = threading.Event()
+
+        producer = loop.run_in_executor(None, self._produce, file_path, queue, loop, stop)
+
+        try:
+            # ALWAYS clear ALL existing data and reset sequences (overlaps with workbook loading).
+            # Committed on its own so TRUNCATE's exclusive lock is released right away.
+            start = time.time()
+            async with self.db_service.transaction():
+                await self.db_service.clear_all_week_data()
+            self._record('clear', 0, 6, time.time() - start)  # TRUNCATE + 4 setval + data version
+            cleared_version = self.db_service.data_version
+
+            # Caches are evicted and the data version advanced once this commits
+            async with self.db_service.transaction():
+                start = time.time()
+                await self.db_service.lock_plan_load()
+                statements = 2  # lock + data version
+                if await self.db_service.get_data_version() != cleared_version:
+                    # Written to since our clear (e.g. a concurrent upload committed)
+                    await self.db_service.clear_all_week_data()
+                    statements += 5
+                self._record('lock', 0, statements, time.time() - start)
+
+                # Per-statement weekly_stats deltas are skipped; one recount before commit
+                await self.db_service.defer_week_stats()
+                await self._consume(queue)
+                await self._finish_availability()
+
+                start = time.time()
+                await self.db_service.refresh_week_stats([self.week_start])
+                self._record('week_stats', 0, 2, time.time() - start)  # SET LOCAL + recount
+                start = time.time()
+
+            # Version of the committed plan (stored in upload_history for re-upload checks)
+            data_version = self.db_service.data_version
+            self._record('data_version', 0, 1, time.time() - start)  # commit + bump
+        except BaseException:
+            # Unblock a producer waiting on a full queue, then let it exit
+            stop.set()
+            while not producer.done():
+                try:
+                    queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    await asyncio.sleep(0.01)
+            raise
+
+        await producer
+        self._record('parse', 0, 0, self._parse_seconds)
+
+        return {
+            'records_created': self.records_created,
+            'school_days': self.school_days,
+            'stats': self.stats,
+            'data_version': data_version
+        }
+
+    # ============= PRODUCER (PARSER THREAD) =============
+
+    def _produce(
+        self,
+        file_path: str,
+        queue: asyncio.Queue,
+        loop: asyncio.AbstractEventLoop,
+        stop: threading.Event
+    ):
+        """Parse the workbook and feed batches into the queue; ends with None or ('error', exc)"""
+        def put(item):
+            if not stop.is_set():
+                asyncio.run_coroutine_threadsafe(queue.put(item), loop).result()
+
+        start = time.time()
+        try:
+            parser = self.parser_class(file_path)
+            if self.on_warning:
+                # The parser runs in this thread - hand its warnings to the event loop
+                parser.on_warning = lambda message: loop.call_soon_threadsafe(self.on_warning, message)
+            for batch in parser.iter_batches(self.week_start, settings.UPLOAD_BATCH_SIZE):
+                if stop.is_set():
+                    return
+                put(batch)
+        except Exception as e:
+            put(('error', e))
+            return
+        finally:
+            self._parse_seconds = time.time() - start
+
+        put(None)
+
+    # ============= CONSUMER (DB WRITER) =============
+
+    async def _consume(self, queue: asyncio.Queue):
+        """Write batches in the order the parser produced them"""
+        while True:
+            item = await queue.get()
+            if item is None:
+                return
+
+            kind, records = item
+            if kind == 'error':
+                raise records
+
+            start = time.time()
+            if kind == 'drivers':
+                rows, statements = await self._write_drivers(records)
+            elif kind == 'public_holidays':
+                rows, statements = await self._write_holidays(records)
+            elif kind == 'school_days':
+                self.school_days = records
+                continue
+            elif kind == 'routes':
+                rows, statements = await self._write_routes(records)
+            elif kind == 'fixed_assignments':
+                rows, statements = await self._write_fixed_assignments(records)
+            elif kind == 'driver_availability':
+                rows, statements = await self._write_frei_availability(records)
+            else:
+                self._warn(f"Unknown batch kind '{kind}' - skipping")
+                continue
+            self._record(kind, rows, statements, time.time() - start)
+
+    async def _write_drivers(self, drivers: List[Dict]) -> Tuple[int, int]:
+        """1. Insert/Update Drivers"""
+        id_map = await self.db_service.upsert_drivers_batch(drivers)
+        self.driver_id_map.update(id_map)
+        self.records_created['drivers'] += len(id_map)
+        print(f"👥 Created/updated {len(id_map)} drivers")
+        return len(id_map), 1
+
+    async def _write_holidays(self, holidays: List[Dict]) -> Tuple[int, int]:
+        """2. Public holidays - mark all drivers unavailable"""
+        week_end = self.week_start + timedelta(days=7)
+        # Only add if within the week
+        week_holidays = [h for h in holidays if self.week_start <= h['date'] < week_end]
+        if not week_holidays or not self.driver_id_map:
+            return 0, 0
+
+        written = await self.db_service.mark_drivers_unavailable_for_holidays(
+            week_holidays,
+            driver_ids=list(self.driver_id_map.values())
+        )
+        for holiday in week_holidays:
+            for driver_id in self.driver_id_map.values():
+                self.unavailable_set.add((driver_id, holiday['date']))
+        self.records_created['driver_availability'] += written
+        print(f"🎉 Marked {written} holiday availability records")
+        return written, 1
+
+    async def _write_routes(self, routes: List[Dict]) -> Tuple[int, int]:
+        """3. Insert Routes"""
+        id_map = await self.db_service.create_routes_batch(routes)
+        self.route_id_map.update(id_map)
+        self.records_created['routes'] += len(id_map)
+        print(f"🚌 Created {len(id_map)} routes")
+        return len(id_map), 1
+
+    async def _write_fixed_assignments(self, assignments: List[Dict]) -> Tuple[int, int]:
+        """4. Fixed assignments - resolve names to IDs"""
+        resolved = []
+        for assignment in assignments:
+            driver_name = assignment['driver_name']
+            route_name = assignment['route_name']
+            assignment_date = assignment['date']
+
+            if driver_name not in self.driver_id_map:
+                self._warn(f"Driver '{driver_name}' not found - skipping")
+                continue
+
+            route_id = self.route_id_map.get((route_name, assignment_date))
+            if not route_id:
+                self._warn(f"Route '{route_name}' on {assignment_date} not found - skipping")
+                continue
+
+            resolved.append({
+                'driver_id': self.driver_id_map[driver_name],
+                'route_id': route_id,
+                'date': assignment_date
+            })
+
+        if not resolved:
+            return 0, 0
+        # Duplicates of an existing assignment are skipped by the insert - count what it wrote
+        inserted = await self.db_service.create_fixed_assignments_batch(resolved)
+        self.records_created['fixed_assignments'] += inserted
+        print(f"📌 Created {inserted} fixed assignments")
+        return inserted, 1
+
+    async def _write_frei_availability(self, availability: List[Dict]) -> Tuple[int, int]:
+        """5a. Driver availability from the parsed plan (frei)"""
+        records = []
+        for entry in availability:
+            driver_id = self.driver_id_map.get(entry['driver_name'])
+            if driver_id is None:
+                continue
+            records.append({
+                'driver_id': driver_id,
+                'date': entry['date'],
+                'available': entry['available'],
+                'notes': entry['notes']
+            })
+            self.unavailable_set.add((driver_id, entry['date']))
+        return await self._write_availability(records)
+
+    async def _finish_availability(self):
+        """5b. Manual unavailability, then default 'Available' rows for everything else"""
+        start = time.time()
+        records = []
+        for unavailable in self.unavailable_list:
+            driver_name = unavailable.get('driver_name')
+            dates = unavailable.get('dates', [])
+            reason = unavailable.get('reason', 'Manually set unavailable')
+
+            if driver_name not in self.driver_id_map:
+                self._warn(f"Driver '{driver_name}' not found - skipping")
+                continue
+
+            driver_id = self.driver_id_map[driver_name]
+            for date_str in dates:
+                try:
+                    unavail_date = date.fromisoformat(date_str)
+                except ValueError:
+                    self._warn(f"Invalid date format: {date_str}")
+                    continue
+                records.append({
+                    'driver_id': driver_id,
+                    'date': unavail_date,
+                    'available': False,
+                    'notes': reason
+                })
+                self.unavailable_set.add((driver_id, unavail_date))
+        rows, statements = await self._write_availability(records)
+        self._record('manual_availability', rows, statements, time.time() - start)
+
+        # Mark as available by default, unless already marked unavailable above
+        print("📅 Creating default availability records for all drivers...")
+        start = time.time()
+        records = []
+        for driver_id in self.driver_id_map.values():
+            for day_offset in range(7):
+                current_date = self.week_start + timedelta(days=day_offset)
+                if (driver_id, current_date) in self.unavailable_set:
+                    continue
+                records.append({
+                    'driver_id': driver_id,
+                    'date': current_date,
+                    'available': True,
+                    'notes': 'Available'
+                })
+        rows, statements = await self._write_availability(records)
+        self._record('default_availability', rows, statements, time.time() - start)
+        print(f"✅ Created {self.records_created['driver_availability']} availability records")
+
+    async def _write_availability(self, records: List[Dict]) -> Tuple[int, int]:
+        """Flush availability records in UPLOAD_BATCH_SIZE chunks"""
+        written = 0
+        statements = 0
+        batch_size = settings.UPLOAD_BATCH_SIZE
+        for offset in range(0, len(records), batch_size):
+            ids = await self.db_service.create_availability_batch(records[offset:offset + batch_size])
+            written += len(ids)
+            statements += 1
+        self.records_created['driver_availability'] += written
+        return written, statements
+
+    def _warn(self, message: str):
+        print(f"   ⚠️  {message}")
+        if self.on_warning:
+            self.on_warning(message)
+
+    def _record(self, phase: str, rows: int, statements: int, seconds: float):
+        """Accumulate per-phase counters"""
+        entry = self.stats.setdefault(phase, {'rows': 0, 'statements': 0, 'seconds': 0.0})
+        entry['rows'] += rows
+        entry['statements'] += statements
+        entry['seconds'] += seconds
+        if self.on_progress:
+            self.on_progress(phase, self.records_created)
@@ -0,0 +1,139 @@
+"""
+Shared test fixtures.
+
+Database tests run against a throwaway cluster (benchmarks/local_postgres.py):
+migrations.sql is applied once to a template database and every test gets a
+fresh copy. They are skipped when PostgreSQL is not available - set PG_BIN and
+run as a non-root user (initdb refuses root):
+
+    cd backend && PG_BIN=/usr/lib/postgresql/16/bin python -m pytest tests
+
+Async code is driven with asyncio.run() inside plain test functions.
+"""
+import asyncio
+import contextlib
+import glob
+import io
+import os
+import subprocess
+import sys
+import tempfile
+import uuid
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(BACKEND_DIR))
+# Settings are read at import time
+os.environ.setdefault("DATABASE_URL", "postgresql://test@localhost/test")
+os.environ.setdefault("ENABLE_GOOGLE_SHEETS_SYNC", "false")
+os.environ.setdefault("UPLOAD_DIR", tempfile.mkdtemp())
+os.environ.setdefault("GOOGLE_SHEET_ID_CACHE_FILE", os.path.join(tempfile.mkdtemp(), "google_sheet_ids.json"))
+
+import asyncpg  # noqa: E402
+import httpx  # noqa: E402
+import pytest  # noqa: E402
+
+from benchmarks.local_postgres import LocalPostgres  # noqa: E402
+from database.connection import init_json_codecs  # noqa: E402
+
+TEMPLATE_DATABASE = "app_template"
+
+
+@pytest.fixture(scope="session")
+def postgres():
+    """Local PostgreSQL with a migrated template database"""
+    try:
+        server = LocalPostgres()
+        server.start()
+    except (RuntimeError, OSError, subprocess.CalledProcessError) as e:
+        pytest.skip(f"PostgreSQL not available: {e}")
+
+    async def prepare():
+        conn = await asyncpg.connect(**server.connect_kwargs)
+        try:
+            await conn.execute(f"CREATE DATABASE {TEMPLATE_DATABASE}")
+        finally:
+            await conn.close()
+        conn = await asyncpg.connect(**{**server.connect_kwargs, "database": TEMPLATE_DATABASE})
+        try:
+            await server.apply_migrations(conn)
+        finally:
+            await conn.close()
+
+    try:
+        asyncio.run(prepare())
+        yield server
+    finally:
+        server.stop()
+
+
+@pytest.fixture
+def database(postgres):
+    """asyncpg connect kwargs of a fresh, migrated database"""
+    name = f"test_{uuid.uuid4().hex[:12]}"
+
+    async def execute(sql: str):
+        conn = await asyncpg.connect(**postgres.connect_kwargs)
+        try:
+            await conn.execute(sql)
+        finally:
+            await conn.close()
+
+    asyncio.run(execute(f"CREATE DATABASE {name} TEMPLATE {TEMPLATE_DATABASE}"))
+    yield {**postgres.connect_kwargs, "database": name}
+    asyncio.run(execute(f"DROP DATABASE IF EXISTS {name} WITH (FORCE)"))
+
+
+@contextlib.asynccontextmanager
+async def _app_client(database: dict):
+    import main
+    from database.connection import db_manager, get_db
+    from services.cache import cache_invalidator
+
+    pool = await asyncpg.create_pool(**database, init=init_json_codecs, min_size=1, max_size=4)
+
+    async def override_get_db():
+        async with pool.acquire() as conn:
+            yield conn
+
+    # Process-wide caches must not carry rows over from another test's database
+    cache_invalidator.invalidate_all()
+    db_manager.pool = pool
+    main.app.dependency_overrides[get_db] = override_get_db
+    try:
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            client.pool = pool
+            yield client
+    finally:
+        main.app.dependency_overrides.clear()
+        db_manager.pool = None
+        await pool.close()
+
+
+@pytest.fixture
+def api(database):
+    """api() -> async context manager yielding an httpx client for the app (client.pool is its pool)"""
+    return lambda: _app_client(database)
+
+
+@pytest.fixture(scope="session")
+def sample_workbook() -> str:
+    """One of the weekly plans checked in under backend/uploads"""
+    workbooks = sorted(glob.glob(str(BACKEND_DIR / "uploads" / "*Feldkirchen*.xlsx")))
+    if not workbooks:
+        pytest.skip("No sample workbook in backend/uploads")
+    return workbooks[0]
+
+
+@pytest.fixture
+def load_plan(sample_workbook):
+    """await load_plan(pool, week_start) -> loads sample_workbook through the upload pipeline, returns its result"""
+    from services.upload_pipeline import UploadPipeline
+
+    async def load(pool: asyncpg.Pool, week_start):
+        async with pool.acquire() as conn:
+            with contextlib.redirect_stdout(io.StringIO()):
+                return await UploadPipeline(conn, week_start).run(sample_workbook)
+
+    return load
@@ -0,0 +1,72 @@
+import asyncio
+
+BATCH = "/api/v1/weekly/availability/batch"
+
+
+async def _setup(pool):
+    anna = await pool.fetchval("INSERT INTO drivers (name) VALUES ('Anna') RETURNING driver_id")
+    ben = await pool.fetchval("INSERT INTO drivers (name) VALUES ('Ben') RETURNING driver_id")
+    existing = await pool.fetchval(
+        "INSERT INTO driver_availability (driver_id, date, available) VALUES ($1, '2025-07-07', TRUE) RETURNING id",
+        anna
+    )
+    doomed = await pool.fetchval(
+        "INSERT INTO driver_availability (driver_id, date, available) VALUES ($1, '2025-07-08', TRUE) RETURNING id",
+        anna
+    )
+    return anna, ben, existing, doomed
+
+
+def test_batch_reports_one_result_per_operation_in_order(api):
+    async def scenario():
+        async with api() as client:
+            anna, ben, existing, doomed = await _setup(client.pool)
+            response = await client.post(BATCH, json={"operations": [
+                {"op": "create", "driver_id": ben, "date": "2025-07-09", "available": False, "notes": "Urlaub"},
+                {"op": "create", "driver_id": anna, "date": "2025-07-07", "available": False},
+                {"op": "update", "id": doomed + 100, "notes": "missing"},
+                {"op": "delete", "id": doomed},
+                {"op": "delete", "id": doomed + 101},
+            ]})
+            rows = await client.pool.fetch("SELECT id, driver_id, date, available FROM driver_availability ORDER BY id")
+            return response, existing, rows
+
+    response, existing, rows = asyncio.run(scenario())
+    assert response.status_code == 200
+    results = response.json()["results"]
+    assert [(r["index"], r["op"], r["status"]) for r in results] == [
+        (0, "create", "created"),
+        (1, "create", "updated"),
+        (2, "update", "not_found"),
+        (3, "delete", "deleted"),
+        (4, "delete", "not_found"),
+    ]
+    assert results[1]["id"] == existing
+    assert results[0]["record"]["notes"] == "Urlaub"
+    assert [(row["id"], row["available"]) for row in rows] == [(existing, False), (results[0]["id"], False)]
+
+
+def test_batch_rejects_repeated_keys_without_writing(api):
+    async def scenario():
+        async with api() as client:
+            anna, ben, existing, doomed = await _setup(client.pool)
+            duplicate_create = await client.post(BATCH, json={"operations": [
+                {"op": "create", "driver_id": ben, "date": "2025-07-09", "notes": "Arzt"},
+                {"op": "create", "driver_id": ben, "date": "2025-07-09", "notes": "Urlaub"},
+            ]})
+            duplicate_id = await client.post(BATCH, json={"operations": [
+                {"op": "update", "id": existing, "available": False},
+                {"op": "delete", "id": existing},
+            ]})
+            unknown_driver = await client.post(BATCH, json={"operations": [
+                {"op": "create", "driver_id": ben + 100, "date": "2025-07-09"},
+            ]})
+            count = await client.pool.fetchval("SELECT COUNT(*) FROM driver_availability")
+            return duplicate_create, duplicate_id, unknown_driver, count
+
+    duplicate_create, duplicate_id, unknown_driver, count = asyncio.run(scenario())
+    assert duplicate_create.status_code == 422
+    assert "created twice" in duplicate_create.json()["detail"]
+    assert duplicate_id.status_code == 422
+    assert unknown_driver.status_code == 422
+    assert count == 2
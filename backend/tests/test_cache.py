@@ -0,0 +1,181 @@
+import asyncio
+import contextlib
+import io
+import json
+from datetime import date, timedelta
+
+import asyncpg
+
+from database.connection import init_json_codecs
+from services.cache import WORKER_ID, CacheInvalidator, LRUCache
+from services.database_service import (
+    AVAILABILITY_CACHE, AVAILABILITY_JSON_CACHE, DatabaseService, invalidate_availability_cache
+)
+
+MONDAY = date(2025, 7, 7)
+
+
+def test_least_recently_used_entries_are_evicted_first():
+    cache = LRUCache("test", max_size=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1  # "b" is now the least recently used
+    cache.set("c", 3)
+    assert [cache.get(key) for key in ("a", "b", "c")] == [1, None, 3]
+
+    cache.set("a", 10)  # Overwriting refreshes as well
+    cache.set("d", 4)
+    assert [cache.get(key) for key in ("a", "c", "d")] == [10, None, 4]
+    assert cache.evictions == 2
+
+
+def test_expired_entries_are_misses(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("services.cache.time.monotonic", lambda: now[0])
+    cache = LRUCache("test", max_size=2, ttl=5)
+    cache.set("a", 1)
+    now[0] += 4.9
+    assert cache.get("a") == 1
+    now[0] += 0.1
+    assert cache.get("a") is None
+    assert cache.stats()["size"] == 0
+
+
+def test_stats_count_hits_misses_and_invalidations():
+    cache = LRUCache("test", max_size=3, ttl=60)
+    assert cache.stats()["hit_rate"] is None
+    for key in ("a", "b", "c"):
+        cache.set(key, key)
+    cache.get("a")
+    cache.get("a")
+    cache.get("missing")
+    assert cache.invalidate("a")
+    assert not cache.invalidate("a")
+    assert cache.invalidate_where(lambda key: key == "b") == 1
+    assert cache.clear() == 1
+
+    assert cache.stats() == {
+        "name": "test", "size": 0, "max_size": 3, "ttl_seconds": 60,
+        "hits": 2, "misses": 1, "hit_rate": 0.667, "evictions": 0, "invalidations": 3,
+    }
+
+
+def test_availability_invalidation_drops_only_windows_containing_the_dates():
+    windows = [MONDAY - timedelta(days=7), MONDAY - timedelta(days=1), MONDAY, MONDAY + timedelta(days=3),
+               MONDAY + timedelta(days=7)]
+    for cache in (AVAILABILITY_CACHE, AVAILABILITY_JSON_CACHE):
+        cache.clear()
+        for window in windows:
+            cache.set(window, [])
+    try:
+        # A Wednesday is in windows starting from the Thursday before up to that Wednesday
+        assert invalidate_availability_cache([MONDAY + timedelta(days=2)]) == 2 * 2
+        kept = [window for window in windows if AVAILABILITY_CACHE.get(window) is not None]
+        assert kept == [MONDAY - timedelta(days=7), MONDAY + timedelta(days=3), MONDAY + timedelta(days=7)]
+
+        # Anything that is not a date drops everything
+        assert invalidate_availability_cache(["not a date"]) == 3 * 2
+        assert AVAILABILITY_JSON_CACHE.stats()["size"] == 0
+    finally:
+        for cache in (AVAILABILITY_CACHE, AVAILABILITY_JSON_CACHE):
+            cache.clear()
+
+
+def test_invalidator_routes_changes_by_table_and_week():
+    invalidator = CacheInvalidator()
+    calls = []
+    invalidator.register("routes", lambda dates: calls.append(("routes", dates)) or 1)
+    invalidator.register("drivers", lambda dates: calls.append(("drivers", dates)) or 2)
+
+    assert invalidator.invalidate("routes", iter([MONDAY])) == 1
+    assert invalidator.invalidate("unknown") == 0
+    assert invalidator.invalidate_all() == 3
+    assert calls == [("routes", [MONDAY]), ("routes", None), ("drivers", None)]
+
+
+def test_payloads_split_dates_by_week_and_skip_this_worker():
+    payloads = CacheInvalidator.build_payloads(
+        "routes", [MONDAY + timedelta(days=6), MONDAY, MONDAY + timedelta(days=7)]
+    )
+    assert [(p["week"], p["dates"]) for p in map(json.loads, payloads)] == [
+        ("2025-07-07", ["2025-07-07", "2025-07-13"]),
+        ("2025-07-14", ["2025-07-14"]),
+    ]
+    [whole_table] = CacheInvalidator.build_payloads("routes", None)
+    assert json.loads(whole_table)["dates"] is None
+
+    invalidator = CacheInvalidator()
+    calls = []
+    invalidator.register("routes", lambda dates: calls.append(dates) or 0)
+    for payload in payloads + [whole_table, "{broken"]:
+        invalidator.handle_notification(None, 0, "cache", payload)
+    remote = json.dumps({**json.loads(payloads[1]), "origin": "other-worker"})
+    invalidator.handle_notification(None, 0, "cache", remote)
+
+    assert json.loads(whole_table)["origin"] == WORKER_ID
+    assert calls == [[MONDAY + timedelta(days=7)]]
+    assert invalidator.remote_events == 1
+
+
+def test_writes_in_a_transaction_evict_local_caches_after_commit(database):
+    class ReadingConnection:
+        """Lets another connection read the week right after the batch's UPDATE, before commit"""
+
+        def __init__(self, conn, reader):
+            self._conn = conn
+            self._reader = reader
+
+        def __getattr__(self, name):
+            return getattr(self._conn, name)
+
+        async def fetch(self, query, *args):
+            rows = await self._conn.fetch(query, *args)
+            if "UPDATE driver_availability" in query:
+                await DatabaseService(self._reader).get_availability_for_week(MONDAY)
+            return rows
+
+    async def scenario():
+        writer = await asyncpg.connect(**database)
+        reader = await asyncpg.connect(**database)
+        for conn in (writer, reader):
+            await init_json_codecs(conn)
+        invalidate_availability_cache()
+        try:
+            driver = await writer.fetchval("INSERT INTO drivers (name) VALUES ('Anna') RETURNING driver_id")
+            row_id = await writer.fetchval(
+                "INSERT INTO driver_availability (driver_id, date, available) VALUES ($1, $2, TRUE) RETURNING id",
+                driver, MONDAY
+            )
+            read = DatabaseService(reader).get_availability_for_week
+            await read(MONDAY)
+
+            await DatabaseService(ReadingConnection(writer, reader)).apply_availability_batch(
+                [], [{"id": row_id, "available": False}], []
+            )
+            after_batch = await read(MONDAY)
+
+            # Nested transactions evict with the outermost one; a rollback evicts nothing
+            service = DatabaseService(writer)
+            async with service.transaction():
+                async with service.transaction():
+                    await service.update_availability_record(row_id, {"available": True})
+                inside = await read(MONDAY)
+            after_commit = await read(MONDAY)
+            try:
+                async with service.transaction():
+                    await service.update_availability_record(row_id, {"available": False})
+                    raise RuntimeError("rollback")
+            except RuntimeError:
+                pass
+            return after_batch, inside, after_commit, AVAILABILITY_CACHE.get(MONDAY)
+        finally:
+            invalidate_availability_cache()
+            await writer.close()
+            await reader.close()
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        after_batch, inside, after_commit, cached = asyncio.run(scenario())
+    assert [row["available"] for row in after_batch] == [False]
+    assert [row["available"] for row in inside] == [False]
+    assert [row["available"] for row in after_commit] == [True]
+    assert cached is not None and [row["available"] for row in cached] == [True]
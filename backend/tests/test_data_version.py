@@ -0,0 +1,149 @@
+import asyncio
+import os
+from datetime import date
+
+import asyncpg
+
+from database.connection import init_json_codecs
+from services.database_service import DatabaseService
+
+WEEK = date(2025, 7, 7)
+ROUTES = f"/api/v1/weekly/routes?week_start={WEEK}"
+
+
+def test_weekly_get_answers_304_until_a_write(api):
+    async def scenario():
+        async with api() as client:
+            first = await client.get(ROUTES)
+            etag = first.headers["ETag"]
+            cached = await client.get(ROUTES, headers={"If-None-Match": etag})
+
+            await client.pool.execute("INSERT INTO drivers (name) VALUES ('Anna')")
+            changed = await client.get(ROUTES, headers={"If-None-Match": etag})
+            return first, cached, changed
+
+    first, cached, changed = asyncio.run(scenario())
+    assert first.status_code == 200
+    assert cached.status_code == 304
+    assert cached.headers["ETag"] == first.headers["ETag"]
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != first.headers["ETag"]
+
+
+def test_concurrent_writers_do_not_wait_for_each_other(database):
+    async def scenario():
+        first = await asyncpg.connect(**database)
+        second = await asyncpg.connect(**database)
+        try:
+            await second.execute("SET lock_timeout = '1s'")
+            before = await DatabaseService(second).get_data_version()
+            async with first.transaction():
+                await first.execute("INSERT INTO drivers (name) VALUES ('Anna')")
+                # Would time out if the version lived in a row the open transaction has locked
+                await second.execute("INSERT INTO routes (date, route_name) VALUES ('2025-07-07', 'Tour 1')")
+            after = await DatabaseService(second).get_data_version()
+            return before, after
+        finally:
+            await first.close()
+            await second.close()
+
+    before, after = asyncio.run(scenario())
+    assert after >= before + 2
+
+
+def test_committed_transaction_gets_a_version_nobody_has_seen(database):
+    async def scenario():
+        writer = await asyncpg.connect(**database)
+        reader = await asyncpg.connect(**database)
+        try:
+            async with writer.transaction():
+                await writer.execute("INSERT INTO drivers (name) VALUES ('Anna')")
+                # The trigger's nextval is already visible while the row is not
+                seen = await DatabaseService(reader).get_data_version()
+            committed = await DatabaseService(writer).bump_data_version()
+            return seen, committed, await DatabaseService(reader).get_data_version()
+        finally:
+            await writer.close()
+            await reader.close()
+
+    seen, committed, current = asyncio.run(scenario())
+    assert committed > seen
+    assert current == committed
+
+
+def test_etag_taken_during_a_write_transaction_is_stale_after_commit(api):
+    async def scenario():
+        async with api() as client:
+            driver = await client.pool.fetchval("INSERT INTO drivers (name) VALUES ('Anna') RETURNING driver_id")
+            availability = f"/api/v1/weekly/availability?week_start={WEEK}"
+            async with client.pool.acquire() as conn:
+                service = DatabaseService(conn)
+                async with service.transaction():
+                    await service.create_availability({"driver_id": driver, "date": WEEK, "available": False})
+                    during = await client.get(availability)
+                after = await client.get(availability, headers={"If-None-Match": during.headers["ETag"]})
+            return during, after
+
+    during, after = asyncio.run(scenario())
+    assert during.json()["availability"] == []
+    assert after.status_code == 200
+    assert [row["available"] for row in after.json()["availability"]] == [False]
+
+
+def test_single_statement_writes_advance_the_version_after_commit(database):
+    async def scenario():
+        conn = await asyncpg.connect(**database)
+        await init_json_codecs(conn)
+        try:
+            service = DatabaseService(conn)
+            driver = await conn.fetchval("INSERT INTO drivers (name) VALUES ('Anna') RETURNING driver_id")
+            steps = []
+            for write in (
+                lambda: service.create_availability({"driver_id": driver, "date": WEEK, "available": False}),
+                lambda: service.create_route(
+                    {"date": WEEK, "route_name": "Tour 1", "day_of_week": "Monday", "details": {}}
+                ),
+                lambda: service.update_route(1, {"route_name": "Tour 2"}),
+                lambda: service.update_driver(driver, {"name": "Anne"}),
+            ):
+                before = await service.get_data_version()
+                await write()
+                steps.append(await service.get_data_version() - before)
+            return steps
+        finally:
+            await conn.close()
+
+    # One step from the statement trigger, one from the bump after the write committed
+    assert asyncio.run(scenario()) == [2, 2, 2, 2]
+
+
+def test_identical_reupload_reuses_the_stored_result(api, sample_workbook):
+    async def upload(client):
+        with open(sample_workbook, "rb") as f:
+            response = await client.post(
+                "/api/v1/upload/weekly-plan",
+                files={"file": (os.path.basename(sample_workbook), f)},
+                data={"week_start": str(WEEK), "sync_to_google_sheets": "false"},
+            )
+        assert response.status_code == 200, response.text
+        return response.json()
+
+    async def scenario():
+        async with api() as client:
+            first = await upload(client)
+            repeated = await upload(client)
+            uploads_after_repeat = await client.pool.fetchval("SELECT COUNT(*) FROM upload_history")
+
+            # Any write in between makes the stored result stale
+            await client.pool.execute("UPDATE drivers SET details = '{}'::jsonb WHERE driver_id = 1")
+            after_write = await upload(client)
+            uploads_after_write = await client.pool.fetchval("SELECT COUNT(*) FROM upload_history")
+            return first, repeated, uploads_after_repeat, after_write, uploads_after_write
+
+    first, repeated, uploads_after_repeat, after_write, uploads_after_write = asyncio.run(scenario())
+    assert "already uploaded" not in first["message"]
+    assert "already uploaded" in repeated["message"]
+    assert repeated["records_created"] == first["records_created"]
+    assert uploads_after_repeat == 1
+    assert "already uploaded" not in after_write["message"]
+    assert uploads_after_write == 2
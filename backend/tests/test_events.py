@@ -0,0 +1,153 @@
+import asyncio
+import json
+from datetime import date
+
+from config.settings import settings
+from services.database_service import DatabaseService
+from services.events import EventBus, PostgresEventBus
+from services.upload_jobs import UploadJob, UploadJobManager
+
+WEEK = date(2025, 7, 7)
+
+
+def _sent_payloads(bus: PostgresEventBus):
+    payloads, bus._outgoing = bus._outgoing, []
+    return payloads
+
+
+def test_events_keep_the_publishing_workers_id_on_every_worker():
+    publisher = PostgresEventBus(10, 10, "events")
+    other = PostgresEventBus(10, 10, "events")
+    for step in range(3):
+        publisher.publish("uploads", "progress", {"upload_id": 1, "step": step})
+    for payload in _sent_payloads(publisher):
+        # Both buses run in this process: pretend the message comes from another one
+        message = {**json.loads(payload), "origin": "other-worker"}
+        other.handle_notification(None, 0, "events", json.dumps(message))
+
+    published = [event.id for event in publisher._replay["uploads"]]
+    received = [event.id for event in other._replay["uploads"]]
+    assert received == published
+    assert len(set(published)) == 3
+
+    # A client reconnecting to the other worker resumes right after the last event it saw
+    subscription = other.subscribe("uploads", last_event_id=published[0])
+    assert [subscription.queue.get_nowait().data["step"] for _ in range(subscription.queue.qsize())] == [1, 2]
+
+
+def test_replay_from_an_unknown_id_sends_the_whole_buffer():
+    bus = EventBus(2, 10)
+    for step in range(3):
+        bus.publish("uploads", "progress", {"step": step})
+
+    subscription = bus.subscribe("uploads", last_event_id="evicted-1")
+    assert [subscription.queue.get_nowait().data["step"] for _ in range(subscription.queue.qsize())] == [1, 2]
+    assert bus.subscribe("uploads").queue.empty()
+
+
+def _event_types(response):
+    return [line.split(": ", 1)[1] for line in response.text.splitlines() if line.startswith("event: ")]
+
+
+async def _start_upload(client) -> int:
+    async with client.pool.acquire() as conn:
+        return await DatabaseService(conn).start_upload_history("plan.xlsx", WEEK, "replace", None, "hash", [])
+
+
+def test_event_stream_opens_with_a_scoped_stream_token(api, monkeypatch):
+    import api.routes.upload as upload_routes
+    from api.routes.upload import UPLOAD_EVENTS
+
+    # Upload ids restart in every test database: keep earlier tests' events out
+    event_bus = EventBus(10, 10)
+    monkeypatch.setattr(upload_routes, "event_bus", event_bus)
+    monkeypatch.setattr(settings, "API_KEY", "secret")
+    key = {"X-API-Key": "secret"}
+
+    async def scenario():
+        async with api() as client:
+            upload_id = await _start_upload(client)
+            other_id = await _start_upload(client)
+            # Published before the client subscribes: replayed because upload_id is given
+            event_bus.publish(UPLOAD_EVENTS, "progress", {"upload_id": upload_id, "phase": "routes"})
+            event_bus.publish(UPLOAD_EVENTS, "completed", {"upload_id": upload_id, "result": {"success": True}})
+
+            async def token(for_upload, headers=key):
+                return await client.post("/api/v1/upload/events/token", params={"upload_id": for_upload}, headers=headers)
+
+            issued = (await token(upload_id)).json()
+            unauthorized = await token(upload_id, headers={})
+            monkeypatch.setattr(settings, "EVENT_STREAM_TOKEN_SECONDS", -1)
+            expired = (await token(upload_id)).json()["token"]
+
+            def events(params):
+                return client.get("/api/v1/upload/events", params={"upload_id": upload_id, **params})
+
+            expires, signature = issued["token"].split(".")
+            refused = {
+                "none": await events({}),
+                "api_key": await events({"api_key": "secret"}),
+                "extended": await events({"token": f"{int(expires) + 3600}.{signature}"}),
+                "expired": await events({"token": expired}),
+                "other upload": await client.get(
+                    "/api/v1/upload/events", params={"upload_id": other_id, "token": issued["token"]}
+                ),
+                "other route": await client.get(f"/api/v1/upload/jobs/{upload_id}", params={"token": issued["token"]}),
+            }
+            accepted = await events({"token": issued["token"]})
+            with_header = await client.get("/api/v1/upload/events", params={"upload_id": upload_id}, headers=key)
+        return upload_id, issued, unauthorized, refused, accepted, with_header
+
+    upload_id, issued, unauthorized, refused, accepted, with_header = asyncio.run(scenario())
+    assert issued["upload_id"] == upload_id
+    assert issued["expires_in"] == 300
+    assert unauthorized.status_code == 401
+    assert {name: response.status_code for name, response in refused.items()} == dict.fromkeys(refused, 401)
+    assert accepted.status_code == with_header.status_code == 200
+    assert _event_types(accepted) == _event_types(with_header) == ["progress", "completed"]
+
+
+def test_event_stream_of_a_finished_upload_ends_right_away(api, monkeypatch):
+    import api.routes.upload as upload_routes
+    from schemas.models import UploadResponse
+
+    monkeypatch.setattr(upload_routes, "upload_jobs", UploadJobManager(workers=1, queue_size=1, keep_finished=5))
+    response = UploadResponse(
+        success=True, week_start=WEEK, season="summer", school_status="ohne_schule",
+        records_created={"routes": 52}, action_taken="replace"
+    ).model_dump(mode="json")
+
+    async def scenario():
+        async with api() as client:
+            succeeded = await _start_upload(client)
+            failed = await _start_upload(client)
+            reused = await _start_upload(client)
+            async with client.pool.acquire() as conn:
+                service = DatabaseService(conn)
+                await service.complete_upload_history(succeeded, {"routes": 52}, response, 1)
+                await service.fail_upload_history(failed, "bad workbook")
+            # An identical re-upload in async mode: answered by a job that never ran
+            job = UploadJob(reused, "plan.xlsx", WEEK, work=None)
+            job.finish(result=UploadResponse(**response))
+            upload_routes.upload_jobs.track(job)
+
+            def events(upload_id):
+                return client.get("/api/v1/upload/events", params={"upload_id": upload_id})
+
+            streams = {upload_id: await events(upload_id) for upload_id in (succeeded, failed, reused)}
+            missing = await events(999)
+        return succeeded, failed, reused, streams, missing
+
+    succeeded, failed, reused, streams, missing = asyncio.run(scenario())
+
+    def data(upload_id):
+        lines = streams[upload_id].text.splitlines()
+        return json.loads(next(line for line in lines if line.startswith("data: "))[6:])
+
+    assert {upload_id: _event_types(stream) for upload_id, stream in streams.items()} == {
+        succeeded: ["completed"], failed: ["failed"], reused: ["completed"]
+    }
+    assert data(succeeded)["result"] == response
+    assert data(failed)["error"] == "bad workbook"
+    assert data(reused)["result"]["records_created"]["routes"] == 52
+    assert missing.status_code == 404
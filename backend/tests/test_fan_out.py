@@ -0,0 +1,90 @@
+import asyncio
+
+import asyncpg
+import pytest
+
+from config.settings import settings
+from database.connection import init_json_codecs
+from services.database_service import DatabaseService
+
+
+async def _pool(database: dict) -> asyncpg.Pool:
+    return await asyncpg.create_pool(**database, init=init_json_codecs, min_size=3, max_size=3)
+
+
+def _sleep(seconds: float, value):
+    async def read(service: DatabaseService):
+        await service.conn.execute("SELECT pg_sleep($1)", seconds)
+        return (value, id(service.conn))
+    return read
+
+
+def test_reads_run_concurrently_and_keep_their_order(database, monkeypatch):
+    monkeypatch.setattr(settings, "DB_READ_CONCURRENCY", 3)
+
+    async def scenario():
+        pool = await _pool(database)
+        try:
+            async with pool.acquire() as conn:
+                results = await DatabaseService(conn, pool).fan_out(*(_sleep(0.2, n) for n in range(4)))
+                return results, pool.get_idle_size()
+        finally:
+            await pool.close()
+
+    results, idle = asyncio.run(scenario())
+    assert [value for value, _ in results] == [0, 1, 2, 3]
+    assert len({conn for _, conn in results}) == 3
+    assert idle == 2
+
+
+def test_busy_pool_falls_back_to_the_requests_connection(database, monkeypatch):
+    monkeypatch.setattr(settings, "DB_READ_CONCURRENCY", 3)
+    monkeypatch.setattr(settings, "DB_FAN_OUT_ACQUIRE_TIMEOUT", 0.05)
+
+    async def scenario():
+        pool = await _pool(database)
+        try:
+            held = [await pool.acquire() for _ in range(3)]
+            try:
+                return await DatabaseService(held[0], pool).fan_out(_sleep(0, "a"), _sleep(0, "b")), id(held[0])
+            finally:
+                for conn in held:
+                    await pool.release(conn)
+        finally:
+            await pool.close()
+
+    results, own = asyncio.run(scenario())
+    assert results == [("a", own), ("b", own)]
+
+
+def test_failing_read_raises_and_returns_every_connection(database, monkeypatch):
+    monkeypatch.setattr(settings, "DB_READ_CONCURRENCY", 3)
+    started = []
+
+    def tracked(read):
+        async def run(service):
+            started.append(read)
+            return await read(service)
+        return run
+
+    async def failing(service: DatabaseService):
+        await service.conn.fetchval("SELECT 1 / 0")
+
+    async def scenario():
+        pool = await _pool(database)
+        try:
+            async with pool.acquire() as conn:
+                service = DatabaseService(conn, pool)
+                reads = [tracked(_sleep(0.2, "slow")), tracked(failing)] + [tracked(_sleep(0.05, n)) for n in range(5)]
+                with pytest.raises(asyncpg.exceptions.DivisionByZeroError):
+                    await service.fan_out(*reads)
+                # Every worker finished: the request's connection is idle and usable again
+                assert not conn.is_in_transaction()
+                assert await conn.fetchval("SELECT 1") == 1
+                return pool.get_idle_size()
+        finally:
+            await pool.close()
+
+    assert asyncio.run(scenario()) == 2
+    # The remaining reads were dropped once one failed
+    assert len(started) < 7
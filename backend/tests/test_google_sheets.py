@@ -0,0 +1,119 @@
+import json
+
+import httplib2
+import pytest
+from googleapiclient.errors import HttpError
+
+from config.settings import settings
+from services.google_sheets_service import GoogleSheetsService, SheetNotFoundError
+
+
+def _http_error(status: int) -> HttpError:
+    return HttpError(httplib2.Response({"status": status}), b"{}")
+
+
+class FakeRequest:
+    def __init__(self, run):
+        self._run = run
+
+    def execute(self):
+        return self._run()
+
+
+class FakeDrive:
+    """files().list / files().update of the Drive v3 client, against a name -> id map"""
+
+    def __init__(self, sheets):
+        self.sheets = sheets
+        self.lists = 0
+        self.updates = []
+
+    def files(self):
+        return self
+
+    def list(self, q, fields):
+        def run():
+            self.lists += 1
+            name = q.split("'")[1]
+            return {"files": [{"id": self.sheets[name], "webViewLink": f"link/{name}"}] if name in self.sheets else []}
+        return FakeRequest(run)
+
+    def update(self, fileId, media_body, fields):
+        def run():
+            self.updates.append(fileId)
+            if fileId not in self.sheets.values():
+                raise _http_error(404)
+            return {"id": fileId, "name": "Plan"}
+        return FakeRequest(run)
+
+
+@pytest.fixture
+def workbook(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "GOOGLE_SHEET_ID_CACHE_FILE", str(tmp_path / "sheet_ids.json"))
+    path = tmp_path / "plan.xlsx"
+    path.write_bytes(b"xlsx")
+    return str(path)
+
+
+def _service(drive: FakeDrive) -> GoogleSheetsService:
+    service = GoogleSheetsService()
+    service.drive_service = drive
+    return service
+
+
+def test_file_id_is_looked_up_once_and_kept_across_restarts(workbook, monkeypatch):
+    drive = FakeDrive({"Plan": "file-1"})
+    _service(drive).upload_excel_to_sheet(workbook, "Plan")
+    _service(drive).upload_excel_to_sheet(workbook, "Plan")
+    assert (drive.lists, drive.updates) == (1, ["file-1", "file-1"])
+    with open(settings.GOOGLE_SHEET_ID_CACHE_FILE) as f:
+        assert json.load(f)["Plan"]["id"] == "file-1"
+
+    # Expired entries are looked up again
+    monkeypatch.setattr(settings, "GOOGLE_SHEET_ID_TTL", 0)
+    _service(drive).upload_excel_to_sheet(workbook, "Plan")
+    assert drive.lists == 2
+
+
+def test_deleted_sheet_is_looked_up_again_after_a_404(workbook):
+    drive = FakeDrive({"Plan": "file-1"})
+    service = _service(drive)
+    service.upload_excel_to_sheet(workbook, "Plan")
+    # Sheet recreated under the same name: the cached id now answers 404
+    drive.sheets["Plan"] = "file-2"
+
+    result = service.upload_excel_to_sheet(workbook, "Plan")
+    assert result["id"] == "file-2"
+    assert (drive.lists, drive.updates) == (2, ["file-1", "file-1", "file-2"])
+    with open(settings.GOOGLE_SHEET_ID_CACHE_FILE) as f:
+        assert json.load(f)["Plan"]["id"] == "file-2"
+
+
+def test_missing_sheet_is_not_cached_or_retried(workbook):
+    drive = FakeDrive({"Plan": "file-1"})
+    service = _service(drive)
+    service.upload_excel_to_sheet(workbook, "Plan")
+    del drive.sheets["Plan"]
+
+    with pytest.raises(SheetNotFoundError) as raised:
+        service.upload_excel_to_sheet(workbook, "Plan")
+    assert not service.is_retryable(raised.value)
+    with open(settings.GOOGLE_SHEET_ID_CACHE_FILE) as f:
+        assert json.load(f) == {}
+
+
+def test_unreadable_cache_file_is_ignored(workbook):
+    with open(settings.GOOGLE_SHEET_ID_CACHE_FILE, "w") as f:
+        f.write("{not json")
+    drive = FakeDrive({"Plan": "file-1"})
+    _service(drive).upload_excel_to_sheet(workbook, "Plan")
+    assert drive.lists == 1
+
+
+def test_only_transient_errors_are_retryable():
+    assert [GoogleSheetsService.is_retryable(_http_error(status)) for status in (400, 403, 404, 408, 429, 500, 503)] == [
+        False, False, False, True, True, True, True
+    ]
+    assert GoogleSheetsService.is_retryable(ConnectionResetError())
+    assert GoogleSheetsService.is_retryable(httplib2.ServerNotFoundError())
+    assert not GoogleSheetsService.is_retryable(ValueError())
@@ -0,0 +1,120 @@
+import asyncio
+import threading
+import time
+
+import httpx
+import pytest
+
+import services.sheet_sync as sheet_sync_module
+from config.settings import settings
+from services.google_sheets_service import GoogleSheetsService
+from services.sheet_sync import SheetSyncManager
+
+
+@pytest.fixture
+def credentials(tmp_path, monkeypatch):
+    path = tmp_path / "credentials.json"
+    path.write_text("{}")
+    monkeypatch.setattr(settings, "ENABLE_GOOGLE_SHEETS_SYNC", True)
+    monkeypatch.setattr(settings, "GOOGLE_CREDENTIALS_FILE", str(path))
+    monkeypatch.setattr(settings, "GOOGLE_SHEET_ID_CACHE_FILE", str(tmp_path / "sheet_ids.json"))
+    return path
+
+
+def _service(*outcomes) -> GoogleSheetsService:
+    """Service whose credential loading fails with outcomes in turn, then succeeds"""
+    service = GoogleSheetsService()
+    outcomes = list(outcomes)
+    service.init_calls = 0
+
+    def initialize():
+        service.init_calls += 1
+        time.sleep(0.05)
+        if outcomes:
+            raise outcomes.pop(0)
+        service.drive_service = object()
+
+    service._initialize_credentials = initialize
+    return service
+
+
+def test_construction_only_checks_settings(credentials, monkeypatch):
+    assert _service().state == "not_initialized"
+    assert _service().is_available()
+
+    monkeypatch.setattr(settings, "GOOGLE_CREDENTIALS_FILE", str(credentials) + ".missing")
+    missing = _service()
+    assert (missing.state, missing.is_available()) == ("unavailable", False)
+    assert "credentials file not found" in missing.last_error
+
+    monkeypatch.setattr(settings, "ENABLE_GOOGLE_SHEETS_SYNC", False)
+    assert _service().state == "disabled"
+
+
+def test_transient_failure_is_retried_on_next_use(credentials):
+    service = _service(ConnectionResetError("reset"))
+    with pytest.raises(ConnectionResetError):
+        service.ensure_initialized()
+    assert (service.state, service.last_error) == ("not_initialized", "reset")
+    assert service.is_available()
+
+    service.ensure_initialized()
+    service.ensure_initialized()
+    assert (service.state, service.last_error, service.init_calls) == ("ready", None, 2)
+
+
+def test_permanent_failure_disables_the_service_for_the_session(credentials):
+    service = _service(ValueError("invalid key"))
+    with pytest.raises(ValueError):
+        service.ensure_initialized()
+    with pytest.raises(RuntimeError, match="invalid key"):
+        service.ensure_initialized()
+    assert (service.state, service.is_available(), service.init_calls) == ("unavailable", False, 1)
+
+
+def test_concurrent_first_use_initialises_once(credentials):
+    service = _service()
+    threads = [threading.Thread(target=service.ensure_initialized) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert (service.state, service.init_calls) == ("ready", 1)
+
+
+def test_warm_up_runs_on_the_sync_thread_without_blocking(credentials, monkeypatch):
+    service = _service()
+    monkeypatch.setattr(sheet_sync_module, "google_sheets_service", service)
+
+    async def scenario():
+        manager = SheetSyncManager(max_attempts=1, retry_base=0.01, retry_max=0.01, keep_finished=10)
+        manager.warm_up()
+        state_right_after = service.state
+        while service.state != "ready":
+            await asyncio.sleep(0.01)
+        # Nothing left to warm up
+        manager.warm_up()
+        await manager.stop()
+        return state_right_after
+
+    assert asyncio.run(scenario()) == "not_initialized"
+    assert service.init_calls == 1
+
+
+def test_health_reports_the_google_sheets_state(credentials, monkeypatch):
+    import main
+
+    async def health():
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return (await client.get("/health")).json()
+
+    service = _service(ValueError("invalid key"))
+    monkeypatch.setattr(main, "google_sheets_service", service)
+    before = asyncio.run(health())
+    with pytest.raises(ValueError):
+        service.ensure_initialized()
+    after = asyncio.run(health())
+
+    assert (before["google_sheets"], before["google_sheets_state"]) == ("available", "not_initialized")
+    assert (after["google_sheets"], after["google_sheets_state"]) == ("unavailable", "unavailable")
@@ -0,0 +1,56 @@
+import asyncio
+
+HOLIDAYS = "/api/v1/weekly/holidays"
+
+
+def test_holidays_mark_every_driver_unavailable_in_one_call(api):
+    async def scenario():
+        async with api() as client:
+            pool = client.pool
+            anna = await pool.fetchval("INSERT INTO drivers (name) VALUES ('Anna') RETURNING driver_id")
+            await pool.execute("INSERT INTO drivers (name) VALUES ('Ben'), ('Cem')")
+            await pool.execute(
+                "INSERT INTO driver_availability (driver_id, date, available, notes) VALUES ($1, '2025-08-15', TRUE, 'Arzt')",
+                anna
+            )
+            holidays = [
+                {"date": "2025-08-15", "name": "Mariä Himmelfahrt"},
+                {"date": "2025-08-15", "name": "Duplicate"},
+                {"date": "2025-10-26", "name": "Nationalfeiertag"},
+            ]
+            first = await client.post(HOLIDAYS, json={"holidays": holidays})
+            # Repeating it changes nothing (the holiday note is not appended twice)
+            repeat = await client.post(HOLIDAYS, json={"holidays": holidays})
+            rows = await pool.fetch(
+                "SELECT d.name, da.date::text AS date, da.available, da.notes FROM driver_availability da "
+                "JOIN drivers d USING (driver_id) ORDER BY d.name, da.date"
+            )
+            return first, repeat, rows
+
+    first, repeat, rows = asyncio.run(scenario())
+    assert first.status_code == repeat.status_code == 200
+    assert first.json() == {"holidays": ["2025-08-15", "2025-10-26"], "records_affected": 6}
+    assert len(rows) == 6
+    assert not any(row["available"] for row in rows)
+    notes = {(row["name"], row["date"]): row["notes"] for row in rows}
+    assert notes[("Anna", "2025-08-15")] == "Arzt; Feiertag: Mariä Himmelfahrt"
+    assert notes[("Ben", "2025-10-26")] == "Feiertag: Nationalfeiertag"
+
+
+def test_holidays_can_be_limited_to_some_drivers(api):
+    async def scenario():
+        async with api() as client:
+            anna = await client.pool.fetchval("INSERT INTO drivers (name) VALUES ('Anna') RETURNING driver_id")
+            await client.pool.execute("INSERT INTO drivers (name) VALUES ('Ben')")
+            response = await client.post(HOLIDAYS, json={
+                "holidays": [{"date": "2025-08-15", "name": "Mariä Himmelfahrt"}],
+                "driver_ids": [anna],
+            })
+            empty = await client.post(HOLIDAYS, json={"holidays": []})
+            stored = await client.pool.fetchval("SELECT array_agg(driver_id) FROM driver_availability")
+            return response, empty, anna, stored
+
+    response, empty, anna, stored = asyncio.run(scenario())
+    assert response.json()["records_affected"] == 1
+    assert stored == [anna]
+    assert empty.status_code == 400
@@ -0,0 +1,67 @@
+import asyncio
+
+import asyncpg
+import pytest
+
+from database.connection import PreparedStatementConnection, init_json_codecs
+from services.database_service import HOT_STATEMENTS, DatabaseService
+
+
+async def _session_connection(database: dict) -> PreparedStatementConnection:
+    conn = await asyncpg.connect(**database, connection_class=PreparedStatementConnection)
+    await init_json_codecs(conn)
+    await DatabaseService.prepare_hot_statements(conn)
+    return conn
+
+
+def test_hot_statements_are_prepared_at_init(database):
+    async def scenario():
+        conn = await _session_connection(database)
+        try:
+            return set(conn.prepared_statements)
+        finally:
+            await conn.close()
+
+    assert asyncio.run(scenario()) == set(HOT_STATEMENTS)
+
+
+def test_invalidated_statement_is_prepared_again(database):
+    async def scenario():
+        conn = await _session_connection(database)
+        service = DatabaseService(conn)
+        try:
+            await conn.execute("INSERT INTO drivers (name) VALUES ('Anna')")
+            original = conn.prepared_statements['all_drivers']
+
+            # A changed result type invalidates the prepared plan
+            await conn.execute("ALTER TABLE drivers ALTER COLUMN name TYPE VARCHAR(200)")
+            assert [driver['name'] for driver in await service.get_all_drivers()] == ['Anna']
+            replacement = conn.prepared_statements['all_drivers']
+            assert replacement is not original
+
+            # Inside a transaction the error aborts it; the next call prepares the statement again
+            await conn.execute("ALTER TABLE drivers ALTER COLUMN name TYPE TEXT")
+            with pytest.raises(asyncpg.exceptions.InvalidCachedStatementError):
+                async with conn.transaction():
+                    await service.get_all_drivers()
+            assert 'all_drivers' not in conn.prepared_statements
+            assert [driver['name'] for driver in await service.get_all_drivers()] == ['Anna']
+            assert conn.prepared_statements['all_drivers'] not in (original, replacement)
+        finally:
+            await conn.close()
+
+    asyncio.run(scenario())
+
+
+def test_transaction_pooler_connections_run_plain_sql(database):
+    async def scenario():
+        conn = await asyncpg.connect(**database, statement_cache_size=0)
+        await init_json_codecs(conn)
+        try:
+            await DatabaseService.prepare_hot_statements(conn)
+            await conn.execute("INSERT INTO drivers (name) VALUES ('Anna')")
+            return await DatabaseService(conn).get_all_drivers()
+        finally:
+            await conn.close()
+
+    assert [driver['name'] for driver in asyncio.run(scenario())] == ['Anna']
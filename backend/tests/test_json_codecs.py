@@ -0,0 +1,86 @@
+import asyncio
+from datetime import date, datetime
+from decimal import Decimal
+
+import asyncpg
+
+from database.connection import init_json_codecs
+from services.database_service import DatabaseService
+
+NESTED = {
+    "location": "Feldkirchen an der Donau – Süd",
+    "stops": [{"name": "Größing", "times": ["06:30", "07:15"]}, {"name": "学校", "times": []}],
+    "flags": {"active": True, "ratio": 0.25, "count": 2 ** 53, "note": None},
+    "emoji": "🚌",
+}
+
+
+async def _connect(database: dict) -> asyncpg.Connection:
+    conn = await asyncpg.connect(**database)
+    await init_json_codecs(conn)
+    return conn
+
+
+def test_nested_jsonb_round_trips_with_non_ascii_text(database):
+    async def scenario():
+        conn = await _connect(database)
+        try:
+            route_id = await conn.fetchval(
+                "INSERT INTO routes (date, route_name, details) VALUES ('2025-07-07', 'Tour 1', $1) RETURNING route_id",
+                NESTED
+            )
+            stored = await conn.fetchval("SELECT details FROM routes WHERE route_id = $1", route_id)
+            # The text Postgres holds, decoded by Postgres itself
+            location = await conn.fetchval("SELECT details->>'location' FROM routes WHERE route_id = $1", route_id)
+            json_value = await conn.fetchval("SELECT $1::json", NESTED)
+            scalars = await conn.fetchval("SELECT $1::jsonb", ["text", 1, None])
+            json_null, sql_null = await conn.fetchrow("SELECT 'null'::jsonb, NULL::jsonb")
+            return stored, location, json_value, scalars, json_null, sql_null
+        finally:
+            await conn.close()
+
+    stored, location, json_value, scalars, json_null, sql_null = asyncio.run(scenario())
+    assert stored == NESTED
+    assert location == NESTED["location"]
+    assert json_value == NESTED
+    assert scalars == ["text", 1, None]
+    assert json_null is None and sql_null is None
+
+
+def test_values_without_a_json_type_are_stored_as_strings(database):
+    async def scenario():
+        conn = await _connect(database)
+        try:
+            return await conn.fetchval(
+                "SELECT $1::jsonb",
+                {"date": date(2025, 7, 7), "at": datetime(2025, 7, 7, 6, 30), "hours": Decimal("8.5")}
+            )
+        finally:
+            await conn.close()
+
+    assert asyncio.run(scenario()) == {"date": "2025-07-07", "at": "2025-07-07T06:30:00", "hours": "8.5"}
+
+
+def test_details_columns_decode_to_dicts_for_the_service(database):
+    async def scenario():
+        conn = await _connect(database)
+        try:
+            service = DatabaseService(conn)
+            await service.upsert_driver({"name": "Jürgen", "details": {"monthly_hours": "160", "extra": {"ä": [1]}}})
+            await service.create_route({
+                "date": date(2025, 7, 7), "route_name": "Tour Ö", "day_of_week": "Monday",
+                "details": {"season": "summer", "location": "Großraming"}
+            })
+            drivers = await service.get_all_drivers()
+            routes = await service.get_routes_for_week(date(2025, 7, 7))
+            # Text-selected JSON skips the codec: the bytes are passed through
+            routes_json = await service.get_routes_json_for_week(date(2025, 7, 7))
+            return drivers, routes, routes_json
+        finally:
+            await conn.close()
+
+    drivers, routes, routes_json = asyncio.run(scenario())
+    assert drivers[0]["details"]["extra"] == {"ä": [1]}
+    assert routes[0]["details"]["location"] == "Großraming"
+    assert isinstance(routes_json, bytes)
+    assert "Großraming".encode() in routes_json
@@ -0,0 +1,11 @@
+from datetime import date
+
+from schemas.models import AvailabilityBatchOperation, AvailabilityUpdateRequest, RouteUpdateRequest
+
+
+def test_optional_date_fields_parse_dates():
+    # A field named "date" must not turn its own Optional[date] annotation into Optional[None]
+    for model in (RouteUpdateRequest, AvailabilityUpdateRequest, AvailabilityBatchOperation):
+        fields = {"op": "update"} if model is AvailabilityBatchOperation else {}
+        assert model(date="2025-07-08", **fields).date == date(2025, 7, 8)
+        assert model(**fields).date is None
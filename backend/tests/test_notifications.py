@@ -0,0 +1,197 @@
+import asyncio
+import contextvars
+import time
+from datetime import datetime
+
+import asyncpg
+
+from database.connection import init_json_codecs
+from services.database_service import DatabaseService
+from services.notification_store import NotificationStore
+
+NOTIFICATIONS = "/api/v1/notifications"
+
+
+def _row(seq: int, status: str = "pending") -> dict:
+    return {
+        "id": f"n{seq}", "driver_name": f"Driver {seq}", "date": "2025-07-07", "status": status,
+        "seq": seq, "created_at": datetime(2025, 7, 7), "resolved_at": None,
+    }
+
+
+def test_create_deduplicates_open_notifications_until_resolved(api):
+    async def scenario():
+        async with api() as client:
+            request = {"driver_name": "Anna", "date": "2025-07-08", "reason": "Arzt"}
+            first = (await client.post(NOTIFICATIONS, json=request)).json()
+            repeat = (await client.post(NOTIFICATIONS, json=request)).json()
+            deleted = await client.delete(f"{NOTIFICATIONS}/{first['id']}")
+            deleted_again = await client.delete(f"{NOTIFICATIONS}/{first['id']}")
+            reopened = (await client.post(NOTIFICATIONS, json=request)).json()
+            pending = (await client.get(NOTIFICATIONS)).json()
+            return first, repeat, deleted, deleted_again, reopened, pending
+
+    first, repeat, deleted, deleted_again, reopened, pending = asyncio.run(scenario())
+    assert repeat["id"] == first["id"]
+    assert deleted.status_code == 200
+    assert deleted_again.status_code == 404
+    assert reopened["id"] != first["id"]
+    assert [n["id"] for n in pending] == [reopened["id"]]
+
+
+def test_create_retries_when_the_conflicting_notification_was_resolved_meanwhile(database):
+    class ResolvingConnection:
+        """Resolves the open notification right after the INSERT hits it"""
+
+        def __init__(self, conn):
+            self._conn = conn
+            self.resolved = False
+
+        def __getattr__(self, name):
+            return getattr(self._conn, name)
+
+        async def fetchrow(self, query, *args):
+            row = await self._conn.fetchrow(query, *args)
+            if "INSERT INTO notifications" in query and row is None and not self.resolved:
+                await self._conn.execute("UPDATE notifications SET status = 'resolved' WHERE id = 'first'")
+                self.resolved = True
+            return row
+
+    async def scenario():
+        conn = await asyncpg.connect(**database)
+        await init_json_codecs(conn)
+        try:
+            service = DatabaseService(conn)
+            await service.create_notification({"id": "first", "driver_name": "Anna", "date": "2025-07-08"})
+            racing = ResolvingConnection(conn)
+            return await DatabaseService(racing).create_notification(
+                {"id": "second", "driver_name": "Anna", "date": "2025-07-08"}
+            ), racing.resolved
+        finally:
+            await conn.close()
+
+    (row, created), resolved = asyncio.run(scenario())
+    assert resolved
+    assert created
+    assert row["id"] == "second"
+
+
+def test_feed_stays_in_seq_order_when_writes_finish_out_of_order():
+    store = NotificationStore(ttl=60, retention_days=30)
+    store._loaded_at = time.monotonic()
+    for seq in (1, 3, 2):
+        store._index(_row(seq))
+    # Re-indexing moves a notification to the end of the feed
+    store._index({**_row(1, status="resolved"), "seq": 4})
+
+    rows, cursor = asyncio.run(store.changes(None, since=1))
+    assert [row["seq"] for row in rows] == [2, 3, 4]
+    assert cursor == 4
+    assert list(store._feed) == [2, 3, 4]
+
+
+def test_feed_returns_changes_after_the_cursor_and_long_polls(api, monkeypatch):
+    import api.routes.notifications as notification_routes
+
+    # Own store: the global one keeps asyncio primitives across tests' event loops
+    monkeypatch.setattr(notification_routes, "notification_store", NotificationStore(ttl=60, retention_days=30))
+
+    async def scenario():
+        async with api() as client:
+            first = (await client.post(NOTIFICATIONS, json={"driver_name": "Anna", "date": "2025-07-08"})).json()
+            everything = (await client.get(NOTIFICATIONS, params={"since": 0})).json()
+            cursor = everything["cursor"]
+            nothing_new = (await client.get(NOTIFICATIONS, params={"since": cursor})).json()
+
+            started = time.monotonic()
+            waiting = asyncio.create_task(client.get(NOTIFICATIONS, params={"since": cursor, "wait": 10}))
+            await asyncio.sleep(0.2)
+            assert not waiting.done()
+            second = (await client.post(NOTIFICATIONS, json={"driver_name": "Ben", "date": "2025-07-08"})).json()
+            woken = (await waiting).json()
+            waited = time.monotonic() - started
+
+            await client.delete(f"{NOTIFICATIONS}/{first['id']}")
+            after_delete = (await client.get(NOTIFICATIONS, params={"since": woken["cursor"]})).json()
+            ahead = (await client.get(NOTIFICATIONS, params={"since": 10 ** 9})).json()
+            return first, second, everything, nothing_new, woken, waited, after_delete, ahead
+
+    first, second, everything, nothing_new, woken, waited, after_delete, ahead = asyncio.run(scenario())
+    assert [n["id"] for n in everything["notifications"]] == [first["id"]]
+    assert nothing_new == {"notifications": [], "cursor": everything["cursor"]}
+    assert [n["id"] for n in woken["notifications"]] == [second["id"]]
+    assert woken["cursor"] > everything["cursor"]
+    assert waited < 5
+    # Resolved notifications come through the feed so clients can drop them
+    assert [(n["id"], n["status"]) for n in after_delete["notifications"]] == [(first["id"], "resolved")]
+    # A cursor from before a database reset gets the current one back
+    assert ahead == {"notifications": [], "cursor": after_delete["cursor"]}
+
+
+def test_feed_cursor_never_passes_a_notification_still_to_commit(database):
+    async def create(pool, notification_id, driver_name):
+        async with pool.acquire() as conn:
+            await DatabaseService(conn).create_notification(
+                {"id": notification_id, "driver_name": driver_name, "date": "2025-07-08"}
+            )
+
+    async def scenario():
+        pool = await asyncpg.create_pool(**database, init=init_json_codecs, min_size=3, max_size=3)
+        store = NotificationStore(ttl=0, retention_days=30)  # Reloads on every call
+        try:
+            async with pool.acquire() as slow:
+                transaction = slow.transaction()
+                await transaction.start()
+                await DatabaseService(slow).create_notification(
+                    {"id": "slow", "driver_name": "Anna", "date": "2025-07-08"}
+                )
+                # Took its seq after "slow" but would commit first
+                fast = asyncio.create_task(create(pool, "fast", "Ben"))
+                await asyncio.sleep(0.2)
+                fast_waited = not fast.done()
+                seen, cursor = await store.changes(pool, since=0)
+                await transaction.commit()
+            await fast
+            later, _ = await store.changes(pool, since=cursor)
+        finally:
+            await pool.close()
+        return fast_waited, [row["id"] for row in seen + later]
+
+    fast_waited, delivered = asyncio.run(scenario())
+    assert fast_waited
+    assert delivered == ["slow", "fast"]
+
+
+def test_remote_change_during_an_own_write_marks_the_index_stale(database):
+    store = NotificationStore(ttl=60, retention_days=30)
+
+    class RemoteChangeConnection:
+        """Another worker's change arrives (listener callback, own context) during the INSERT"""
+
+        def __init__(self, conn):
+            self._conn = conn
+
+        def __getattr__(self, name):
+            return getattr(self._conn, name)
+
+        async def fetchrow(self, query, *args):
+            row = await self._conn.fetchrow(query, *args)
+            contextvars.Context().run(store.mark_stale)
+            return row
+
+    async def scenario():
+        conn = await asyncpg.connect(**database)
+        await init_json_codecs(conn)
+        try:
+            own, _ = await store.create(conn, {"id": "own", "driver_name": "Anna", "date": "2025-07-08"})
+            fresh_after_own_write = store._is_fresh()
+            await store.create(RemoteChangeConnection(conn), {"id": "other", "driver_name": "Ben", "date": "2025-07-08"})
+            return own, fresh_after_own_write, store._is_fresh()
+        finally:
+            await conn.close()
+
+    own, fresh_after_own_write, fresh_after_remote_change = asyncio.run(scenario())
+    assert own["id"] == "own"
+    assert fresh_after_own_write
+    assert not fresh_after_remote_change
+    assert store.reloads == 1
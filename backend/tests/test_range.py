@@ -0,0 +1,121 @@
+import asyncio
+import json
+from datetime import date
+
+WEEK = date(2025, 7, 7)
+WEEKLY = "/api/v1/weekly"
+RANGE = {"from": "2025-07-07", "to": "2025-07-13"}
+# resource -> (weekly endpoint, its list key, id key)
+RESOURCES = {
+    "routes": ("routes", "routes", "route_id"),
+    "availability": ("availability", "availability", "id"),
+    "fixed-assignments": ("fixed-assignments", "fixed_assignments", "id"),
+}
+
+
+async def _pages(client, resource: str, limit: int, **params) -> list:
+    """Every page of a range, following next_cursor"""
+    pages = []
+    after = None
+    while True:
+        query = {**RANGE, "limit": limit, **params, **({"after": after} if after else {})}
+        response = await client.get(f"{WEEKLY}/range/{resource}", params=query)
+        assert response.status_code == 200, response.text
+        pages.append(response.json())
+        after = pages[-1]["next_cursor"]
+        if after is None:
+            return pages
+
+
+def test_pages_cover_the_range_once_in_date_id_order(api, load_plan):
+    async def scenario():
+        async with api() as client:
+            await load_plan(client.pool, WEEK)
+            # Timestamps whose JSON form differs between Postgres and Pydantic unless rendered alike
+            for table in ("routes", "driver_availability", "fixed_assignments"):
+                await client.pool.execute(
+                    f"UPDATE {table} SET created_at = '2025-07-01 08:00:00.120' WHERE date = $1", WEEK
+                )
+            results = {}
+            for resource, (endpoint, key, _) in RESOURCES.items():
+                weekly = (await client.get(f"{WEEKLY}/{endpoint}", params={"week_start": WEEK.isoformat()})).json()
+                results[resource] = await _pages(client, resource, limit=7), weekly[key]
+            return results
+
+    for resource, (pages, weekly) in asyncio.run(scenario()).items():
+        id_key = RESOURCES[resource][2]
+        items = [item for page in pages for item in page["items"]]
+        keys = [(item["date"], item[id_key]) for item in items]
+        assert len(keys) > 7, resource
+        # Pages split within a date (many rows share one): no duplicates, no gaps
+        assert len({date for date, _ in keys}) < len(pages), resource
+        assert keys == sorted(set(keys)), resource
+        assert all(len(page["items"]) == 7 for page in pages[:-1]), resource
+        # Same rows, in the same shape, as the weekly endpoint for that week
+        assert sorted(items, key=lambda item: item[id_key]) == sorted(weekly, key=lambda item: item[id_key]), resource
+
+
+def test_stream_sends_the_whole_range_as_ndjson(api, load_plan):
+    async def scenario():
+        async with api() as client:
+            await load_plan(client.pool, WEEK)
+            [everything] = await _pages(client, "routes", limit=1000)
+            streamed = await client.get(f"{WEEKLY}/range/routes", params={**RANGE, "limit": 5, "stream": "true"})
+            cursor = f"{everything['items'][9]['date']}:{everything['items'][9]['route_id']}"
+            resumed = await client.get(
+                f"{WEEKLY}/range/routes", params={**RANGE, "limit": 5, "stream": "true", "after": cursor}
+            )
+            return everything["items"], streamed, resumed
+
+    items, streamed, resumed = asyncio.run(scenario())
+    assert streamed.headers["content-type"] == "application/x-ndjson"
+    assert "ETag" in streamed.headers
+    assert streamed.text.endswith("\n")
+    assert [json.loads(line) for line in streamed.text.splitlines()] == items
+    assert [json.loads(line) for line in resumed.text.splitlines()] == items[10:]
+
+
+def test_cursor_before_the_range_and_empty_ranges(api, load_plan):
+    async def scenario():
+        async with api() as client:
+            await load_plan(client.pool, WEEK)
+            [everything] = await _pages(client, "routes", limit=1000)
+            early = await _pages(client, "routes", limit=1000, after="2025-01-01:99999")
+            empty = await client.get(f"{WEEKLY}/range/routes", params={"from": "2030-01-01", "to": "2030-01-31"})
+            empty_stream = await client.get(
+                f"{WEEKLY}/range/routes", params={"from": "2030-01-01", "to": "2030-01-31", "stream": "true"}
+            )
+            return everything, early, empty, empty_stream
+
+    everything, early, empty, empty_stream = asyncio.run(scenario())
+    assert early == [everything]
+    assert empty.json() == {"from": "2030-01-01", "to": "2030-01-31", "items": [], "next_cursor": None}
+    assert empty_stream.text == ""
+
+
+def test_invalid_requests_are_rejected(api):
+    async def scenario():
+        async with api() as client:
+            requests = {
+                "bad cursor": {"after": "2025-07-07"},
+                "bad cursor date": {"after": "07.07.2025:3"},
+                "bad cursor id": {"after": "2025-07-07:x"},
+                "to before from": {"from": "2025-07-13", "to": "2025-07-07"},
+                "limit too small": {"limit": 0},
+            }
+            statuses = {
+                name: (await client.get(f"{WEEKLY}/range/routes", params={**RANGE, **params})).status_code
+                for name, params in requests.items()
+            }
+            statuses["unknown resource"] = (await client.get(f"{WEEKLY}/range/drivers", params=RANGE)).status_code
+            missing_to = await client.get(f"{WEEKLY}/range/routes", params={"from": "2025-07-07"})
+            statuses["missing to"] = missing_to.status_code
+            detail = (await client.get(f"{WEEKLY}/range/routes", params={**RANGE, "after": "nope"})).json()["detail"]
+            return statuses, detail
+
+    statuses, detail = asyncio.run(scenario())
+    assert statuses == {
+        "bad cursor": 400, "bad cursor date": 400, "bad cursor id": 400, "to before from": 400,
+        "limit too small": 422, "unknown resource": 422, "missing to": 422,
+    }
+    assert "YYYY-MM-DD:id" in detail
@@ -0,0 +1,112 @@
+import asyncio
+import json
+import time
+
+import asyncpg
+import httpx
+
+from database.connection import init_json_codecs
+from services.database_service import DatabaseService
+from services.reply_outbox import ReplyOutbox
+
+ENDPOINT = "http://bridge.test/api/send-reply"
+
+
+def _outbox(max_attempts: int = 3) -> ReplyOutbox:
+    return ReplyOutbox(
+        endpoint=ENDPOINT, concurrency=2, timeout=5, max_attempts=max_attempts,
+        retry_base=0.01, retry_max=0.05, poll_interval=0.05
+    )
+
+
+async def _deliver(database: dict, outbox: ReplyOutbox, handler) -> dict:
+    """Queue one reply, run the outbox until it is sent or failed, return the row"""
+    pool = await asyncpg.create_pool(**database, init=init_json_codecs, min_size=1, max_size=2)
+    try:
+        async with pool.acquire() as conn:
+            row = await outbox.enqueue(conn, "+4366012345", "Passt")
+        await outbox.start(pool, httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+        deadline = time.monotonic() + 10
+        while time.monotonic() < deadline:
+            async with pool.acquire() as conn:
+                row = await DatabaseService(conn).get_reply(row['id'])
+            if row['status'] in ('sent', 'failed'):
+                break
+            await asyncio.sleep(0.02)
+        return row
+    finally:
+        await outbox.stop()
+        await pool.close()
+
+
+def test_retryable_errors_are_retried_until_sent(database):
+    requests = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        return httpx.Response(503 if len(requests) < 3 else 200, text="ok")
+
+    outbox = _outbox()
+    row = asyncio.run(_deliver(database, outbox, handler))
+    assert (row['status'], row['attempts'], row['response_status']) == ('sent', 3, 200)
+    assert row['sent_at'] is not None
+    assert row['last_error'] is None
+    assert json.loads(requests[0].read()) == {"to": "+4366012345", "reply": "Passt"}
+    assert (outbox.retried, outbox.sent, outbox.failed) == (2, 1, 0)
+
+
+def test_client_errors_fail_without_retrying(database):
+    outbox = _outbox()
+    row = asyncio.run(_deliver(database, outbox, lambda request: httpx.Response(400, text="unknown recipient")))
+    assert (row['status'], row['attempts'], row['response_status']) == ('failed', 1, 400)
+    assert "unknown recipient" in row['last_error']
+    assert outbox.retried == 0
+
+
+def test_unreachable_bridge_fails_after_the_last_attempt(database):
+    def handler(request: httpx.Request) -> httpx.Response:
+        raise httpx.ConnectError("connection refused", request=request)
+
+    outbox = _outbox(max_attempts=2)
+    row = asyncio.run(_deliver(database, outbox, handler))
+    assert (row['status'], row['attempts'], row['response_status']) == ('failed', 2, None)
+    assert "ConnectError" in row['last_error']
+    assert (outbox.retried, outbox.failed) == (1, 1)
+
+
+def test_orphaned_sends_are_claimed_again(database):
+    async def scenario():
+        conn = await asyncpg.connect(**database)
+        await init_json_codecs(conn)
+        try:
+            service = DatabaseService(conn)
+            row = await service.enqueue_reply("+4366012345", "Passt")
+            first = await service.claim_due_replies(5, stuck_after_seconds=60)
+            # Claimed rows are not handed out twice while the send may still run
+            again = await service.claim_due_replies(5, stuck_after_seconds=60)
+            await conn.execute("UPDATE reply_outbox SET updated_at = NOW() - INTERVAL '2 minutes' WHERE id = $1", row['id'])
+            orphaned = await service.claim_due_replies(5, stuck_after_seconds=60)
+            return first, again, orphaned
+        finally:
+            await conn.close()
+
+    first, again, orphaned = asyncio.run(scenario())
+    assert [row['attempts'] for row in first] == [1]
+    assert again == []
+    assert [row['attempts'] for row in orphaned] == [2]
+
+
+def test_reply_endpoint_queues_and_reports_status(api):
+    async def scenario():
+        async with api() as client:
+            queued = await client.post("/api/v1/notifications/reply", json={"to": "+4366012345", "reply": "Passt"})
+            status = await client.get(queued.headers["Location"])
+            missing = await client.get("/api/v1/notifications/reply/999")
+            return queued, status, missing
+
+    queued, status, missing = asyncio.run(scenario())
+    assert queued.status_code == 202
+    assert queued.json()["status"] == "pending"
+    assert status.json()["reply_id"] == queued.json()["reply_id"]
+    assert status.json()["to"] == "+4366012345"
+    assert missing.status_code == 404
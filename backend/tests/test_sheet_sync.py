@@ -0,0 +1,145 @@
+import asyncio
+import os
+import threading
+from datetime import date
+
+import services.sheet_sync as sheet_sync_module
+from services.database_service import DatabaseService
+from services.sheet_sync import SheetSyncManager
+
+
+class TransientError(OSError):
+    pass
+
+
+class FakeSheetsService:
+    """Stands in for google_sheets_service; outcomes are consumed per upload call"""
+
+    state = "ready"
+
+    def __init__(self, *outcomes):
+        self.outcomes = list(outcomes)
+        self.calls = []
+        self.release = threading.Event()
+        self.release.set()
+
+    def upload_excel_to_sheet(self, file_path, sheet_name):
+        self.calls.append((os.path.exists(file_path), sheet_name))
+        self.release.wait(5)
+        outcome = self.outcomes.pop(0) if self.outcomes else None
+        if isinstance(outcome, Exception):
+            raise outcome
+        return {"id": "file-1", "name": sheet_name}
+
+    @staticmethod
+    def is_retryable(error):
+        return isinstance(error, OSError)
+
+
+def _manager(max_attempts: int = 3) -> SheetSyncManager:
+    return SheetSyncManager(max_attempts=max_attempts, retry_base=0.01, retry_max=0.02, keep_finished=10)
+
+
+def _workbook(tmp_path, name: str = "plan.xlsx") -> str:
+    path = tmp_path / name
+    path.write_bytes(b"xlsx")
+    return str(path)
+
+
+async def _finish(manager: SheetSyncManager):
+    await asyncio.wait_for(manager._queue.join(), 5)
+    await manager.stop()
+
+
+def test_retryable_errors_are_retried_until_the_sync_succeeds(tmp_path, monkeypatch):
+    service = FakeSheetsService(TransientError("reset"), TransientError("reset"))
+    monkeypatch.setattr(sheet_sync_module, "google_sheets_service", service)
+
+    async def scenario():
+        manager = _manager()
+        statuses = []
+        job = manager.submit(1, _workbook(tmp_path), "Plan", on_change=lambda job: statuses.append(job.status))
+        await _finish(manager)
+        return job, statuses
+
+    job, statuses = asyncio.run(scenario())
+    assert (job.status, job.attempts, job.error) == ("succeeded", 3, None)
+    assert job.result == {"id": "file-1", "name": "Plan"}
+    assert statuses == ["queued", "running", "retrying", "running", "retrying", "running", "succeeded"]
+    # The worker synced its own link to the file and removed it afterwards
+    assert service.calls == [(True, "Plan")] * 3
+    assert not os.path.exists(job.file_path)
+    assert os.path.exists(tmp_path / "plan.xlsx")
+
+
+def test_permanent_errors_and_exhausted_retries_fail(tmp_path, monkeypatch):
+    service = FakeSheetsService(ValueError("sheet not shared"), TransientError("reset"), TransientError("reset"))
+    monkeypatch.setattr(sheet_sync_module, "google_sheets_service", service)
+
+    async def scenario():
+        manager = _manager(max_attempts=2)
+        permanent = manager.submit(1, _workbook(tmp_path, "a.xlsx"), "Plan A")
+        exhausted = manager.submit(2, _workbook(tmp_path, "b.xlsx"), "Plan B")
+        await _finish(manager)
+        return permanent, exhausted, manager.stats()
+
+    permanent, exhausted, stats = asyncio.run(scenario())
+    assert (permanent.status, permanent.attempts, permanent.error) == ("failed", 1, "sheet not shared")
+    assert (exhausted.status, exhausted.attempts, exhausted.error) == ("failed", 2, "reset")
+    assert stats["jobs"] == {"failed": 2}
+
+
+def test_waiting_sync_is_superseded_by_a_newer_upload_to_the_same_sheet(tmp_path, monkeypatch):
+    service = FakeSheetsService()
+    service.release.clear()
+    monkeypatch.setattr(sheet_sync_module, "google_sheets_service", service)
+
+    async def scenario():
+        manager = _manager()
+        running = manager.submit(1, _workbook(tmp_path, "1.xlsx"), "Plan")
+        while not service.calls:
+            await asyncio.sleep(0.01)
+        waiting = manager.submit(2, _workbook(tmp_path, "2.xlsx"), "Plan")
+        other_sheet = manager.submit(3, _workbook(tmp_path, "3.xlsx"), "Other")
+        newest = manager.submit(4, _workbook(tmp_path, "4.xlsx"), "Plan")
+        service.release.set()
+        await _finish(manager)
+        return running, waiting, other_sheet, newest
+
+    running, waiting, other_sheet, newest = asyncio.run(scenario())
+    # A sync already talking to Drive finishes; only the one still waiting is skipped
+    assert running.status == "succeeded"
+    assert (waiting.status, waiting.attempts) == ("superseded", 0)
+    assert other_sheet.status == newest.status == "succeeded"
+    assert [name for _, name in service.calls] == ["Plan", "Other", "Plan"]
+    assert not os.path.exists(waiting.file_path)
+
+
+def test_final_status_is_stored_for_other_workers(api, tmp_path, monkeypatch):
+    import api.routes.upload as upload_routes
+
+    monkeypatch.setattr(sheet_sync_module, "google_sheets_service", FakeSheetsService())
+
+    async def scenario():
+        async with api() as client:
+            async with client.pool.acquire() as conn:
+                upload_id = await DatabaseService(conn).start_upload_history(
+                    "plan.xlsx", date(2025, 7, 7), "replace", None, "hash", []
+                )
+            manager = _manager()
+            monkeypatch.setattr(upload_routes, "sheet_sync", manager)
+            manager.start(client.pool)
+            manager.submit(upload_id, _workbook(tmp_path), "Plan")
+            await _finish(manager)
+            live = await client.get(f"/api/v1/upload/sheets-sync/{upload_id}")
+            # A worker that did not run the sync answers from upload_history
+            monkeypatch.setattr(upload_routes, "sheet_sync", _manager())
+            stored = await client.get(f"/api/v1/upload/sheets-sync/{upload_id}")
+            missing = await client.get(f"/api/v1/upload/sheets-sync/{upload_id + 1}")
+            return live, stored, missing
+
+    live, stored, missing = asyncio.run(scenario())
+    assert live.status_code == stored.status_code == 200
+    assert live.json()["status"] == stored.json()["status"] == "succeeded"
+    assert stored.json()["sheet"] == {"id": "file-1", "name": "Plan"}
+    assert missing.status_code == 404
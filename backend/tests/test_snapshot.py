@@ -0,0 +1,59 @@
+import asyncio
+from datetime import date
+
+WEEK = date(2025, 7, 7)
+WEEKLY = "/api/v1/weekly"
+
+
+def test_snapshot_matches_the_weekly_endpoints(api, load_plan):
+    async def scenario():
+        async with api() as client:
+            await load_plan(client.pool, WEEK)
+            driver = await client.pool.fetchval("SELECT driver_id FROM drivers ORDER BY name LIMIT 1")
+            await client.post(f"{WEEKLY}/availability", json={"driver_id": driver, "date": "2025-07-09", "available": False})
+            # Timestamps whose JSON form differs between Postgres and Pydantic unless rendered alike
+            await client.pool.execute(
+                "UPDATE fixed_assignments SET created_at = '2025-07-01 08:00:00.120', updated_at = '2025-07-01 08:00:00' WHERE date = $1",
+                WEEK
+            )
+            params = {"week_start": WEEK.isoformat()}
+            return {
+                name: (await client.get(f"{WEEKLY}/{name}", params=params)).json()
+                for name in ("snapshot", "routes", "drivers", "availability", "fixed-assignments")
+            }
+
+    responses = asyncio.run(scenario())
+    snapshot = responses["snapshot"]
+    assert snapshot["routes"] and snapshot["drivers"] and snapshot["availability"] and snapshot["fixed_assignments"]
+    assert snapshot["routes"] == responses["routes"]["routes"]
+    assert (snapshot["season"], snapshot["school_status"]) == (
+        responses["routes"]["season"], responses["routes"]["school_status"]
+    )
+    assert snapshot["drivers"] == responses["drivers"]["drivers"]
+    assert snapshot["availability"] == responses["availability"]["availability"]
+    assert snapshot["fixed_assignments"] == responses["fixed-assignments"]["fixed_assignments"]
+
+
+def test_snapshot_is_revalidated_with_its_etag(api):
+    async def scenario():
+        async with api() as client:
+            params = {"week_start": WEEK.isoformat()}
+            first = await client.get(f"{WEEKLY}/snapshot", params=params)
+            etag = first.headers["ETag"]
+            unchanged = await client.get(f"{WEEKLY}/snapshot", params=params, headers={"If-None-Match": etag})
+            other_week = await client.get(
+                f"{WEEKLY}/snapshot", params={"week_start": "2025-07-14"}, headers={"If-None-Match": etag}
+            )
+            await client.pool.execute("INSERT INTO routes (date, route_name) VALUES ($1, 'Tour 1')", WEEK)
+            changed = await client.get(f"{WEEKLY}/snapshot", params=params, headers={"If-None-Match": etag})
+            return first, unchanged, other_week, changed
+
+    first, unchanged, other_week, changed = asyncio.run(scenario())
+    assert first.status_code == 200
+    assert first.json()["routes"] == []
+    assert unchanged.status_code == 304
+    assert unchanged.headers["ETag"] == first.headers["ETag"]
+    assert other_week.status_code == 200
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != first.headers["ETag"]
+    assert [route["route_name"] for route in changed.json()["routes"]] == ["Tour 1"]
@@ -0,0 +1,125 @@
+import asyncio
+import os
+from datetime import date, timedelta
+
+import pytest
+
+from services.upload_jobs import UploadJob, UploadJobManager
+
+WEEK = date(2025, 7, 7)
+
+
+def test_job_manager_runs_a_bounded_number_of_jobs():
+    async def scenario():
+        manager = UploadJobManager(workers=1, queue_size=1, keep_finished=1)
+        release = asyncio.Event()
+
+        async def blocked(job):
+            job.update("routes", {"routes": 5})
+            await release.wait()
+            return "done"
+
+        async def broken(job):
+            raise RuntimeError("bad workbook")
+
+        running = manager.submit(UploadJob(1, "a.xlsx", WEEK, work=blocked))
+        await asyncio.sleep(0)
+        waiting = manager.submit(UploadJob(2, "b.xlsx", WEEK, work=broken))
+        with pytest.raises(asyncio.QueueFull):
+            manager.submit(UploadJob(3, "c.xlsx", WEEK, work=blocked))
+        snapshot = (running.status, running.stage, dict(running.progress), waiting.status)
+
+        release.set()
+        await manager._queue.join()
+        await manager.stop()
+        manager.track(UploadJob(4, "d.xlsx", WEEK, work=blocked))
+        return manager, running, waiting, snapshot
+
+    manager, running, waiting, snapshot = asyncio.run(scenario())
+    assert snapshot == ("running", "routes", {"routes": 5}, "queued")
+    assert (running.status, running.result) == ("succeeded", "done")
+    assert (waiting.status, waiting.error) == ("failed", "bad workbook")
+    # Tracking a new job drops finished ones beyond keep_finished, oldest first
+    assert manager.get(1) is None
+    assert manager.get(2) is waiting
+
+
+def test_async_upload_returns_a_job_to_poll(api, sample_workbook, monkeypatch):
+    import api.routes.upload as upload_routes
+
+    async def scenario():
+        monkeypatch.setattr(upload_routes, "upload_jobs", UploadJobManager(workers=1, queue_size=2, keep_finished=5))
+        async with api() as client:
+            with open(sample_workbook, "rb") as f:
+                accepted = await client.post(
+                    "/api/v1/upload/weekly-plan",
+                    files={"file": (os.path.basename(sample_workbook), f)},
+                    data={"week_start": str(WEEK), "sync_to_google_sheets": "false", "async_mode": "true"},
+                )
+            job = accepted.json()
+            status = job
+            for _ in range(200):
+                status = (await client.get(f"/api/v1/upload/jobs/{job['job_id']}")).json()
+                if status["status"] in ("succeeded", "failed"):
+                    break
+                await asyncio.sleep(0.05)
+
+            # Another worker (or a restart) answers from upload_history
+            await upload_routes.upload_jobs.stop()
+            monkeypatch.setattr(upload_routes, "upload_jobs", UploadJobManager(workers=1, queue_size=1, keep_finished=1))
+            from_history = (await client.get(f"/api/v1/upload/jobs/{job['job_id']}")).json()
+            missing = await client.get("/api/v1/upload/jobs/999")
+            routes = await client.pool.fetchval("SELECT COUNT(*) FROM routes")
+        return accepted, job, status, from_history, missing, routes
+
+    accepted, job, status, from_history, missing, routes = asyncio.run(scenario())
+    assert accepted.status_code == 202
+    assert accepted.headers["Location"] == f"/api/v1/upload/jobs/{job['job_id']}"
+    assert job["status"] == "queued"
+    assert status["status"] == "succeeded", status
+    assert status["stage"] == "done"
+    assert status["progress"]["routes"] == routes == status["result"]["records_created"]["routes"]
+    assert from_history["status"] == "succeeded"
+    assert from_history["result"]["records_created"] == status["result"]["records_created"]
+    assert missing.status_code == 404
+
+
+def test_concurrent_uploads_leave_exactly_one_plan(api, sample_workbook, monkeypatch):
+    import api.routes.upload as upload_routes
+
+    weeks = (WEEK, WEEK + timedelta(days=7))
+    tables = ("drivers", "routes", "driver_availability", "fixed_assignments")
+
+    async def scenario():
+        monkeypatch.setattr(upload_routes, "upload_jobs", UploadJobManager(workers=2, queue_size=2, keep_finished=5))
+        async with api() as client:
+            jobs = []
+            for week in weeks:
+                with open(sample_workbook, "rb") as f:
+                    accepted = await client.post(
+                        "/api/v1/upload/weekly-plan",
+                        files={"file": (os.path.basename(sample_workbook), f)},
+                        data={"week_start": str(week), "sync_to_google_sheets": "false", "async_mode": "true"},
+                    )
+                jobs.append(accepted.json()["job_id"])
+
+            statuses = []
+            for _ in range(400):
+                statuses = [(await client.get(f"/api/v1/upload/jobs/{job}")).json() for job in jobs]
+                if all(status["status"] in ("succeeded", "failed") for status in statuses):
+                    break
+                await asyncio.sleep(0.05)
+            await upload_routes.upload_jobs.stop()
+
+            counts = {table: await client.pool.fetchval(f"SELECT COUNT(*) FROM {table}") for table in tables}
+            route_weeks = await client.pool.fetch(
+                "SELECT DISTINCT date_trunc('week', date)::date AS week FROM routes"
+            )
+        return statuses, counts, [row["week"] for row in route_weeks]
+
+    statuses, counts, route_weeks = asyncio.run(scenario())
+    assert all(status["status"] == "succeeded" for status in statuses), statuses
+    # Whichever load ran last, the tables hold its plan and nothing of the other one
+    assert len(route_weeks) == 1
+    last = weeks.index(route_weeks[0])
+    assert counts == statuses[last]["result"]["records_created"]
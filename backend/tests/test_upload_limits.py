@@ -0,0 +1,98 @@
+import asyncio
+import os
+from datetime import date
+
+from config.settings import settings
+
+WEEK = date(2025, 7, 7)
+BOUNDARY = "limit-test-boundary"
+LIMIT = settings.MAX_FILE_SIZE + settings.MAX_UPLOAD_FORM_OVERHEAD
+
+
+def _multipart(payload_size: int, chunk_size: int = 1024 * 1024):
+    """Multipart upload body of a payload_size file, as chunks"""
+    yield (
+        f"--{BOUNDARY}\r\n"
+        f'Content-Disposition: form-data; name="week_start"\r\n\r\n{WEEK}\r\n'
+        f"--{BOUNDARY}\r\n"
+        f'Content-Disposition: form-data; name="sync_to_google_sheets"\r\n\r\nfalse\r\n'
+        f"--{BOUNDARY}\r\n"
+        f'Content-Disposition: form-data; name="file"; filename="plan.xlsx"\r\n'
+        f"Content-Type: application/octet-stream\r\n\r\n"
+    ).encode()
+    while payload_size > 0:
+        chunk = min(chunk_size, payload_size)
+        yield b"x" * chunk
+        payload_size -= chunk
+    yield f"\r\n--{BOUNDARY}--\r\n".encode()
+
+
+async def _stream(chunks, sent: list):
+    for chunk in chunks:
+        sent.append(len(chunk))
+        yield chunk
+
+
+async def _post(client, content, headers: dict):
+    return await client.post(
+        "/api/v1/upload/weekly-plan",
+        content=content,
+        headers={"Content-Type": f"multipart/form-data; boundary={BOUNDARY}", **headers},
+    )
+
+
+async def _uploads(client) -> int:
+    return await client.pool.fetchval("SELECT COUNT(*) FROM upload_history")
+
+
+def test_content_length_over_the_limit_is_rejected_unread(api):
+    async def scenario():
+        sent = []
+        async with api() as client:
+            response = await _post(
+                client, _stream(_multipart(LIMIT), sent), {"Content-Length": str(LIMIT + 1)}
+            )
+            return response, sent, await _uploads(client)
+
+    response, sent, uploads = asyncio.run(scenario())
+    assert response.status_code == 413
+    assert "Request too large" in response.json()["detail"]
+    assert response.headers["Connection"] == "close"
+    assert sent == []
+    assert uploads == 0
+
+
+def test_chunked_body_over_the_limit_is_rejected(api):
+    before = set(os.listdir(settings.UPLOAD_DIR))
+
+    async def scenario():
+        sent = []
+        async with api() as client:
+            response = await _post(client, _stream(_multipart(LIMIT), sent), {})
+            return response, sent, await _uploads(client)
+
+    response, sent, uploads = asyncio.run(scenario())
+    assert response.status_code == 413
+    assert "Request too large" in response.json()["detail"]
+    # Stopped at the chunk crossing the limit, not after the whole body
+    assert LIMIT < sum(sent) < LIMIT + 1024 * 1024
+    assert uploads == 0
+    assert set(os.listdir(settings.UPLOAD_DIR)) == before
+
+
+def test_file_over_max_file_size_is_removed_while_saving(api, monkeypatch):
+    monkeypatch.setattr(settings, "MAX_FILE_SIZE", 10_000)
+    monkeypatch.setattr(settings, "UPLOAD_CHUNK_SIZE", 1024)
+    before = set(os.listdir(settings.UPLOAD_DIR))
+
+    async def scenario():
+        async with api() as client:
+            # Under the middleware's limit (fixed at startup), over MAX_FILE_SIZE
+            response = await _post(client, b"".join(_multipart(50_000)), {})
+            return response, await _uploads(client)
+
+    response, uploads = asyncio.run(scenario())
+    assert response.status_code == 400
+    assert "File too large" in response.json()["detail"]
+    assert set(os.listdir(settings.UPLOAD_DIR)) == before
+    assert uploads == 0
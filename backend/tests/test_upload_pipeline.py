@@ -0,0 +1,144 @@
+import asyncio
+import threading
+from datetime import date
+
+import asyncpg
+
+from database.connection import init_json_codecs
+from services.database_service import DatabaseService
+from services.excel_parser import ExcelParser
+from services.upload_pipeline import UploadPipeline
+
+WEEK = date(2025, 7, 7)
+
+
+async def _connect(database: dict) -> asyncpg.Connection:
+    conn = await asyncpg.connect(**database)
+    await init_json_codecs(conn)
+    return conn
+
+
+def test_parser_yields_records_while_parsing(sample_workbook):
+    parser = ExcelParser(sample_workbook)
+    batches = parser.iter_batches(WEEK, batch_size=5)
+
+    kind, records = next(batches)
+    while kind != 'routes':
+        kind, records = next(batches)
+    # The first batch leaves while the rest of the week is still ungenerated
+    assert len(records) == 5
+    assert len(parser.route_keys) == 5
+
+    counts = {'routes': 5}
+    for kind, records in batches:
+        if isinstance(records, list):
+            assert len(records) <= 5
+            counts[kind] = counts.get(kind, 0) + len(records)
+    # Pipeline mode keeps no copy of the streamed records
+    assert parser.data['routes'] == parser.data['fixed_assignments'] == parser.data['driver_availability'] == []
+
+    data = ExcelParser(sample_workbook).parse_all(WEEK)
+    for kind in ('routes', 'fixed_assignments', 'driver_availability'):
+        assert counts.get(kind, 0) == len(data[kind])
+
+
+def test_pipeline_writes_the_parsed_plan(database, sample_workbook):
+    data = ExcelParser(sample_workbook).parse_all(WEEK)
+
+    async def scenario():
+        conn = await _connect(database)
+        try:
+            result = await UploadPipeline(conn, WEEK).run(sample_workbook)
+            counts = {
+                table: await conn.fetchval(f"SELECT COUNT(*) FROM {table}")
+                for table in ('drivers', 'routes', 'fixed_assignments', 'driver_availability')
+            }
+        finally:
+            await conn.close()
+        return result, counts
+
+    result, counts = asyncio.run(scenario())
+    assert counts['drivers'] == len(data['drivers']) == result['records_created']['drivers']
+    assert counts['routes'] == len(data['routes']) == result['records_created']['routes']
+    assert counts['fixed_assignments'] == result['records_created']['fixed_assignments']
+    assert counts['driver_availability'] == len(data['drivers']) * 7
+    assert set(result['stats']) >= {'clear', 'drivers', 'routes', 'default_availability', 'parse'}
+
+
+def test_clear_does_not_block_readers_during_the_load(database, sample_workbook):
+    parsing = threading.Event()
+    resume = threading.Event()
+
+    class SlowParser(ExcelParser):
+        def iter_batches(self, week_start, batch_size=500, keep_data=False):
+            for batch in super().iter_batches(week_start, batch_size, keep_data):
+                yield batch
+                if batch[0] == 'routes' and not parsing.is_set():
+                    parsing.set()
+                    resume.wait(10)
+
+    async def scenario():
+        writer = await _connect(database)
+        reader = await _connect(database)
+        try:
+            await reader.execute("SET lock_timeout = '2s'")
+            pipeline = type('SlowPipeline', (UploadPipeline,), {'parser_class': SlowParser})(writer, WEEK)
+            upload = asyncio.create_task(pipeline.run(sample_workbook))
+            while not parsing.is_set():
+                await asyncio.sleep(0.01)
+            # Mid-load: the clear is committed, the load is not - readers get an answer right away
+            visible = await reader.fetchval("SELECT COUNT(*) FROM routes")
+            resume.set()
+            await upload
+            return visible, await reader.fetchval("SELECT COUNT(*) FROM routes")
+        finally:
+            resume.set()
+            await writer.close()
+            await reader.close()
+
+    during, after = asyncio.run(scenario())
+    assert during == 0
+    assert after > 0
+
+
+def test_fixed_assignments_count_only_inserted_rows(database, sample_workbook):
+    class RepeatingParser(ExcelParser):
+        def iter_batches(self, week_start, batch_size=500, keep_data=False):
+            for kind, records in super().iter_batches(week_start, batch_size, keep_data):
+                yield kind, records
+                if kind == 'fixed_assignments':
+                    yield kind, records  # Same assignments again - skipped by ON CONFLICT
+
+    async def scenario():
+        conn = await _connect(database)
+        try:
+            pipeline = type('RepeatingPipeline', (UploadPipeline,), {'parser_class': RepeatingParser})(conn, WEEK)
+            result = await pipeline.run(sample_workbook)
+            return result, await conn.fetchval("SELECT COUNT(*) FROM fixed_assignments")
+        finally:
+            await conn.close()
+
+    result, stored = asyncio.run(scenario())
+    assert stored > 0
+    assert result['records_created']['fixed_assignments'] == stored
+
+
+def test_availability_batch_merges_repeated_rows_like_single_creates(database):
+    async def scenario():
+        conn = await _connect(database)
+        try:
+            driver_id = await conn.fetchval("INSERT INTO drivers (name) VALUES ('Anna') RETURNING driver_id")
+            service = DatabaseService(conn)
+            ids = await service.create_availability_batch([
+                {'driver_id': driver_id, 'date': WEEK, 'available': False, 'shift_preference': 'early', 'notes': 'Arzt'},
+                {'driver_id': driver_id, 'date': WEEK, 'available': False, 'notes': 'Urlaub'},
+            ])
+            return ids, await service.get_availability_by_id(ids[0])
+        finally:
+            await conn.close()
+
+    ids, row = asyncio.run(scenario())
+    assert len(ids) == 1
+    assert row['notes'] == 'Arzt; Urlaub'
+    assert row['shift_preference'] == 'early'
+    assert row['available'] is False
@@ -0,0 +1,111 @@
+import asyncio
+import contextlib
+import io
+from datetime import date, timedelta
+
+import asyncpg
+
+from benchmarks.upload_benchmark import CountingConnection
+from database.connection import init_json_codecs
+from services.database_service import WEEK_STATS_SELECT, DatabaseService
+from services.upload_pipeline import UploadPipeline
+
+WEEK = date(2025, 7, 7)
+MIDWEEK = WEEK + timedelta(days=3)
+COUNTS = ('total_routes', 'total_drivers', 'unavailable_instances', 'fixed_assignments', 'season', 'school_status')
+
+
+async def _connect(database: dict) -> asyncpg.Connection:
+    conn = await asyncpg.connect(**database)
+    await init_json_codecs(conn)
+    return conn
+
+
+async def _stored_and_counted(conn: asyncpg.Connection):
+    """(stored, counted) weekly_stats values for every stored window"""
+    stored = await conn.fetch(f"SELECT {', '.join(COUNTS)} FROM weekly_stats ORDER BY week_start")
+    counted = await conn.fetch(
+        f"SELECT {', '.join(COUNTS)} FROM ({WEEK_STATS_SELECT.format(weeks='SELECT week_start FROM weekly_stats')}) s "
+        "ORDER BY week_start"
+    )
+    return [tuple(row) for row in stored], [tuple(row) for row in counted]
+
+
+def test_single_row_writes_apply_deltas_to_stored_windows(database):
+    async def scenario():
+        conn = await _connect(database)
+        try:
+            await DatabaseService(conn).refresh_week_stats([WEEK, MIDWEEK, WEEK + timedelta(days=7)])
+            anna = await conn.fetchval("INSERT INTO drivers (name) VALUES ('Anna') RETURNING driver_id")
+            ben = await conn.fetchval("INSERT INTO drivers (name) VALUES ('Ben') RETURNING driver_id")
+            route = await conn.fetchval(
+                "INSERT INTO routes (date, route_name, details) VALUES ($1, 'Tour 1', '{\"season\": \"summer\"}') "
+                "RETURNING route_id",
+                WEEK + timedelta(days=4)
+            )
+            await conn.execute(
+                "INSERT INTO driver_availability (driver_id, date, available) VALUES ($1, $2, FALSE), ($3, $2, TRUE)",
+                anna, WEEK + timedelta(days=1), ben
+            )
+            await conn.execute(
+                "INSERT INTO fixed_assignments (driver_id, route_id, date) VALUES ($1, $2, $3)",
+                ben, route, WEEK + timedelta(days=4)
+            )
+            checkpoints = [await _stored_and_counted(conn)]
+
+            # Availability toggled, route moved into the next week, driver deleted (cascades)
+            await conn.execute("UPDATE driver_availability SET available = NOT available")
+            await conn.execute("UPDATE routes SET date = date + 5 WHERE route_id = $1", route)
+            await conn.execute("DELETE FROM drivers WHERE driver_id = $1", ben)
+            checkpoints.append(await _stored_and_counted(conn))
+
+            await conn.execute("TRUNCATE drivers, routes, driver_availability, fixed_assignments CASCADE")
+            checkpoints.append(await _stored_and_counted(conn))
+            return checkpoints
+        finally:
+            await conn.close()
+
+    checkpoints = asyncio.run(scenario())
+    for stored, counted in checkpoints:
+        assert len(stored) == 3
+        assert stored == counted
+    assert checkpoints[0][0][0][:4] == (1, 2, 1, 1)
+    assert checkpoints[0][0][0][4] == 'summer'
+    assert checkpoints[2][0][0][:5] == (0, 0, 0, 0, 'unknown')
+
+
+def test_reading_an_unstored_window_does_not_write(database):
+    async def scenario():
+        conn = await _connect(database)
+        try:
+            await conn.execute("INSERT INTO routes (date, route_name) VALUES ($1, 'Tour 1')", MIDWEEK)
+            stats = await DatabaseService(conn).get_week_stats(MIDWEEK)
+            return stats, await conn.fetchval("SELECT COUNT(*) FROM weekly_stats")
+        finally:
+            await conn.close()
+
+    stats, stored = asyncio.run(scenario())
+    assert stats['total_routes'] == 1
+    assert stats['week_start'] == MIDWEEK
+    assert stored == 0
+
+
+def test_upload_recounts_once_and_reports_every_statement(database, sample_workbook):
+    async def scenario():
+        conn = await _connect(database)
+        try:
+            counting = CountingConnection(conn)
+            with contextlib.redirect_stdout(io.StringIO()):
+                result = await UploadPipeline(counting, WEEK).run(sample_workbook)
+            stats = await _stored_and_counted(conn)
+            return result, counting.statements, stats
+        finally:
+            await conn.close()
+
+    result, statements, (stored, counted) = asyncio.run(scenario())
+    assert sum(phase['statements'] for phase in result['stats'].values()) == statements
+    assert result['stats']['week_stats']['statements'] == 2
+    # The clear drops stored windows; the uploaded week is stored again
+    assert len(stored) == 1
+    assert stored == counted
+    assert stored[0][0] == result['records_created']['routes']
@@ -0,0 +1,88 @@
+import asyncio
+import json
+from datetime import date
+
+from schemas.models import WeeklyAvailabilityResponse, WeeklyDriversResponse, WeeklyRoutesResponse
+from services.database_service import DatabaseService
+
+WEEK = date(2025, 7, 7)
+EMPTY_WEEK = date(2025, 7, 21)
+WEEKLY = "/api/v1/weekly"
+
+
+def _ordered(text) -> list:
+    """Parsed JSON with objects as (key, value) lists, so key order is compared too"""
+    return json.loads(text, object_pairs_hook=list)
+
+
+async def _model_responses(conn, week_start: date) -> dict:
+    """The weekly responses as the Pydantic models serialize the same rows"""
+    db_service = DatabaseService(conn)
+    routes = await db_service.get_routes_for_week(week_start)
+    first = routes[0]['details'] if routes else {}
+    drivers = await db_service.get_all_drivers()
+    # get_availability_for_week leaves out shift_preference, which the endpoint returns
+    availability = await conn.fetch(
+        """
+        SELECT da.* FROM driver_availability da JOIN drivers d USING (driver_id)
+        WHERE da.date >= $1 AND da.date < $1 + 7
+        ORDER BY d.name, da.date
+        """,
+        week_start
+    )
+    return {
+        "routes": WeeklyRoutesResponse(
+            week_start=week_start,
+            season=first.get('season', 'unknown'),
+            school_status=first.get('school_status', 'unknown'),
+            routes=routes
+        ),
+        "drivers": WeeklyDriversResponse(
+            week_start=week_start,
+            drivers=[{**driver, 'updated_at': driver.get('updated_at', driver['created_at'])} for driver in drivers]
+        ),
+        "availability": WeeklyAvailabilityResponse(week_start=week_start, availability=[dict(row) for row in availability]),
+    }
+
+
+def test_postgres_built_json_matches_the_response_models(api, load_plan):
+    async def scenario():
+        async with api() as client:
+            await load_plan(client.pool, WEEK)
+            # Rows the upload never writes: partial and extra details keys, null notes, a shift
+            # preference, timestamps on whole seconds and with trailing zeros in the fraction
+            driver = await client.pool.fetchval(
+                "INSERT INTO drivers (name, details, created_at) "
+                "VALUES ('Zoe', '{\"monthly_hours\": \"160\", \"extra\": 1}', '2025-07-01 08:00:00') "
+                "RETURNING driver_id"
+            )
+            await client.pool.execute(
+                "INSERT INTO routes (date, route_name, details, created_at) "
+                "VALUES ($1, 'Tour Ü', '{\"extra\": true}', '2025-07-01 08:00:00.120')",
+                WEEK
+            )
+            await client.pool.execute(
+                "INSERT INTO driver_availability (driver_id, date, available, shift_preference, notes, updated_at) "
+                "VALUES ($1, $2, FALSE, 'früh', NULL, '2025-07-01 08:00:00.0001'), "
+                "($1, $3, TRUE, NULL, 'Arzt \"Dr. Ö\"', '2025-07-01 08:00:00')",
+                driver, WEEK, date(2025, 7, 13)
+            )
+            weeks = {}
+            for week_start in (WEEK, EMPTY_WEEK):
+                params = {"week_start": week_start.isoformat()}
+                served = {
+                    name: (await client.get(f"{WEEKLY}/{name}", params=params)).text
+                    for name in ("routes", "drivers", "availability")
+                }
+                async with client.pool.acquire() as conn:
+                    weeks[week_start] = served, await _model_responses(conn, week_start)
+            return weeks
+
+    weeks = asyncio.run(scenario())
+    expected = weeks[WEEK][1]
+    assert len(expected["routes"].routes) > 1
+    assert len(expected["availability"].availability) > 2
+    assert weeks[EMPTY_WEEK][1]["routes"].season == "unknown"
+    for week_start, (served, expected) in weeks.items():
+        for name, model in expected.items():
+            assert _ordered(served[name]) == _ordered(model.model_dump_json()), (week_start, name)
@@ -11,6 +11,7 @@ const REPLY_ENDPOINT = import.meta.env?.VITE_REPLY_ENDPOINT || 'http://localhost
 const REPLY_PROXY_ENDPOINT = `${API_BASE_URL}/notifications/reply`;
 const ACCEPTED_NOTIFS_KEY = 'accepted_notifications_v1';
 const REJECTED_NOTIFS_KEY = 'rejected_notifications_v1';
+const NOTIFICATION_FEED_WAIT_SECONDS = 25;
 const APP_USERNAME = import.meta.env?.VITE_APP_USERNAME || '';
 const APP_PASSWORD = import.meta.env?.VITE_APP_PASSWORD || '';
 const API_KEY = import.meta.env?.VITE_API_KEY || '';
@@ -139,6 +140,7 @@ const DriverSchedulingSystem = () => {
   const [file, setFile] = useState(null);
   const [action, setAction] = useState('replace');
   const [loading, setLoading] = useState(false);
+  const [uploadProgress, setUploadProgress] = useState(null);
   const [message, setMessage] = useState(null);
   const [toast, setToast] = useState(null);
   
@@ -459,6 +461,8 @@ const DriverSchedulingSystem = () => {
       formData.append('week_start', weekStart);
       formData.append('action', action);
       formData.append('unavailable_drivers', '[]');
+      formData.append('async_mode', 'true');
+      setUploadProgress(null);
       
       try {
         const response = await fetch(`${API_BASE_URL}/upload/weekly-plan`, {
@@ -480,9 +484,11 @@ const DriverSchedulingSystem = () => {
           throw new Error(data.detail || 'Upload failed');
         }
       } else {
+        // 202 with a job id: follow the progress events until the upload finishes
+        const result = data.status === 'succeeded' ? data.result : await followUploadEvents(data.job_id);
         setMessage({
           type: 'success',
-          text: `Γ£à Upload successful! Created ${data.records_created.drivers} drivers, ${data.records_created.routes} routes, ${data.records_created.fixed_assignments} fixed assignments.`
+          text: `Γ£à Upload successful! Created ${result.records_created.drivers} drivers, ${result.records_created.routes} routes, ${result.records_created.fixed_assignments} fixed assignments.`
         });
 
         await fetchWeeklyData(weekStart);
@@ -492,6 +498,53 @@ const DriverSchedulingSystem = () => {
       setMessage({ type: 'error', text: error.message });
     } finally {
       setLoading(false);
+      setUploadProgress(null);
+    }
+  };
+
+  // Resolves with the UploadResponse of a background upload (SSE, job polling if the stream fails)
+  const followUploadEvents = async (jobId) => {
+    // EventSource cannot send X-API-Key: open the stream with a short-lived token for this upload
+    const response = await fetchWithKey(`${API_BASE_URL}/upload/events/token?upload_id=${jobId}`, { method: 'POST' });
+    if (!response.ok) return pollUploadJob(jobId);
+    const { token } = await response.json();
+    return streamUploadEvents(jobId, token);
+  };
+
+  const streamUploadEvents = (jobId, token) => new Promise((resolve, reject) => {
+    const params = new URLSearchParams({ upload_id: jobId, token });
+    const source = new EventSource(`${API_BASE_URL}/upload/events?${params}`);
+    const parse = (event) => JSON.parse(event.data);
+
+    source.addEventListener('progress', (event) => {
+      const data = parse(event);
+      setUploadProgress({ phase: data.phase, records: data.records_created || {} });
+    });
+    source.addEventListener('completed', (event) => {
+      source.close();
+      resolve(parse(event).result);
+    });
+    source.addEventListener('failed', (event) => {
+      source.close();
+      reject(new Error(parse(event).error || 'Upload failed'));
+    });
+    source.onerror = () => {
+      // The browser reconnects by itself (with Last-Event-ID) unless the stream was refused,
+      // e.g. because the token expired
+      if (source.readyState !== EventSource.CLOSED) return;
+      pollUploadJob(jobId).then(resolve, reject);
+    };
+  });
+
+  const pollUploadJob = async (jobId) => {
+    for (;;) {
+      const response = await fetchWithKey(`${API_BASE_URL}/upload/jobs/${jobId}`);
+      const job = await response.json();
+      if (!response.ok) throw new Error(job.detail || 'Upload status unavailable');
+      if (job.status === 'succeeded') return job.result;
+      if (job.status === 'failed') throw new Error(job.error || 'Upload failed');
+      setUploadProgress({ phase: job.stage, records: job.progress || {} });
+      await new Promise((done) => setTimeout(done, 2000));
     }
   };
 
@@ -643,6 +696,28 @@ const DriverSchedulingSystem = () => {
     setMessage({ type: 'success', text: `Added "${rule.title}" from samples.` });
   };
 
+  const normalizeNotifications = (items) =>
+    items
+      .map((item) => ({
+        ...item,
+        actual_message: item.actual_message || item.Actual_message || item.message || item.reason
+      }))
+      .filter((n) => n.driver_name || n.reason || n.actual_message || n.whatsapp_from);
+
+  // Merge a feed page (?since=) into the list: new notifications are added, resolved ones dropped
+  const applyNotificationChanges = (items) => {
+    const changed = normalizeNotifications(items);
+    const removedIds = new Set(changed.filter((n) => (n.status || 'pending') !== 'pending').map((n) => n.id));
+    const added = changed.filter((n) => (n.status || 'pending') === 'pending');
+    setNotifications((prev) => {
+      const addedIds = new Set(added.map((n) => n.id));
+      return [...prev.filter((n) => !removedIds.has(n.id) && !addedIds.has(n.id)), ...added];
+    });
+    if (added.length) {
+      playNotificationTone();
+    }
+  };
+
   const fetchNotifications = async () => {
     setNotificationLoading(true);
     try {
@@ -652,12 +727,7 @@ const DriverSchedulingSystem = () => {
       }
       const data = await response.json();
       const items = Array.isArray(data) ? data : data.notifications || [];
-      const pending = items
-        .map((item) => ({
-          ...item,
-          actual_message: item.actual_message || item.Actual_message || item.message || item.reason
-        }))
-        .filter((n) => n.driver_name || n.reason || n.actual_message || n.whatsapp_from);
+      const pending = normalizeNotifications(items);
       setNotifications(pending);
       if (pending.length > notifications.length) {
         playNotificationTone();
@@ -949,11 +1019,58 @@ const DriverSchedulingSystem = () => {
 
   useEffect(() => {
     if (!authed || !notificationEndpoint || !notificationPollingEnabled) return;
-    fetchNotifications();
-    const id = setInterval(() => {
-      fetchNotifications();
-    }, notificationPollingInterval);
-    return () => clearInterval(id);
+    // Long-poll the change feed: each request waits on the server until something changes.
+    // Endpoints without the feed (plain list response) are polled every notificationPollingInterval.
+    let cancelled = false;
+    const controller = new AbortController();
+    const sleep = (ms) => new Promise((resolve) => setTimeout(resolve, ms));
+    const run = async () => {
+      let cursor = null;
+      let feedSupported = true;
+      while (!cancelled) {
+        try {
+          if (!feedSupported) {
+            await fetchNotifications();
+            await sleep(notificationPollingInterval);
+            continue;
+          }
+          const wait = cursor === null ? 0 : NOTIFICATION_FEED_WAIT_SECONDS;
+          const response = await fetch(`${notificationEndpoint}?since=${cursor ?? 0}&wait=${wait}`, {
+            headers: withApiKey(),
+            signal: controller.signal
+          });
+          if (!response.ok) {
+            throw new Error('Failed to fetch notifications');
+          }
+          const data = await response.json();
+          if (Array.isArray(data)) {
+            feedSupported = false;
+            continue;
+          }
+          if (cursor === null) {
+            const pending = normalizeNotifications(data.notifications || []).filter(
+              (n) => (n.status || 'pending') === 'pending'
+            );
+            setNotifications(pending);
+            if (pending.length) {
+              playNotificationTone();
+            }
+          } else {
+            applyNotificationChanges(data.notifications || []);
+          }
+          cursor = data.cursor;
+        } catch (error) {
+          if (cancelled) return;
+          setMessage({ type: 'error', text: error.message });
+          await sleep(notificationPollingInterval);
+        }
+      }
+    };
+    run();
+    return () => {
+      cancelled = true;
+      controller.abort();
+    };
   }, [authed, notificationEndpoint, notificationPollingEnabled, notificationPollingInterval]);
 
   useEffect(() => {
@@ -1880,7 +1997,9 @@ const DriverSchedulingSystem = () => {
           {loading ? (
             <>
               <RefreshCw size={20} style={{ animation: 'spin 1s linear infinite' }} />
-              Uploading...
+              {uploadProgress
+                ? `Uploading... ${uploadProgress.phase} (${Object.values(uploadProgress.records).reduce((sum, n) => sum + n, 0)} records)`
+                : 'Uploading...'}
             </>
           ) : (
             <>